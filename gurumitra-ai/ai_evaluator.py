@@ -5,7 +5,6 @@ Same transcript + same metrics = same semantic feedback.
 All feedback must reference transcript phrase or provided metric (audit-safe).
 """
 import json
-import os
 from typing import Any, Optional
 
 # Optional: load .env for GEMINI_API_KEY
@@ -18,8 +17,9 @@ if _env_path.is_file():
     except Exception:
         pass
 
-# Max transcript length sent to LLM so the full explanation/teaching content is analyzed (not just opening)
-TRANSCRIPT_MAX_CHARS = 20000
+from llm_client import strip_code_fence
+from llm_client import generate_cached as llm_generate_cached
+from prompt_builder import build_transcript_excerpt
 
 SYSTEM_PROMPT = """You are an expert classroom evaluator for schools.
 You must analyze the FULL teaching session transcript—especially the explanation and content delivery—before writing any feedback.
@@ -52,44 +52,24 @@ Provide your response as a single JSON object only (no markdown, no code fence).
 Output only the JSON object, nothing else."""
 
 REQUIRED_KEYS = ("semantic_strengths", "semantic_improvements", "session_summary", "reasoning_notes")
-GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+# Bump when _parse_and_validate's output changes so cached LLM responses are re-parsed
+SEMANTIC_SCHEMA = "semantic:1"
 
 
-def _call_gemini(prompt_user: str) -> Optional[str]:
-    """Call Gemini with system + user prompt. Temperature=0. Returns response text or None."""
-    api_key = (os.environ.get("GEMINI_API_KEY") or "").strip()
-    if not api_key:
-        return None
-    try:
-        from google import genai
-    except ImportError:
-        return None
-    try:
-        client = genai.Client(api_key=api_key)
-        # Combine system + user for single turn (no randomness)
-        full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt_user}"
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=full_prompt,
-            config={"temperature": 0.0},
-        )
-        return (response.text or "").strip()
-    except Exception:
-        return None
+def _call_gemini(prompt_user: str) -> Optional[dict]:
+    """
+    Call Gemini (shared client, see llm_client.py) with system + user prompt. Temperature=0.
+    Returns the validated response (_parse_and_validate) or None. Validated responses are cached by prompt.
+    """
+    # Combine system + user for single turn (no randomness)
+    return llm_generate_cached(f"{SYSTEM_PROMPT}\n\n{prompt_user}", _parse_and_validate, schema=SEMANTIC_SCHEMA)
 
 
 def _parse_and_validate(text: str) -> Optional[dict]:
     """Parse JSON and validate required keys and structure. Return dict or None."""
     if not text:
         return None
-    raw = text
-    if raw.startswith("```"):
-        lines = raw.split("\n")
-        if lines[0].startswith("```"):
-            lines = lines[1:]
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        raw = "\n".join(lines)
+    raw = strip_code_fence(text)
     try:
         data = json.loads(raw)
     except json.JSONDecodeError:
@@ -126,7 +106,7 @@ def _parse_and_validate(text: str) -> Optional[dict]:
 def evaluate_teaching_semantics(input_data: dict) -> dict:
     """
     Run LLM semantic evaluation on transcript + metrics.
-    Input: transcript, segments, metrics_audio, metrics_content, duration_minutes.
+    Input: transcript, segments, segment_insights (optional), metrics_audio, metrics_content, duration_minutes.
     Output: { semantic_strengths, semantic_improvements, session_summary, reasoning_notes }
     Rejects output if format mismatches; returns empty structure on failure (caller can keep rule-based only).
     Deterministic: same input -> same prompt -> temperature 0 -> same output.
@@ -138,7 +118,9 @@ def evaluate_teaching_semantics(input_data: dict) -> dict:
     if duration_minutes <= 0:
         duration_minutes = max(0.1, float(metrics_audio.get("duration_seconds", 0)) / 60.0)
 
-    transcript_excerpt = (transcript or "(no transcript)")[:TRANSCRIPT_MAX_CHARS]
+    # Whole transcript if it fits PROMPT_TRANSCRIPT_TOKENS; else condensed with questions/examples/structure verbatim
+    segments = input_data.get("segment_insights") or input_data.get("segments")
+    transcript_excerpt = build_transcript_excerpt(transcript, segments) or "(no transcript)"
     speech_ratio = float(metrics_audio.get("speech_ratio", 0.5))
     audio_energy = float(metrics_audio.get("audio_energy", 0.5))
     question_count = int(metrics_content.get("question_count", 0))
@@ -156,8 +138,7 @@ def evaluate_teaching_semantics(input_data: dict) -> dict:
         interaction_score=interaction_score,
         transcript_excerpt=transcript_excerpt,
     )
-    text = _call_gemini(prompt_user)
-    parsed = _parse_and_validate(text) if text else None
+    parsed = _call_gemini(prompt_user)
     if parsed:
         return {
             "semantic_strengths": parsed["semantic_strengths"],
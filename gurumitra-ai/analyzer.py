@@ -3,11 +3,19 @@ GuruMitra analyzer: audio metrics + speech-to-text (Whisper) + teaching-content
 Deterministic, no randomness. Same video -> same transcript -> same feedback.
 Uses ffmpeg for audio extraction. Set FFMPEG_PATH to full path to ffmpeg.exe if not on PATH.
 """
+import hashlib
 import json
+import multiprocessing
 import os
 import re
 import shutil
+import struct
+import subprocess
 import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
@@ -20,13 +28,27 @@ if _env_path.is_file():
     except Exception:
         pass
 
-import requests
 import numpy as np
-from pydub import AudioSegment
 
-# Whisper model loaded once at first use (lazy)
-_whisper_model = None
-WHISPER_MODEL_NAME = os.environ.get("WHISPER_MODEL", "base")
+from artifact_store import get_store as get_artifact_store
+from disk_cache import DiskCache, make_key
+from downloader import DOWNLOAD_MAX_MB, DOWNLOAD_MAX_SECONDS, download, file_sha256, read_head
+from llm_client import GEMINI_MODEL, gemini_configured, strip_code_fence
+from llm_client import generate_cached as llm_generate_cached
+from pipeline import StageGraph
+from prompt_builder import PROMPT_FILLER_WORDS, PROMPT_TRANSCRIPT_TOKENS, build_transcript_excerpt
+from posture_metrics import copy_series, series_dir
+from transcription import engine_cache_id, get_engine
+
+# Transcripts are deterministic for the same decoded audio + model + options, so they are cached on disk
+TRANSCRIPT_CACHE_DIR = os.environ.get("TRANSCRIPT_CACHE_DIR") or str(Path(__file__).resolve().parent / ".cache" / "transcripts")
+TRANSCRIPT_CACHE_MAX_MB = float(os.environ.get("TRANSCRIPT_CACHE_MAX_MB", "512"))
+TRANSCRIPT_CACHE_MAX_AGE_DAYS = float(os.environ.get("TRANSCRIPT_CACHE_MAX_AGE_DAYS", "30"))
+_transcript_cache = DiskCache(
+    TRANSCRIPT_CACHE_DIR,
+    max_bytes=int(TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024),
+    max_age_seconds=TRANSCRIPT_CACHE_MAX_AGE_DAYS * 86400,
+)
 
 def _find_ffmpeg():
     out = os.environ.get("FFMPEG_PATH") or shutil.which("ffmpeg")
@@ -50,42 +72,25 @@ def _find_ffmpeg():
     return None
 
 
-_ffmpeg = _find_ffmpeg()
-if _ffmpeg:
-    AudioSegment.converter = _ffmpeg
-    _ffprobe = os.environ.get("FFPROBE_PATH") or shutil.which("ffprobe")
-    if _ffprobe:
-        AudioSegment.ffprobe = _ffprobe
-    elif os.path.isfile(os.path.join(os.path.dirname(_ffmpeg), "ffprobe.exe")):
-        AudioSegment.ffprobe = os.path.join(os.path.dirname(_ffmpeg), "ffprobe.exe")
-    elif os.path.isfile(os.path.join(os.path.dirname(_ffmpeg), "ffprobe")):
-        AudioSegment.ffprobe = os.path.join(os.path.dirname(_ffmpeg), "ffprobe")
-
-
 def _is_youtube_url(url: str) -> bool:
     u = (url or "").strip().lower()
     return "youtube.com/watch" in u or "youtu.be/" in u or "youtube.com/shorts/" in u
 
 
-def download_video(url: str, timeout: int = 60) -> str:
-    """Download video from direct URL to a temporary file. Returns path."""
-    resp = requests.get(url, timeout=timeout, stream=True)
-    resp.raise_for_status()
-    ext = Path(url.split("?")[0]).suffix or ".mp4"
-    fd, path = tempfile.mkstemp(suffix=ext)
-    try:
-        with os.fdopen(fd, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                f.write(chunk)
-        return path
-    except Exception:
-        os.unlink(path)
-        raise
+def download_video(url: str) -> str:
+    """Download video from direct URL to a temporary file (see downloader.py). Returns path."""
+    return download(url)["path"]
+
+
+# Muxed audio+video (single-file YouTube ingest)
+YOUTUBE_FORMAT_MUXED = "best[ext=mp4]/best[ext=m4a]/best"
 
 
-def download_youtube(url: str, timeout: int = 600) -> str:
-    """Download YouTube (or youtu.be) video via yt-dlp to a temp file. Returns path. Requires yt-dlp and ffmpeg."""
-    import subprocess
+def download_youtube(url: str, timeout: int = 600, format_selector: str = YOUTUBE_FORMAT_MUXED) -> str:
+    """
+    Download YouTube (or youtu.be) media via yt-dlp to a temp file. Returns path. Requires yt-dlp and ffmpeg.
+    format_selector: yt-dlp -f expression (default: one muxed audio+video file).
+    """
     tmpdir = tempfile.mkdtemp()
     out_template = os.path.join(tmpdir, "video.%(ext)s")
     try:
@@ -93,11 +98,12 @@ def download_youtube(url: str, timeout: int = 600) -> str:
         result = subprocess.run(
             [
                 shutil.which("yt-dlp") or "yt-dlp",
-                "-f", "best[ext=mp4]/best[ext=m4a]/best",
+                "-f", format_selector,
                 "--no-playlist",
                 "--no-warnings",
                 "-o", out_template,
                 "--socket-timeout", "30",
+                *(["--max-filesize", str(int(DOWNLOAD_MAX_MB * 1024 * 1024))] if DOWNLOAD_MAX_MB > 0 else []),
                 "--restrict-filenames",
                 url.strip(),
             ],
@@ -180,79 +186,289 @@ def download_youtube(url: str, timeout: int = 600) -> str:
         raise
 
 
-def download_video_or_youtube(url: str, timeout_direct: int = 60, timeout_youtube: int = 600) -> str:
+def _youtube_timeout(timeout: int) -> float:
+    return min(timeout, DOWNLOAD_MAX_SECONDS) if DOWNLOAD_MAX_SECONDS > 0 else timeout
+
+
+def download_video_or_youtube(url: str, timeout_youtube: int = 600) -> str:
     """Download from URL: use yt-dlp for YouTube, else direct HTTP. Returns local file path."""
     u = (url or "").strip()
     if not u:
         raise ValueError("video_url is required")
     if _is_youtube_url(u):
-        return download_youtube(u, timeout=timeout_youtube)
-    return download_video(u, timeout=timeout_direct)
-
-
-def extract_audio(video_path: str) -> AudioSegment:
-    """Extract audio track from video file. Requires ffmpeg."""
-    # Ensure converter is set at runtime (in case PATH wasn't set in this process)
-    ffmpeg = os.environ.get("FFMPEG_PATH") or _find_ffmpeg()
-    if ffmpeg and os.path.isfile(ffmpeg):
-        AudioSegment.converter = ffmpeg
-        bin_dir = os.path.dirname(ffmpeg)
-        for name in ("ffprobe.exe", "ffprobe"):
-            p = os.path.join(bin_dir, name)
-            if os.path.isfile(p):
-                AudioSegment.ffprobe = p
-                break
-    return AudioSegment.from_file(video_path)
-
-
-def _export_audio_to_temp(audio: AudioSegment) -> str:
-    """Export AudioSegment to a temporary WAV file. Returns path. Caller must unlink."""
-    fd, path = tempfile.mkstemp(suffix=".wav")
+        return download_youtube(u, timeout=_youtube_timeout(timeout_youtube))
+    return download_video(u)
+
+
+# YouTube: fetch an audio-only stream for the audio branch and a low-resolution video-only stream for
+# posture, concurrently, instead of one full-resolution muxed file
+YOUTUBE_SPLIT_STREAMS = os.environ.get("YOUTUBE_SPLIT_STREAMS", "1").strip().lower() in ("1", "true", "yes")
+# Tallest video stream fetched for posture (pose landmarks are normalized; 360-480p is plenty)
+YOUTUBE_VIDEO_MAX_HEIGHT = int(os.environ.get("YOUTUBE_VIDEO_MAX_HEIGHT", "480"))
+# Skip posture analysis entirely (and, for YouTube, the video download)
+POSTURE_ENABLED = os.environ.get("POSTURE_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+
+
+def _youtube_video_format(max_height: int) -> str:
+    # H.264 first: OpenCV's bundled decoder reads it everywhere
+    h = f"[height<={max_height}]"
+    return f"bestvideo{h}[vcodec^=avc1]/bestvideo{h}/best{h}/worst"
+
+
+def download_youtube_split(url: str, timeout: int = 600, video: bool = True) -> tuple:
+    """
+    Fetch audio-only and (if video) video-only streams concurrently. Returns (audio_path, video_path, stats);
+    video_path is None without video. The content hash covers both streams.
+    """
+    timeout = _youtube_timeout(timeout)
+    jobs = {"audio": "bestaudio/best"}
+    if video:
+        jobs["video"] = _youtube_video_format(YOUTUBE_VIDEO_MAX_HEIGHT)
+    t0 = time.perf_counter()
+    paths = {}
+    with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="yt-dlp") as pool:
+        futures = {name: pool.submit(download_youtube, url, timeout, fmt) for name, fmt in jobs.items()}
+        errors = []
+        for name, future in futures.items():
+            try:
+                paths[name] = future.result()
+            except Exception as e:
+                errors.append(e)
     try:
-        audio.export(path, format="wav")
-        return path
+        if errors:
+            raise errors[0]
+        seconds = time.perf_counter() - t0
+        hashes = {name: file_sha256(path) for name, path in paths.items()}
+        size = sum(os.path.getsize(path) for path in paths.values())
+        stats = {
+            "source": "yt-dlp",
+            "streams": {name: os.path.getsize(path) for name, path in paths.items()},
+            "bytes": size,
+            "seconds": round(seconds, 3),
+            "throughput_mb_per_s": round(size / (1024 * 1024) / seconds, 2) if seconds > 0 else None,
+            "content_hash": make_key("youtube-split", hashes["audio"], hashes.get("video")),
+        }
+        return paths["audio"], paths.get("video"), stats
     except Exception:
-        try:
+        for path in paths.values():
             os.unlink(path)
-        except Exception:
-            pass
         raise
 
 
-def _get_whisper_model():
-    """Load Whisper model once at first use."""
-    global _whisper_model
-    if _whisper_model is None:
-        import whisper
-        _whisper_model = whisper.load_model(WHISPER_MODEL_NAME)
-    return _whisper_model
+def download_and_hash(url: str, timeout_youtube: int = 600) -> tuple:
+    """
+    Like download_video_or_youtube, but also returns the sha256 of the downloaded bytes and download stats:
+    (path, content_hash, stats). stats (bytes, seconds, throughput_mb_per_s, ...) keep download time
+    separate from analysis time. yt-dlp output is hashed after download.
+    """
+    u = (url or "").strip()
+    if not u:
+        raise ValueError("video_url is required")
+    if _is_youtube_url(u):
+        t0 = time.perf_counter()
+        path = download_youtube(u, timeout=_youtube_timeout(timeout_youtube))
+        try:
+            seconds = time.perf_counter() - t0
+            size = os.path.getsize(path)
+            stats = {
+                "source": "yt-dlp",
+                "bytes": size,
+                "seconds": round(seconds, 3),
+                "throughput_mb_per_s": round(size / (1024 * 1024) / seconds, 2) if seconds > 0 else None,
+            }
+            return path, file_sha256(path), stats
+        except Exception:
+            os.unlink(path)
+            raise
+    result = download(u)
+    return result["path"], result["sha256"], result["stats"]
 
 
-def transcribe_audio(audio_path: str) -> dict:
+# Audio is decoded once at Whisper's native rate; metrics and transcription share the same buffer
+AUDIO_SAMPLE_RATE = 16000
+
+
+def extract_audio(video_path: str) -> np.ndarray:
+    """
+    Decode the audio track to 16 kHz mono float32 in [-1, 1] with a single ffmpeg pipe.
+    No intermediate WAV and no native-rate stereo copy in memory. Requires ffmpeg.
+    """
+    ffmpeg = os.environ.get("FFMPEG_PATH") or _find_ffmpeg() or "ffmpeg"
+    cmd = [
+        ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+        "-f", "f32le", "-acodec", "pcm_f32le", "-",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    buf = bytearray()
+    for block in iter(lambda: proc.stdout.read(1 << 20), b""):
+        buf += block
+    err = proc.stderr.read().decode("utf-8", errors="replace")
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg audio decode failed: {err.strip()[:400]}")
+    # bytearray-backed so the array is writable (Whisper wraps it with torch.from_numpy)
+    return np.frombuffer(buf, dtype=np.float32)
+
+
+def transcribe_audio(audio) -> dict:
     """
-    Speech-to-text using local Whisper. Deterministic for same audio.
+    Speech-to-text using the configured engine (TRANSCRIBE_ENGINE, see transcription.py). Deterministic for same audio.
+    audio: file path, or 16 kHz mono float32 array from extract_audio (no re-decode).
     Returns: {"transcript": str, "segments": [{"start": float, "end": float, "text": str}, ...]}
     """
-    model = _get_whisper_model()
-    result = model.transcribe(audio_path, fp16=False, language=None)
+    result = get_engine().transcribe(audio)
     transcript = (result.get("text") or "").strip()
-    segments_raw = result.get("segments") or []
+    return {"transcript": transcript, "segments": _whisper_segments(result)}
+
+
+def _whisper_segments(result: dict, offset: float = 0.0) -> list:
+    """Whisper result segments -> [{"start", "end", "text"}], shifted by offset seconds."""
     segments = []
-    for seg in segments_raw:
-        start = float(seg.get("start", 0))
-        end = float(seg.get("end", 0))
+    for seg in result.get("segments") or []:
+        start = float(seg.get("start", 0)) + offset
+        end = float(seg.get("end", 0)) + offset
         text = (seg.get("text") or "").strip()
         segments.append({"start": round(start, 2), "end": round(end, 2), "text": text})
-    return {"transcript": transcript, "segments": segments}
+    return segments
 
 
-def analyze_teaching_content(transcript: str, duration_seconds: float) -> dict:
+# Chunked mode: split long audio at silences and transcribe chunks in parallel worker processes,
+# each holding its own transcription engine. Off by default (chunk boundaries can change the transcript slightly).
+WHISPER_CHUNKED = os.environ.get("WHISPER_CHUNKED", "0").strip().lower() in ("1", "true", "yes")
+WHISPER_PROCESSES = max(1, int(os.environ.get("WHISPER_PROCESSES", str(max(1, (os.cpu_count() or 2) // 2)))))
+WHISPER_CHUNK_MAX_SECONDS = float(os.environ.get("WHISPER_CHUNK_MAX_SECONDS", "300"))
+# A cut is never placed less than this far into a chunk (avoids tiny chunks at clustered pauses)
+WHISPER_CHUNK_MIN_SECONDS = min(WHISPER_CHUNK_MAX_SECONDS / 2, 30.0)
+_whisper_pool = None
+_whisper_pool_lock = threading.Lock()
+
+
+def plan_chunks(duration_seconds: float, silence_intervals: list, max_seconds: float = WHISPER_CHUNK_MAX_SECONDS) -> list:
     """
-    Deterministic teaching-content analysis from transcript.
-    Detects questions, examples, structure words; computes interaction frequency.
-    Returns: question_count, example_count, structure_score, interaction_score.
+    Split [0, duration] into [(start, end)] of at most max_seconds, cutting at the middle of
+    the latest silence that fits in each chunk (hard cut at max_seconds if there is none).
     """
-    text = (transcript or "").strip().lower()
+    min_seconds = min(WHISPER_CHUNK_MIN_SECONDS, max_seconds / 2)
+    cuts = sorted((s + e) / 2.0 for s, e in silence_intervals or [] if 0 < s and e < duration_seconds)
+    chunks = []
+    cursor = 0.0
+    while duration_seconds - cursor > max_seconds:
+        window = [c for c in cuts if cursor + min_seconds < c <= cursor + max_seconds]
+        cut = window[-1] if window else cursor + max_seconds
+        chunks.append((round(cursor, 2), round(cut, 2)))
+        cursor = cut
+    chunks.append((round(cursor, 2), round(duration_seconds, 2)))
+    return chunks
+
+
+def _init_whisper_worker(torch_threads: int):
+    """Worker process initializer: split cores between workers and load the model once."""
+    try:
+        import torch
+        torch.set_num_threads(max(1, torch_threads))
+    except ImportError:
+        pass
+    get_engine().load()
+
+
+def _transcribe_chunk(samples: np.ndarray, offset: float) -> dict:
+    """Worker process task: transcribe one chunk; segment times are shifted to session time."""
+    result = get_engine().transcribe(samples)
+    return {"transcript": (result.get("text") or "").strip(), "segments": _whisper_segments(result, offset)}
+
+
+def _get_whisper_pool():
+    global _whisper_pool
+    with _whisper_pool_lock:
+        if _whisper_pool is None:
+            _whisper_pool = ProcessPoolExecutor(
+                max_workers=WHISPER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_whisper_worker,
+                initargs=(max(1, (os.cpu_count() or 1) // WHISPER_PROCESSES),),
+            )
+        return _whisper_pool
+
+
+def transcribe_audio_chunked(audio: np.ndarray, silence_intervals: list, sample_rate: int = AUDIO_SAMPLE_RATE) -> dict:
+    """
+    Silence-aware parallel transcription. Same output shape as transcribe_audio:
+    chunk transcripts are joined in order and segment times are offset to the full session.
+    """
+    duration = len(audio) / float(sample_rate)
+    chunks = plan_chunks(duration, silence_intervals)
+    if len(chunks) == 1:
+        return transcribe_audio(audio)
+    pool = _get_whisper_pool()
+    futures = [
+        pool.submit(_transcribe_chunk, audio[int(start * sample_rate) : int(end * sample_rate)], start)
+        for start, end in chunks
+    ]
+    parts = [f.result() for f in futures]
+    return {
+        "transcript": " ".join(p["transcript"] for p in parts if p["transcript"]),
+        "segments": [seg for p in parts for seg in p["segments"]],
+    }
+
+
+# Content features are matched on lowercased text, lowercased once per text. Each word/phrase list below
+# is compiled into one pattern, so a text is scanned once per list rather than once per phrase.
+QUESTION_START_WORDS = ("what", "how", "why", "when", "where", "which", "who")
+QUESTION_AUX_WORDS = ("is", "are", "do", "does", "did", "can", "could", "would", "should")
+EXAMPLE_PHRASES = ("for example", "for instance", "imagine", "such as", "e.g.", "like when")
+STRUCTURE_PHRASES = ("first", "next", "then", "finally", "firstly", "secondly", "lastly", "in conclusion")
+
+# Transcript question words: "what|how|..." anywhere, auxiliaries at the start of a line. Two patterns
+# instead of one alternation: their matches can never overlap, so the counts add up to the same total,
+# and the line-anchored one no longer runs at every character.
+_QUESTION_WORD_RE = re.compile(rf"\b(?:{'|'.join(QUESTION_START_WORDS)})\b", re.IGNORECASE)
+_QUESTION_AUX_RE = re.compile(rf"^\s*(?:{'|'.join(QUESTION_AUX_WORDS)})\b", re.IGNORECASE | re.MULTILINE)
+# Segment: starts with any question word
+_SEGMENT_QUESTION_RE = re.compile(rf"^\s*(?:{'|'.join(QUESTION_START_WORDS + QUESTION_AUX_WORDS)})\b")
+_KEY_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class _PhraseSet:
+    """
+    One compiled pattern for a phrase list, with the same results as per-phrase str methods:
+    count(text) == sum(text.count(p) for p in phrases), found(text) == any(p in text for p in phrases).
+    A lookahead alternation (longest first) stops at every position where some phrase starts, so
+    overlapping phrases ("first" / "firstly", "next" + "then" in "nexthen") all count; the phrases
+    starting there are the prefixes of the one matched. A phrase that can overlap itself ("such as")
+    is only counted again past its previous match, like str.count.
+    """
+
+    def __init__(self, phrases: tuple):
+        self.phrases = tuple(phrases)
+        longest_first = sorted(set(self.phrases), key=len, reverse=True)
+        self._re = re.compile("(?=(" + "|".join(re.escape(p) for p in longest_first) + "))")
+        # matched phrase -> [(index, length)] of every listed phrase that is a prefix of it
+        self._starting = {
+            m: [(i, len(p)) for i, p in enumerate(self.phrases) if m.startswith(p)] for m in longest_first
+        }
+
+    def count(self, text: str) -> int:
+        total = 0
+        next_start = [0] * len(self.phrases)
+        for match in self._re.finditer(text):
+            pos = match.start()
+            for i, length in self._starting[match.group(1)]:
+                if pos >= next_start[i]:
+                    total += 1
+                    next_start[i] = pos + length
+        return total
+
+    def found(self, text: str) -> bool:
+        return self._re.search(text) is not None
+
+
+_EXAMPLE_PHRASES = _PhraseSet(EXAMPLE_PHRASES)
+_STRUCTURE_PHRASES = _PhraseSet(STRUCTURE_PHRASES)
+
+
+def _content_insights(text: str, duration_seconds: float) -> dict:
+    """analyze_teaching_content on already stripped, lowercased text."""
     if not text:
         return {
             "question_count": 0,
@@ -261,19 +477,10 @@ def analyze_teaching_content(transcript: str, duration_seconds: float) -> dict:
             "interaction_score": 0.0,
         }
     # Question detection: "?" count + question words (deterministic)
-    question_count = text.count("?")
-    question_words = re.findall(
-        r"\b(what|how|why|when|where|which|who)\b|^\s*(is|are|do|does|did|can|could|would|should)\b",
-        text,
-        re.IGNORECASE | re.MULTILINE,
-    )
-    question_count += len(question_words)
-    # Examples
-    example_phrases = ["for example", "for instance", "imagine", "such as", "e.g.", "like when"]
-    example_count = sum(text.count(p) for p in example_phrases)
-    # Structure: first, next, then, finally, firstly, secondly
-    structure_phrases = ["first", "next", "then", "finally", "firstly", "secondly", "lastly", "in conclusion"]
-    structure_count = sum(text.count(p) for p in structure_phrases)
+    question_count = text.count("?") + len(_QUESTION_WORD_RE.findall(text)) + len(_QUESTION_AUX_RE.findall(text))
+    # Overlapping phrases ("first" / "firstly") each count
+    example_count = _EXAMPLE_PHRASES.count(text)
+    structure_count = _STRUCTURE_PHRASES.count(text)
     # Normalize to 0-5 scale (deterministic caps)
     word_count = max(1, len(text.split()))
     duration_min = max(0.1, duration_seconds / 60.0)
@@ -288,76 +495,71 @@ def analyze_teaching_content(transcript: str, duration_seconds: float) -> dict:
     }
 
 
+def analyze_teaching_content(transcript: str, duration_seconds: float) -> dict:
+    """
+    Deterministic teaching-content analysis from transcript.
+    Detects questions, examples, structure words; computes interaction frequency.
+    Returns: question_count, example_count, structure_score, interaction_score.
+    """
+    return _content_insights((transcript or "").strip().lower(), duration_seconds)
+
+
 # Stopwords for key-phrase extraction (deterministic)
 _STOP = frozenset(
     "a an the and or but in on at to for of with by from as is was are were been be have has had do does did will would could should may might must can this that these those it its i you we they".split()
 )
 
 
-def _segment_has_question(text: str) -> bool:
-    t = (text or "").strip()
-    if "?" in t:
-        return True
-    t_lower = t.lower()
-    q_start = re.match(r"^\s*(what|how|why|when|where|which|who|is|are|do|does|did|can|could|would|should)\b", t_lower)
-    return bool(q_start)
-
+def _segment_flags(text: str) -> tuple:
+    """(has_question, has_example, has_structure) for one stripped segment text."""
+    t_lower = text.lower()
+    has_question = "?" in t_lower or bool(_SEGMENT_QUESTION_RE.match(t_lower))
+    has_example = _EXAMPLE_PHRASES.found(t_lower)
+    has_structure = _STRUCTURE_PHRASES.found(t_lower)
+    return has_question, has_example, has_structure
 
-def _segment_has_example(text: str) -> bool:
-    t = (text or "").lower()
-    return any(p in t for p in ["for example", "for instance", "such as", "e.g.", "imagine", "like when"])
 
-
-def _segment_has_structure(text: str) -> bool:
-    t = (text or "").lower()
-    return any(p in t for p in ["first", "next", "then", "finally", "firstly", "secondly", "lastly", "in conclusion"])
-
-
-def analyze_segments(segments: list) -> list:
+def _scan_segments(segments: list) -> tuple:
     """
-    Analyze every segment from Whisper: questions, examples, structure, word count.
-    Returns list of dicts with start, end, text, has_question, has_example, has_structure, word_count.
+    One pass over Whisper segments. Returns (segment_insights, part_entries); part_entries holds
+    (start, has_question, has_example, word_count) for each non-empty segment, unrounded, for part bucketing.
     """
-    out = []
+    insights, part_entries = [], []
     for seg in segments or []:
         start = float(seg.get("start", 0))
         end = float(seg.get("end", 0))
         text = (seg.get("text") or "").strip()
-        words = text.split()
-        out.append({
+        has_question, has_example, has_structure = _segment_flags(text)
+        word_count = len(text.split())
+        insights.append({
             "start": round(start, 1),
             "end": round(end, 1),
             "text": text,
-            "has_question": _segment_has_question(text),
-            "has_example": _segment_has_example(text),
-            "has_structure": _segment_has_structure(text),
-            "word_count": len(words),
+            "has_question": has_question,
+            "has_example": has_example,
+            "has_structure": has_structure,
+            "word_count": word_count,
         })
-    return out
+        if text:
+            part_entries.append((start, has_question, has_example, word_count))
+    return insights, part_entries
 
 
-def analyze_content_by_parts(transcript: str, segments: list, duration_seconds: float) -> dict:
+def analyze_segments(segments: list) -> list:
     """
-    Split video into opening (first 20%), middle (60%), closing (20%).
-    For each part: question_count, example_count, word_count, segment_count.
-    Enables feedback like "In the opening you asked X questions; the middle had none."
+    Analyze every segment from Whisper: questions, examples, structure, word count.
+    Returns list of dicts with start, end, text, has_question, has_example, has_structure, word_count.
     """
-    if not segments and not (transcript or "").strip():
-        return {"opening": {}, "middle": {}, "closing": {}}
+    return _scan_segments(segments)[0]
+
+
+def _content_by_parts(part_entries: list, duration_seconds: float) -> dict:
     duration = max(0.1, duration_seconds)
-    t_end = duration
-    opening_end = t_end * 0.2
-    closing_start = t_end * 0.8
+    opening_end = duration * 0.2
+    closing_start = duration * 0.8
     parts = {"opening": [], "middle": [], "closing": []}
-    for seg in segments or []:
-        start = float(seg.get("start", 0))
-        text = (seg.get("text") or "").strip()
-        if not text:
-            continue
-        has_q = _segment_has_question(text)
-        has_ex = _segment_has_example(text)
-        wc = len(text.split())
-        entry = {"start": start, "text": text[:80], "has_question": has_q, "has_example": has_ex, "word_count": wc}
+    for entry in part_entries:
+        start = entry[0]
         if start < opening_end:
             parts["opening"].append(entry)
         elif start >= closing_start:
@@ -366,77 +568,342 @@ def analyze_content_by_parts(transcript: str, segments: list, duration_seconds:
             parts["middle"].append(entry)
     def agg(entries):
         return {
-            "question_count": sum(1 for e in entries if e.get("has_question")),
-            "example_count": sum(1 for e in entries if e.get("has_example")),
-            "word_count": sum(e.get("word_count", 0) for e in entries),
+            "question_count": sum(1 for e in entries if e[1]),
+            "example_count": sum(1 for e in entries if e[2]),
+            "word_count": sum(e[3] for e in entries),
             "segment_count": len(entries),
         }
-    return {
-        "opening": agg(parts["opening"]),
-        "middle": agg(parts["middle"]),
-        "closing": agg(parts["closing"]),
-    }
+    return {name: agg(entries) for name, entries in parts.items()}
 
 
-def extract_key_phrases(transcript: str, max_phrases: int = 8) -> list:
+def analyze_content_by_parts(transcript: str, segments: list, duration_seconds: float) -> dict:
     """
-    Extract significant repeated words from transcript (deterministic).
-    Skips short words and stopwords. Used to make feedback content-specific.
+    Split video into opening (first 20%), middle (60%), closing (20%).
+    For each part: question_count, example_count, word_count, segment_count.
+    Enables feedback like "In the opening you asked X questions; the middle had none."
     """
-    text = (transcript or "").lower()
-    words = re.findall(r"[a-z0-9]+", text)
+    if not segments and not (transcript or "").strip():
+        return {"opening": {}, "middle": {}, "closing": {}}
+    return _content_by_parts(_scan_segments(segments)[1], duration_seconds)
+
+
+def _key_phrases(text: str, max_phrases: int) -> list:
+    """extract_key_phrases on already lowercased text."""
     counts = {}
-    for w in words:
+    for w in _KEY_WORD_RE.findall(text):
         if len(w) >= 4 and w not in _STOP:
             counts[w] = counts.get(w, 0) + 1
     sorted_words = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[: max_phrases * 2]
     return [w for w, _ in sorted_words[:max_phrases]]
 
 
-def compute_metrics(audio: AudioSegment) -> dict:
+def extract_key_phrases(transcript: str, max_phrases: int = 8) -> list:
     """
-    Compute duration, speaking time %, silence %, and audio energy from audio.
-    Uses energy-based voice activity: chunks above threshold count as speech.
-    Deterministic: same audio -> same metrics.
-    """
-    duration_ms = len(audio)
-    duration_seconds = duration_ms / 1000.0
-
-    samples = np.array(audio.get_array_of_samples())
-    if audio.channels == 2:
-        samples = samples.reshape(-1, 2).mean(axis=1)
-    samples = samples.astype(np.float64) / (2 ** 15)
-
-    # 100ms windows
-    sample_rate = audio.frame_rate
-    window_samples = int(0.1 * sample_rate)
-    n_windows = len(samples) // window_samples
-    if n_windows == 0:
+    Extract significant repeated words from transcript (deterministic).
+    Skips short words and stopwords. Used to make feedback content-specific.
+    """
+    return _key_phrases((transcript or "").lower(), max_phrases)
+
+
+def analyze_transcript_content(transcript: str, segments: list, duration_seconds: float, max_phrases: int = 8) -> dict:
+    """
+    All content features together: the transcript is lowercased once and each segment is lowercased and
+    flagged once (its flags feed both segment_insights and the opening/middle/closing buckets). A text is
+    scanned once per compiled word/phrase pattern, not once per phrase.
+    Returns content_insights, segment_insights, content_by_parts and key_phrases, identical to
+    analyze_teaching_content, analyze_segments, analyze_content_by_parts and extract_key_phrases.
+    """
+    text = (transcript or "").strip().lower()
+    segment_insights, part_entries = _scan_segments(segments)
+    if not segments and not text:
+        content_by_parts = {"opening": {}, "middle": {}, "closing": {}}
+    else:
+        content_by_parts = _content_by_parts(part_entries, duration_seconds)
+    return {
+        "content_insights": _content_insights(text, duration_seconds),
+        "segment_insights": segment_insights,
+        "content_by_parts": content_by_parts,
+        "key_phrases": _key_phrases(text, max_phrases),
+    }
+
+
+# Energy windows for metrics/VAD (100ms)
+METRICS_WINDOW_SECONDS = 0.1
+# VAD smoothing for speech/silence intervals: pauses shorter than this stay inside speech,
+# speech bursts shorter than VAD_MIN_SPEECH_SECONDS (clicks, bumps) count as silence
+VAD_MIN_SILENCE_SECONDS = 0.3
+VAD_MIN_SPEECH_SECONDS = 0.2
+# Interval lists are for later stages (e.g. silence-aware chunking), not part of the response metrics
+VAD_KEYS = ("speech_intervals", "silence_intervals")
+
+
+def _runs(mask: np.ndarray) -> tuple:
+    """Start/end indices (end exclusive) of consecutive True runs in a boolean array."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
+
+
+class AudioMetricsAccumulator:
+    """
+    Incremental compute_metrics: feed mono float32 PCM chunks of any length with add(), then finish().
+    Only one RMS energy per 100ms window is kept (10 floats per second of audio), so memory does not
+    grow with the raw samples; RMS is computed vectorized per block of windows.
+    """
+
+    # Windows per vectorized block (bounds the float64 scratch copy to ~1 minute of audio)
+    BLOCK_WINDOWS = 600
+
+    def __init__(self, sample_rate: int = AUDIO_SAMPLE_RATE, window_seconds: float = METRICS_WINDOW_SECONDS):
+        self.sample_rate = sample_rate
+        self.window_seconds = window_seconds
+        self.window_samples = int(window_seconds * sample_rate)
+        self.n_samples = 0
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._energies = []
+
+    def add(self, chunk: np.ndarray):
+        chunk = np.asarray(chunk, dtype=np.float32).ravel()
+        self.n_samples += len(chunk)
+        if self._carry.size:
+            chunk = np.concatenate((self._carry, chunk))
+        w = self.window_samples
+        n_windows = len(chunk) // w
+        block = self.BLOCK_WINDOWS * w
+        for start in range(0, n_windows * w, block):
+            frames = chunk[start : min(start + block, n_windows * w)].reshape(-1, w).astype(np.float64)
+            self._energies.append(np.sqrt(np.mean(frames * frames, axis=1)))
+        self._carry = chunk[n_windows * w :].copy()
+
+    def window_energies(self) -> np.ndarray:
+        return np.concatenate(self._energies) if self._energies else np.zeros(0)
+
+    def finish(self) -> dict:
+        """Metrics (duration_seconds, speech_ratio, silence_ratio, audio_energy) plus speech/silence intervals."""
+        duration_seconds = self.n_samples / float(self.sample_rate)
+        energies = self.window_energies()
+        n_windows = len(energies)
+        if n_windows == 0:
+            return {
+                "duration_seconds": duration_seconds,
+                "speech_ratio": 0.5,
+                "silence_ratio": 0.5,
+                "audio_energy": 0.3,
+                "speech_intervals": [],
+                "silence_intervals": [[0.0, round(duration_seconds, 2)]] if duration_seconds > 0 else [],
+            }
+
+        threshold = max(energies.max() * 0.05, 1e-6)
+        speech = energies >= threshold
+        speech_ratio = float(np.sum(speech) / n_windows)
+        silence_ratio = 1.0 - speech_ratio
+        audio_energy = float(np.clip(np.mean(energies) / (threshold * 10 + 1e-6), 0, 1))
+
+        speech_intervals, silence_intervals = self._vad_intervals(speech, duration_seconds)
         return {
-            "duration_seconds": duration_seconds,
-            "speech_ratio": 0.5,
-            "silence_ratio": 0.5,
-            "audio_energy": 0.3,
+            "duration_seconds": round(duration_seconds, 2),
+            "speech_ratio": round(speech_ratio, 4),
+            "silence_ratio": round(silence_ratio, 4),
+            "audio_energy": round(min(audio_energy, 1.0), 4),
+            "speech_intervals": speech_intervals,
+            "silence_intervals": silence_intervals,
         }
 
-    energies = []
-    for i in range(n_windows):
-        chunk = samples[i * window_samples : (i + 1) * window_samples]
-        rms = np.sqrt(np.mean(chunk ** 2))
-        energies.append(rms)
+    def _vad_intervals(self, speech: np.ndarray, duration_seconds: float) -> tuple:
+        """Frame-level VAD with hangover: bridge short pauses, drop short bursts. Returns ([[s, e]], [[s, e]]) in seconds."""
+        voiced = speech.copy()
+        min_gap = int(round(VAD_MIN_SILENCE_SECONDS / self.window_seconds))
+        starts, ends = _runs(~voiced)
+        for s, e in zip(starts, ends):
+            # Only interior pauses are bridged; leading/trailing silence stays silence
+            if s > 0 and e < len(voiced) and e - s < min_gap:
+                voiced[s:e] = True
+        min_burst = int(round(VAD_MIN_SPEECH_SECONDS / self.window_seconds))
+        starts, ends = _runs(voiced)
+        for s, e in zip(starts, ends):
+            if e - s < min_burst:
+                voiced[s:e] = False
+
+        ws = self.window_seconds
+        starts, ends = _runs(voiced)
+        speech_intervals = [[round(int(s) * ws, 2), round(int(e) * ws, 2)] for s, e in zip(starts, ends)]
+        silence_intervals = []
+        cursor = 0.0
+        for s, e in speech_intervals:
+            if s > cursor:
+                silence_intervals.append([round(cursor, 2), s])
+            cursor = e
+        if duration_seconds - cursor >= ws:
+            silence_intervals.append([round(cursor, 2), round(duration_seconds, 2)])
+        return speech_intervals, silence_intervals
+
+
+def compute_metrics(audio: np.ndarray, sample_rate: int = AUDIO_SAMPLE_RATE) -> dict:
+    """
+    Compute duration, speaking time %, silence %, and audio energy from audio.
+    audio: mono float32 samples in [-1, 1] (see extract_audio).
+    Uses energy-based voice activity: 100ms windows above threshold count as speech.
+    Also returns speech_intervals / silence_intervals ([[start_s, end_s], ...]) for later stages.
+    Deterministic: same audio -> same metrics. For streamed audio use AudioMetricsAccumulator directly.
+    """
+    acc = AudioMetricsAccumulator(sample_rate=sample_rate)
+    acc.add(audio)
+    return acc.finish()
+
+
+class AudioStreamDecoder:
+    """
+    Decodes audio while the video downloads: write() passes container bytes to ffmpeg's stdin, and a reader
+    thread collects the 16 kHz mono float32 output and feeds AudioMetricsAccumulator as it arrives.
+    finish() returns (audio, metrics), identical to extract_audio + compute_metrics on the finished file, or
+    None if ffmpeg could not decode from a pipe (e.g. an MP4 whose index is at the end) or the stream was
+    discarded; the caller then decodes the file instead. Used as a downloader sink.
+    """
+
+    def __init__(self):
+        ffmpeg = os.environ.get("FFMPEG_PATH") or _find_ffmpeg() or "ffmpeg"
+        cmd = [
+            ffmpeg, "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+            "-f", "f32le", "-acodec", "pcm_f32le", "pipe:1",
+        ]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.failed = False
+        self.error = ""
+        self._buf = bytearray()
+        self._acc = AudioMetricsAccumulator()
+        self._stderr = []
+        self._readers = [
+            threading.Thread(target=self._read_audio, name="audio-stream", daemon=True),
+            threading.Thread(target=lambda: self._stderr.append(self.proc.stderr.read()), daemon=True),
+        ]
+        for t in self._readers:
+            t.start()
+
+    def write(self, chunk: bytes):
+        if self.failed:
+            return
+        try:
+            self.proc.stdin.write(chunk)
+        except OSError:
+            # ffmpeg exited (cannot decode this input from a pipe); the download itself carries on
+            self.failed = True
+
+    def discard(self):
+        """Stop decoding (the stream restarted); finish() will return None."""
+        self.failed = True
+        self.proc.kill()
+
+    def finish(self) -> Optional[tuple]:
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        for t in self._readers:
+            t.join()
+        code = self.proc.wait()
+        self.error = b"".join(self._stderr).decode("utf-8", errors="replace").strip()[:400]
+        # Any error counts: e.g. an MP4 with its index at the end exits 0 with "partial file" and no audio
+        if self.failed or code != 0 or self.error:
+            return None
+        return np.frombuffer(self._buf, dtype=np.float32), self._acc.finish()
+
+    def _read_audio(self):
+        rest = b""
+        for block in iter(lambda: self.proc.stdout.read(1 << 16), b""):
+            self._buf += block
+            data = rest + block
+            usable = len(data) - len(data) % 4
+            if usable:
+                self._acc.add(np.frombuffer(data[:usable], dtype=np.float32))
+            rest = data[usable:]
+
+
+# Decode audio from the HTTP stream while it downloads (direct URLs); 0 = decode after the download
+INGEST_STREAMING = os.environ.get("INGEST_STREAMING", "1").strip().lower() in ("1", "true", "yes")
 
-    energies = np.array(energies)
-    threshold = max(energies.max() * 0.05, 1e-6)
-    speech_windows = np.sum(energies >= threshold)
-    speech_ratio = float(speech_windows / n_windows)
-    silence_ratio = 1.0 - speech_ratio
-    audio_energy = float(np.clip(np.mean(energies) / (threshold * 10 + 1e-6), 0, 1))
+# Top-level boxes that can precede moov/mdat in MP4/MOV files
+_MP4_LEADING_BOXES = {b"ftyp", b"styp", b"pdin", b"free", b"skip", b"wide", b"uuid", b"junk"}
 
+
+def _mp4_index_at_end(head: bytes) -> bool:
+    """
+    True if head (the start of a file) is an MP4/MOV whose media data (mdat) comes before its index (moov),
+    i.e. not "fast start". ffmpeg cannot decode such a file from a pipe, so streaming ingest gains nothing.
+    False for fast-start MP4, other containers, or when head ends before either box.
+    """
+    pos = 0
+    while pos + 8 <= len(head):
+        size, kind = struct.unpack(">I4s", head[pos : pos + 8])
+        if kind == b"moov":
+            return False
+        if kind == b"mdat":
+            return True
+        if kind not in _MP4_LEADING_BOXES:
+            return False
+        if size == 1:
+            if pos + 16 > len(head):
+                return False
+            size = struct.unpack(">Q", head[pos + 8 : pos + 16])[0]
+        if size < 8:
+            return False
+        pos += size
+    return False
+
+
+def ingest_url(url: str) -> dict:
+    """
+    Download url for run_analysis. Returns {"path", "audio_path", "content_hash", "download", "audio", "metrics"};
+    the caller removes path and audio_path. YouTube URLs (YOUTUBE_SPLIT_STREAMS=1) give an audio-only file in
+    audio_path and a low-resolution video-only file in path, which is None when POSTURE_ENABLED=0.
+    With INGEST_STREAMING=1 a direct URL is downloaded as one ordered stream that is tee'd into ffmpeg, so
+    audio decode and audio metrics overlap the transfer; audio/metrics are then passed to run_analysis.
+    They are None for YouTube, with streaming off, or when the pipe could not be decoded (the audio stage
+    then decodes audio_path or path as usual). The first bytes are sniffed first: an MP4 whose moov atom is
+    at the end would not decode from the pipe, so it is downloaded with parallel segments instead.
+    """
+    u = (url or "").strip()
+    if not u:
+        raise ValueError("video_url is required")
+    if _is_youtube_url(u) and YOUTUBE_SPLIT_STREAMS:
+        audio_path, video_path, stats = download_youtube_split(u, video=POSTURE_ENABLED)
+        content_hash = stats.pop("content_hash")
+        return {
+            "path": video_path,
+            "audio_path": audio_path,
+            "content_hash": content_hash,
+            "download": stats,
+            "audio": None,
+            "metrics": None,
+        }
+    # An MP4 with its index at the end cannot be decoded from a pipe: keep parallel segments instead
+    if not INGEST_STREAMING or _is_youtube_url(u) or _mp4_index_at_end(read_head(u) or b""):
+        path, content_hash, stats = download_and_hash(u)
+        if INGEST_STREAMING and not _is_youtube_url(u):
+            stats["audio_streamed"] = False
+        return {"path": path, "audio_path": None, "content_hash": content_hash, "download": stats, "audio": None, "metrics": None}
+    decoder = AudioStreamDecoder()
+    try:
+        result = download(u, sink=decoder)
+    except BaseException:
+        decoder.discard()
+        decoder.finish()
+        raise
+    t0 = time.perf_counter()
+    decoded = decoder.finish()
+    stats = result["stats"]
+    stats["audio_streamed"] = decoded is not None
+    # Decode time left after the last byte arrived (what streaming did not hide)
+    stats["audio_decode_tail_seconds"] = round(time.perf_counter() - t0, 3)
+    audio, metrics = decoded if decoded is not None else (None, None)
     return {
-        "duration_seconds": round(duration_seconds, 2),
-        "speech_ratio": round(speech_ratio, 4),
-        "silence_ratio": round(silence_ratio, 4),
-        "audio_energy": round(min(audio_energy, 1.0), 4),
+        "path": result["path"],
+        "audio_path": None,
+        "content_hash": result["sha256"],
+        "download": stats,
+        "audio": audio,
+        "metrics": metrics,
     }
 
 
@@ -459,8 +926,6 @@ THRESHOLD_DURATION_STRENGTH_MIN = 15.0  # minutes
 THRESHOLD_DURATION_IMPROVE_MIN = 10.0   # minutes
 SCORE_DECIMALS = 1
 
-GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
-
 
 def _generate_feedback_with_gemini(
     metrics: dict,
@@ -473,14 +938,9 @@ def _generate_feedback_with_gemini(
     """
     Call Google Gemini API to generate teaching feedback. Returns same shape as generate_feedback
     or None on failure (caller should fall back to rule-based feedback).
-    Requires GEMINI_API_KEY. Optional: GEMINI_MODEL (default gemini-2.0-flash).
+    Requires GEMINI_API_KEY. Optional: GEMINI_MODEL (see llm_client.py; the client is shared per process).
     """
-    api_key = (os.environ.get("GEMINI_API_KEY") or "").strip()
-    if not api_key:
-        return None
-    try:
-        from google import genai
-    except ImportError:
+    if not gemini_configured():
         return None
 
     duration_min = float(metrics.get("duration_seconds", 0)) / 60.0
@@ -489,8 +949,8 @@ def _generate_feedback_with_gemini(
     q_count = (content_insights or {}).get("question_count", 0)
     ex_count = (content_insights or {}).get("example_count", 0)
     parts = content_by_parts or {}
-    # Send full transcript (up to 18k chars) so the explanation/teaching content is fully analyzed
-    transcript_for_llm = (transcript or "").strip()[:18000]
+    # Whole transcript if it fits PROMPT_TRANSCRIPT_TOKENS; else condensed over opening/middle/closing
+    transcript_for_llm = build_transcript_excerpt(transcript, segment_insights)
     phrases = key_phrases or []
 
     prompt = f"""You are an expert teaching coach. The transcript below is from a full classroom session. You MUST analyze the actual explanation and teaching content in the transcript before writing feedback. Do not give generic advice—every strength, improvement, and recommendation must be specific to what the teacher said or did in this transcript. Produce feedback in the exact JSON format below. No other text.
@@ -522,25 +982,21 @@ Respond with a single JSON object only (no markdown, no code block), with these
 - recommendations: array of strings (2-4 actionable next steps)
 """
 
+    # Validated responses are cached by prompt (temperature 0), so re-analysis costs no tokens
+    data = llm_generate_cached(prompt, _parse_gemini_feedback, schema=GEMINI_FEEDBACK_SCHEMA)
+    if data is None:
+        return None
+    return {**data, "metrics": metrics}
+
+
+# Bump when _parse_gemini_feedback's output changes so cached LLM responses are re-parsed
+GEMINI_FEEDBACK_SCHEMA = "feedback:1"
+
+
+def _parse_gemini_feedback(text: str) -> Optional[dict]:
+    """Parse and normalize the feedback JSON (scores clamped to 0-5, lists trimmed). None if it is not usable."""
     try:
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt,
-            config={"temperature": 0.0},
-        )
-        text = (response.text or "").strip()
-        if not text:
-            return None
-        # Strip markdown code block if present
-        if text.startswith("```"):
-            lines = text.split("\n")
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            text = "\n".join(lines)
-        data = json.loads(text)
+        data = json.loads(strip_code_fence(text))
         # Validate and normalize
         def clamp_score(v):
             try:
@@ -570,7 +1026,6 @@ Respond with a single JSON object only (no markdown, no code block), with these
             "strengths": strengths,
             "improvements": improvements,
             "recommendations": recommendations,
-            "metrics": metrics,
         }
     except Exception:
         return None
@@ -764,34 +1219,415 @@ def build_session_output(
     }
 
 
-def run_analysis(video_path: str, session_id: Optional[str] = None) -> dict:
+# Posture runs in its own process so MediaPipe/OpenCV work overlaps the audio branch instead of
+# following it. POSTURE_PROCESSES=0 runs posture on a thread in this process instead.
+POSTURE_PROCESSES = int(os.environ.get("POSTURE_PROCESSES", "2"))
+# Split each video into this many time ranges scanned in parallel on the posture pool (1 = one process
+# per video). Ranges follow tracking windows, so the merged result equals a single-process scan.
+POSTURE_SHARDS = max(1, int(os.environ.get("POSTURE_SHARDS", "1")))
+# Save each session's posture landmark series (POSTURE_SERIES_DIR) for POST /posture/rescore
+SAVE_POSTURE_SERIES = os.environ.get("SAVE_POSTURE_SERIES", "1").strip().lower() in ("1", "true", "yes")
+_posture_pool = None
+_posture_pool_lock = threading.Lock()
+
+# Require sufficient transcript so feedback is from actual analysis, not generic templates
+MIN_TRANSCRIPT_WORDS = 25
+
+# Content-addressed result cache: same file bytes + same pipeline/models -> stored result, no re-analysis.
+# Bump PIPELINE_VERSION whenever a code change alters analysis output so stale results are not served;
+# settings that alter it belong in _result_config().
+PIPELINE_VERSION = "10"
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR") or str(Path(__file__).resolve().parent / ".cache" / "results")
+RESULT_CACHE_MAX_MB = float(os.environ.get("RESULT_CACHE_MAX_MB", "256"))
+_result_cache = DiskCache(RESULT_CACHE_DIR, max_bytes=int(RESULT_CACHE_MAX_MB * 1024 * 1024))
+
+
+def _get_posture_pool():
+    """Long-lived process pool for posture analysis (spawned, so no forked torch/thread state). None if disabled."""
+    global _posture_pool
+    if POSTURE_PROCESSES <= 0:
+        return None
+    with _posture_pool_lock:
+        if _posture_pool is None:
+            from model_registry import init_posture_worker
+            _posture_pool = ProcessPoolExecutor(
+                max_workers=POSTURE_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_posture_worker,
+            )
+        return _posture_pool
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+def _start_all_workers(pool, n: int) -> list:
+    """Submit n tasks at once so the pool spawns (and initializes) all n workers now. Returns worker pids."""
+    futures = [pool.submit(_worker_pid) for _ in range(n)]
+    return sorted({f.result() for f in futures})
+
+
+def warm_posture_workers() -> dict:
+    """Spawn posture worker processes; each loads and warms its models in the pool initializer."""
+    return {"workers": _start_all_workers(_get_posture_pool(), POSTURE_PROCESSES)}
+
+
+def warm_whisper_workers() -> dict:
+    """Spawn chunked-transcription worker processes; each loads its engine in the pool initializer."""
+    return {"workers": _start_all_workers(_get_whisper_pool(), WHISPER_PROCESSES)}
+
+
+def shutdown_workers():
+    """Stop the posture and chunked-Whisper process pools (called on app shutdown)."""
+    global _posture_pool, _whisper_pool
+    with _posture_pool_lock:
+        if _posture_pool is not None:
+            _posture_pool.shutdown(wait=False, cancel_futures=True)
+            _posture_pool = None
+    with _whisper_pool_lock:
+        if _whisper_pool is not None:
+            _whisper_pool.shutdown(wait=False, cancel_futures=True)
+            _whisper_pool = None
+
+
+# Posture/phone settings are taken from the environment so building a key does not import cv2. An unset
+# variable and one set to its default give different keys, which only costs a cache miss.
+_RESULT_CONFIG_ENV_PREFIXES = ("POSTURE_ANALYSIS_FPS", "POSTURE_POSE_MODE", "POSE_", "PHONE_DETECT_", "PHONE_ROI_")
+
+
+def _result_config() -> dict:
+    """Every setting that changes analysis output (besides the code itself, see PIPELINE_VERSION)."""
+    config = {
+        "transcribe_engine": engine_cache_id(),
+        "transcription_mode": _transcription_mode(),
+        "llm": GEMINI_MODEL if gemini_configured() else "rules",
+        "prompt_transcript_tokens": PROMPT_TRANSCRIPT_TOKENS,
+        "prompt_filler_words": PROMPT_FILLER_WORDS,
+        "posture_enabled": POSTURE_ENABLED,
+        "save_posture_series": SAVE_POSTURE_SERIES,
+    }
+    config.update({k: v for k, v in os.environ.items() if k.startswith(_RESULT_CONFIG_ENV_PREFIXES)})
+    return config
+
+
+def _result_cache_key(content_hash: str) -> str:
+    """Result depends on file bytes, pipeline code and the configuration fingerprint (models, settings)."""
+    return make_key("result", content_hash, PIPELINE_VERSION, json.dumps(_result_config(), sort_keys=True))
+
+
+def _is_cacheable(out: dict, feedback_source: Optional[str]) -> bool:
+    """Do not pin degraded results (Gemini outage -> rule-based fallback, posture failure); a retry may do better."""
+    posture = out.get("posture_analysis")
+    if isinstance(posture, dict) and posture.get("error"):
+        return False
+    if gemini_configured() and out.get("scores") is not None:
+        if feedback_source != "gemini":
+            return False
+        if not (out.get("semantic_feedback") or {}).get("session_summary"):
+            return False
+    return True
+
+
+class _PostureCancel:
     """
-    Full Phase-2 pipeline: extract audio -> transcribe (Whisper) -> audio metrics -> teaching content -> merged feedback.
-    If transcript is empty, returns warning and no scores (no fake feedback).
-    Same video -> same transcript -> same feedback. JSON only.
+    Stops a posture job the session no longer needs (StageGraph on_cancel, e.g. transcript too short).
+    Worker processes cannot share an Event, so the signal is a marker file that PostureAnalyzer.scan checks
+    every sampled frame; a job still queued on the pool is cancelled outright.
     """
-    audio = extract_audio(video_path)
-    metrics_audio = compute_metrics(audio)
-    duration_seconds = float(metrics_audio.get("duration_seconds", 0))
 
-    audio_temp_path = None
+    def __init__(self):
+        self.path = os.path.join(tempfile.gettempdir(), f"gurumitra-posture-{os.urandom(8).hex()}.cancel")
+        self.future = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def set(self):
+        with self._lock:
+            if self._closed:
+                return
+            with open(self.path, "w"):
+                pass
+        if self.future is not None:
+            self.future.cancel()
+
+    def close(self):
+        """Called when the posture stage ends; a later set() is a no-op, so no marker file is left behind."""
+        with self._lock:
+            self._closed = True
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def _run_posture(video_path: str, session_id: Optional[str] = None, cancel: Optional[_PostureCancel] = None) -> tuple:
+    """Posture stage: never fails the session; errors are reported in the result. Returns (result, artifact run_id)."""
+    store = get_artifact_store()
+    run = None
     try:
-        audio_temp_path = _export_audio_to_temp(audio)
-        trans = transcribe_audio(audio_temp_path)
+        from posture_analyzer import analyze_video_file, analyze_video_sharded
+        # Annotated frames and charts go to this session's own run directory (see artifact_store)
+        run = store.create_run(session_id)
+        kwargs = {"output_dir": run["output_dir"], "url_base": run["url_base"]}
+        if SAVE_POSTURE_SERIES:
+            # Landmark series are kept so thresholds can be re-scored later (posture_analysis.series_id)
+            kwargs["series_dir"] = series_dir(run["run_id"])
+            store.attach_dir(run["run_id"], kwargs["series_dir"])
+        if cancel is not None:
+            kwargs["cancel_path"] = cancel.path
+        pool = _get_posture_pool()
+        if pool is None:
+            result = analyze_video_file(video_path, **kwargs)
+        elif POSTURE_SHARDS > 1:
+            result = analyze_video_sharded(video_path, pool, POSTURE_SHARDS, **kwargs)
+        else:
+            future = pool.submit(analyze_video_file, video_path, **kwargs)
+            if cancel is not None:
+                cancel.future = future
+            result = future.result()
+        return result, run["run_id"]
+    except Exception as e:
+        return {"error": str(e) or type(e).__name__}, None
     finally:
-        if audio_temp_path and os.path.isfile(audio_temp_path):
+        if cancel is not None:
+            cancel.close()
+        if run is not None:
             try:
-                os.unlink(audio_temp_path)
+                store.finish_run(run["run_id"])
             except Exception:
                 pass
 
-    transcript = (trans.get("transcript") or "").strip()
-    segments = trans.get("segments") or []
 
-    # Require sufficient transcript so feedback is from actual analysis, not generic templates
-    MIN_TRANSCRIPT_WORDS = 25
-    word_count = len(transcript.split()) if transcript else 0
-    if not transcript or word_count < MIN_TRANSCRIPT_WORDS:
+def _copy_posture(posture: dict, source_run_id: Optional[str], session_id: Optional[str]) -> tuple:
+    """
+    A cached posture result moved into a new artifact run for this session: images (and the saved series)
+    are copied, URLs and series_id point at the copy. Returns (result, run_id), or None if the source run
+    has been evicted, so the caller re-runs posture instead of serving dead URLs.
+    """
+    store = get_artifact_store()
+    run = store.copy_run(source_run_id, session_id) if source_run_id else None
+    if run is None:
+        return None
+    try:
+        def rebase(url):
+            return f"{run['url_base']}/{url.rsplit('/', 1)[-1]}" if url else url
+
+        posture = dict(posture)
+        posture["annotated_images"] = [rebase(url) for url in posture.get("annotated_images") or []]
+        posture["heatmap"] = rebase(posture.get("heatmap"))
+        posture["occupancy_heatmap"] = rebase(posture.get("occupancy_heatmap"))
+        if posture.get("series_id"):
+            target = series_dir(run["run_id"])
+            store.attach_dir(run["run_id"], target)
+            copy_series(series_dir(posture["series_id"]), target, run=posture)
+            posture["series_id"] = run["run_id"]
+        return posture, run["run_id"]
+    except Exception:
+        return None
+    finally:
+        try:
+            store.finish_run(run["run_id"])
+        except Exception:
+            pass
+
+
+def _audio_fingerprint(audio: np.ndarray) -> str:
+    """sha256 of the decoded PCM plus its format."""
+    h = hashlib.sha256()
+    h.update(f"f32le:{AUDIO_SAMPLE_RATE}:1:".encode("ascii"))
+    h.update(np.ascontiguousarray(audio))
+    return h.hexdigest()
+
+
+def _transcription_mode() -> str:
+    return f"chunked:{WHISPER_CHUNK_MAX_SECONDS}" if WHISPER_CHUNKED else "single"
+
+
+def _transcript_cache_key(fingerprint: str) -> str:
+    return make_key("transcript", fingerprint, engine_cache_id(), _transcription_mode())
+
+
+def _transcribe_stage(audio: np.ndarray, metrics: dict) -> dict:
+    """Whisper directly on the decoded array; served from the transcript cache when possible."""
+    cache_key = _transcript_cache_key(_audio_fingerprint(audio))
+    cached = _transcript_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    if WHISPER_CHUNKED:
+        trans = transcribe_audio_chunked(audio, metrics.get("silence_intervals") or [])
+    else:
+        trans = transcribe_audio(audio)
+    _transcript_cache.put(cache_key, trans)
+    return trans
+
+
+def _content_stage(transcript: dict, metrics: dict) -> Optional[dict]:
+    """
+    Deterministic content analysis of the transcript. Returns None when the transcript is
+    too short to analyze (the pipeline then stops and returns a warning).
+    """
+    text = (transcript.get("transcript") or "").strip()
+    segments = transcript.get("segments") or []
+    word_count = len(text.split()) if text else 0
+    if not text or word_count < MIN_TRANSCRIPT_WORDS:
+        return None
+    duration_seconds = float(metrics.get("duration_seconds", 0))
+    return {
+        "transcript": text,
+        "segments": segments,
+        **analyze_transcript_content(text, segments, duration_seconds),
+    }
+
+
+def _feedback_stage(content: dict, metrics: dict) -> dict:
+    """Gemini feedback when GEMINI_API_KEY is set; otherwise (or on failure) rule-based."""
+    args = (
+        metrics,
+        content["content_insights"],
+        content["transcript"],
+        content["segment_insights"],
+        content["content_by_parts"],
+        content["key_phrases"],
+    )
+    feedback_result = _generate_feedback_with_gemini(*args)
+    if feedback_result is not None:
+        feedback_result["source"] = "gemini"
+    else:
+        feedback_result = generate_feedback(
+            metrics,
+            content_insights=content["content_insights"],
+            transcript=content["transcript"],
+            segment_insights=content["segment_insights"],
+            content_by_parts=content["content_by_parts"],
+            key_phrases=content["key_phrases"],
+        )
+        feedback_result["source"] = "rules"
+    return feedback_result
+
+
+def _semantic_stage(content: dict, metrics: dict) -> dict:
+    """Phase 4: semantic evaluation (LLM) for explainable, audit-safe feedback. Same input -> same output (temperature=0)."""
+    content_insights = content["content_insights"]
+    try:
+        from ai_evaluator import evaluate_teaching_semantics
+        eval_input = {
+            "transcript": content["transcript"],
+            "segments": [{"start": s.get("start"), "end": s.get("end"), "text": (s.get("text") or "").strip()} for s in content["segments"]],
+            "segment_insights": content["segment_insights"],
+            "metrics_audio": metrics,
+            "metrics_content": {
+                "question_count": content_insights.get("question_count", 0),
+                "example_count": content_insights.get("example_count", 0),
+                "structure_score": content_insights.get("structure_score", 0),
+                "interaction_score": content_insights.get("interaction_score", 0),
+            },
+            "duration_minutes": float(metrics.get("duration_seconds", 0)) / 60.0,
+        }
+        return evaluate_teaching_semantics(eval_input)
+    except Exception:
+        return {
+            "semantic_strengths": [],
+            "semantic_improvements": [],
+            "session_summary": "",
+            "reasoning_notes": "",
+        }
+
+
+def run_analysis(
+    video_path: Optional[str],
+    session_id: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    audio: Optional[np.ndarray] = None,
+    metrics: Optional[dict] = None,
+    audio_path: Optional[str] = None,
+) -> dict:
+    """
+    Full Phase-2 pipeline: extract audio -> transcribe (Whisper) -> audio metrics -> teaching content -> merged feedback.
+    If transcript is empty, returns warning and no scores (no fake feedback).
+    Same video -> same transcript -> same feedback. JSON only.
+    content_hash (sha256 of the file, see download_and_hash) enables the on-disk result cache:
+    a repeat of the same bytes returns the stored result with this session_id (cached=True).
+    audio/metrics: already decoded audio and its compute_metrics (see ingest_url); the audio and metrics
+    stages then return them instead of decoding video_path again.
+    audio_path: separate audio-only file (split YouTube ingest) decoded instead of video_path. video_path may
+    be None when there is no video (posture_analysis is then None, as with POSTURE_ENABLED=0).
+
+    Stages run as a graph so independent work overlaps:
+      audio -> metrics -> transcript (Whisper, chunked at silences if enabled) -> content
+              -> feedback (LLM) | semantic (LLM) in parallel
+      posture (separate process, needs only video_path)
+    Wall time is roughly max(audio branch, posture) instead of their sum.
+    """
+    cache_key = _result_cache_key(content_hash) if content_hash else None
+    if cache_key:
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            return _serve_cached(cache_key, cached, video_path, session_id)
+
+    out = _run_stages(video_path, session_id, audio, metrics, audio_path)
+    feedback_source = out.pop("feedback_source", None)
+    posture_run_id = out.pop("posture_run_id", None)
+    if cache_key and _is_cacheable(out, feedback_source):
+        _result_cache.put(cache_key, {**out, "posture_run_id": posture_run_id})
+    out["cached"] = False
+    return out
+
+
+def _serve_cached(cache_key: str, cached: dict, video_path: Optional[str], session_id: Optional[str]) -> dict:
+    """
+    A result-cache hit for session_id. Posture artifacts belong to the run that produced them and may since
+    have been evicted, so each hit gets its own copy; if the source run is gone, posture alone is re-run.
+    The cache entry then points at the newest run, which the artifact store keeps longest.
+    """
+    source_run_id = cached.pop("posture_run_id", None)
+    posture = cached.get("posture_analysis")
+    if isinstance(posture, dict):
+        result = _copy_posture(posture, source_run_id, session_id)
+        if result is None and video_path is not None:
+            result = _run_posture(video_path, session_id)
+        posture, run_id = result if result is not None else (None, None)
+        cached["posture_analysis"] = posture
+        if run_id is not None and not posture.get("error"):
+            _result_cache.put(cache_key, {**cached, "posture_run_id": run_id})
+    cached["session_id"] = session_id
+    cached["cached"] = True
+    return cached
+
+
+def _run_stages(
+    video_path: Optional[str],
+    session_id: Optional[str],
+    audio: Optional[np.ndarray] = None,
+    metrics: Optional[dict] = None,
+    audio_path: Optional[str] = None,
+) -> dict:
+    """Build and run the stage graph for one video (no caching)."""
+    graph = StageGraph()
+    run_posture = POSTURE_ENABLED and video_path is not None
+    if run_posture:
+        # Stopped if the transcript gate ends the run, so it does not hold a posture worker for nothing
+        cancel = _PostureCancel()
+        graph.add("posture", partial(_run_posture, video_path, session_id, cancel), on_cancel=cancel.set)
+    if audio is not None:
+        graph.add("audio", lambda: audio)
+    else:
+        graph.add("audio", partial(extract_audio, audio_path or video_path))
+    if audio is not None and metrics is not None:
+        graph.add("metrics", lambda: metrics)
+    else:
+        graph.add("metrics", compute_metrics, deps=("audio",))
+    graph.add("transcript", _transcribe_stage, deps=("audio", "metrics"))
+    graph.add("content", _content_stage, deps=("transcript", "metrics"), stop_if=lambda c: c is None)
+    graph.add("feedback", _feedback_stage, deps=("content", "metrics"))
+    graph.add("semantic", _semantic_stage, deps=("content", "metrics"))
+    results = graph.run()
+
+    metrics_audio = {k: v for k, v in results["metrics"].items() if k not in VAD_KEYS}
+    content = results["content"]
+    if content is None:
+        transcript = (results["transcript"].get("transcript") or "").strip()
+        word_count = len(transcript.split()) if transcript else 0
         warning = (
             "Empty transcript. No scores generated."
             if not transcript
@@ -812,32 +1648,12 @@ def run_analysis(video_path: str, session_id: Optional[str] = None) -> dict:
             "recommendations": [],
             "metrics": {"audio": metrics_audio, "content": {}},
             "semantic_feedback": None,
+            "timings": graph.timings,
         }
+    transcript = content["transcript"]
     transcript_summary = transcript[:500] + ("..." if len(transcript) > 500 else "")
 
-    content_insights = analyze_teaching_content(transcript, duration_seconds)
-    segment_insights = analyze_segments(segments)
-    content_by_parts = analyze_content_by_parts(transcript, segments, duration_seconds)
-    key_phrases = extract_key_phrases(transcript)
-
-    # Use Gemini for feedback when GEMINI_API_KEY is set; otherwise rule-based
-    feedback_result = _generate_feedback_with_gemini(
-        metrics_audio,
-        content_insights,
-        transcript,
-        segment_insights,
-        content_by_parts,
-        key_phrases,
-    )
-    if feedback_result is None:
-        feedback_result = generate_feedback(
-            metrics_audio,
-            content_insights=content_insights,
-            transcript=transcript,
-            segment_insights=segment_insights,
-            content_by_parts=content_by_parts,
-            key_phrases=key_phrases,
-        )
+    feedback_result = results["feedback"]
     scores = {
         "pedagogy_score": feedback_result["pedagogy_score"],
         "engagement_score": feedback_result["engagement_score"],
@@ -845,43 +1661,10 @@ def run_analysis(video_path: str, session_id: Optional[str] = None) -> dict:
         "curriculum_score": feedback_result["curriculum_score"],
         "feedback": feedback_result["feedback"],
     }
-    metrics_content = dict(content_insights)
-    metrics_content["by_parts"] = content_by_parts
-    metrics_content["segment_count"] = len(segment_insights)
-    metrics_content["key_phrases"] = key_phrases
-
-    # Phase 4: semantic evaluation (LLM) for explainable, audit-safe feedback. Same input -> same output (temperature=0).
-    semantic_feedback = None
-    try:
-        from ai_evaluator import evaluate_teaching_semantics
-        eval_input = {
-            "transcript": transcript,
-            "segments": [{"start": s.get("start"), "end": s.get("end"), "text": (s.get("text") or "").strip()} for s in segments],
-            "metrics_audio": metrics_audio,
-            "metrics_content": {
-                "question_count": content_insights.get("question_count", 0),
-                "example_count": content_insights.get("example_count", 0),
-                "structure_score": content_insights.get("structure_score", 0),
-                "interaction_score": content_insights.get("interaction_score", 0),
-            },
-            "duration_minutes": duration_seconds / 60.0,
-        }
-        semantic_feedback = evaluate_teaching_semantics(eval_input)
-    except Exception:
-        semantic_feedback = {
-            "semantic_strengths": [],
-            "semantic_improvements": [],
-            "session_summary": "",
-            "reasoning_notes": "",
-        }
-
-    # Posture analysis integration
-    try:
-        from posture_analyzer import PostureAnalyzer
-        posture_analyzer = PostureAnalyzer()
-        posture_results = posture_analyzer.analyze_video(video_path)
-    except Exception as e:
-        posture_results = {"error": str(e)}
+    metrics_content = dict(content["content_insights"])
+    metrics_content["by_parts"] = content["content_by_parts"]
+    metrics_content["segment_count"] = len(content["segment_insights"])
+    metrics_content["key_phrases"] = content["key_phrases"]
 
     out = build_session_output(
         session_id=session_id,
@@ -893,6 +1676,8 @@ def run_analysis(video_path: str, session_id: Optional[str] = None) -> dict:
         metrics_audio=metrics_audio,
         metrics_content=metrics_content,
     )
-    out["semantic_feedback"] = semantic_feedback
-    out["posture_analysis"] = posture_results
+    out["semantic_feedback"] = results["semantic"]
+    out["posture_analysis"], out["posture_run_id"] = results["posture"] if run_posture else (None, None)
+    out["timings"] = graph.timings
+    out["feedback_source"] = feedback_result["source"]
     return out
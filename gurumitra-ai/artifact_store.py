@@ -0,0 +1,269 @@
+"""
+GuruMitra artifact store: per-session output directories (annotated frames, charts) with an index.
+Each posture run writes into ARTIFACTS_DIR/<session_id>/<run_id>/, so concurrent sessions never overwrite
+each other's files. Runs are recorded in a small SQLite index (never a directory scan) and evicted
+oldest-first once total size exceeds ARTIFACTS_MAX_MB or a run is older than ARTIFACTS_MAX_AGE_HOURS.
+Runs still being written (other sessions) are never evicted, unless unfinished for ARTIFACTS_STALE_RUN_HOURS.
+Public URLs are built from PUBLIC_BASE_URL (the address clients use to reach this service).
+"""
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+_here = os.path.dirname(os.path.abspath(__file__))
+
+# Served at STATIC_URL_PATH by main.py
+ARTIFACTS_DIR = os.path.abspath(os.environ.get("POSTURE_OUTPUTS_DIR") or os.path.join(_here, "posture_outputs"))
+STATIC_URL_PATH = "/static/posture_outputs"
+# Kept outside ARTIFACTS_DIR so it is not publicly served
+ARTIFACTS_INDEX_PATH = os.environ.get("ARTIFACTS_INDEX_PATH") or os.path.join(_here, ".cache", "artifacts.sqlite3")
+ARTIFACTS_MAX_MB = int(os.environ.get("ARTIFACTS_MAX_MB", "1024"))
+ARTIFACTS_MAX_AGE_HOURS = float(os.environ.get("ARTIFACTS_MAX_AGE_HOURS", "72"))
+# Unfinished runs older than this are treated as crashed and evicted
+ARTIFACTS_STALE_RUN_HOURS = float(os.environ.get("ARTIFACTS_STALE_RUN_HOURS", "24"))
+PUBLIC_BASE_URL = (os.environ.get("PUBLIC_BASE_URL") or "http://localhost:8000").rstrip("/")
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def _safe_session(session_id: Optional[str]) -> str:
+    """Session ids come from clients; keep them to one plain path component."""
+    name = _SAFE_NAME.sub("-", session_id or "").strip("-")[:64]
+    return name or "anonymous"
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ArtifactStore:
+    """
+    create_run() reserves a run directory (and records it, so crashed runs are still evicted once stale);
+    finish_run() records its final size, marks the run finished and evicts. Only finished runs count as
+    evictable, so one session finishing never deletes another session's run while it is being written. Extra directories (e.g. the run's saved posture
+    series) can be attached to a run and are deleted with it. copy_run() gives another session its own
+    copy of a run (result-cache hits).
+    """
+
+    def __init__(
+        self,
+        directory: str = ARTIFACTS_DIR,
+        index_path: str = ARTIFACTS_INDEX_PATH,
+        max_bytes: int = ARTIFACTS_MAX_MB * 1024 * 1024,
+        max_age_seconds: Optional[float] = ARTIFACTS_MAX_AGE_HOURS * 3600,
+        stale_seconds: Optional[float] = ARTIFACTS_STALE_RUN_HOURS * 3600,
+        base_url: str = PUBLIC_BASE_URL,
+    ):
+        self.directory = directory
+        self.index_path = index_path
+        self.max_bytes = int(max_bytes)
+        self.max_age_seconds = max_age_seconds if max_age_seconds and max_age_seconds > 0 else None
+        self.stale_seconds = stale_seconds if stale_seconds and stale_seconds > 0 else None
+        self.base_url = base_url.rstrip("/")
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def create_run(self, session_id: Optional[str], extra_dirs: Iterable[str] = ()) -> dict:
+        """Reserve <directory>/<session>/<run_id>/. Returns {run_id, session_id, output_dir, url_base}."""
+        session = _safe_session(session_id)
+        run_id = uuid.uuid4().hex
+        output_dir = os.path.join(self.directory, session, run_id)
+        os.makedirs(output_dir, exist_ok=True)
+        with self._db() as db:
+            db.execute(
+                "INSERT INTO runs (run_id, session_id, created_at, bytes, dirs) VALUES (?, ?, ?, 0, ?)",
+                (run_id, session, time.time(), json.dumps([output_dir, *extra_dirs])),
+            )
+        return {
+            "run_id": run_id,
+            "session_id": session,
+            "output_dir": output_dir,
+            "url_base": f"{self.base_url}{STATIC_URL_PATH}/{session}/{run_id}",
+        }
+
+    def copy_run(self, run_id: str, session_id: Optional[str]) -> Optional[dict]:
+        """
+        New run for session_id holding a copy of run_id's output files, like create_run() (the caller
+        finishes it with finish_run()). None if run_id has been evicted or its directory is gone.
+        """
+        with self._db() as db:
+            row = db.execute("SELECT dirs FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        source = json.loads(row[0])[0] if row is not None else None
+        if source is None or not os.path.isdir(source):
+            return None
+        run = self.create_run(session_id)
+        try:
+            shutil.copytree(source, run["output_dir"], dirs_exist_ok=True)
+        except OSError:
+            shutil.rmtree(run["output_dir"], ignore_errors=True)
+            with self._db() as db:
+                db.execute("DELETE FROM runs WHERE run_id = ?", (run["run_id"],))
+            return None
+        return run
+
+    def attach_dir(self, run_id: str, path: str):
+        """Delete path together with the run (e.g. its saved posture series)."""
+        with self._db() as db:
+            row = db.execute("SELECT dirs FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is not None:
+                dirs = json.loads(row[0])
+                if path not in dirs:
+                    dirs.append(path)
+                db.execute("UPDATE runs SET dirs = ? WHERE run_id = ?", (json.dumps(dirs), run_id))
+
+    def finish_run(self, run_id: str):
+        """Record the run's size on disk, then evict over-budget/expired runs."""
+        with self._db() as db:
+            row = db.execute("SELECT dirs FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is not None:
+                size = sum(_dir_size(d) for d in json.loads(row[0]) if os.path.isdir(d))
+                db.execute("UPDATE runs SET bytes = ?, finished_at = ? WHERE run_id = ?", (size, time.time(), run_id))
+            self._evict_locked(db, keep=run_id)
+
+    def evict(self):
+        """Drop expired and stale runs and the oldest runs beyond max_bytes (also called at startup)."""
+        with self._db() as db:
+            self._evict_locked(db)
+
+    def list_runs(self, session_id: Optional[str] = None, limit: int = 100) -> list:
+        """Newest runs first (optionally for one session), with their files and URLs."""
+        query = "SELECT run_id, session_id, created_at, bytes, dirs FROM runs"
+        args = []
+        if session_id is not None:
+            query += " WHERE session_id = ?"
+            args.append(_safe_session(session_id))
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(int(limit))
+        with self._db() as db:
+            rows = db.execute(query, args).fetchall()
+        runs = []
+        for run_id, session, created_at, size, dirs in rows:
+            output_dir = json.loads(dirs)[0]
+            try:
+                files = sorted(os.listdir(output_dir))
+            except OSError:
+                files = []
+            url_base = f"{self.base_url}{STATIC_URL_PATH}/{session}/{run_id}"
+            runs.append({
+                "run_id": run_id,
+                "session_id": session,
+                "created_at": created_at,
+                "bytes": size,
+                "files": [{"name": f, "url": f"{url_base}/{f}"} for f in files],
+            })
+        return runs
+
+    def stats(self) -> dict:
+        with self._db() as db:
+            runs, total = db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM runs").fetchone()
+        return {
+            "directory": self.directory,
+            "runs": runs,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age_seconds,
+            "evicted": self.evicted,
+        }
+
+    @contextmanager
+    def _db(self):
+        """Serialized connection per operation; commits on success, always closes."""
+        with self._lock:
+            db = self._connect()
+            try:
+                with db:
+                    yield db
+            finally:
+                db.close()
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            os.makedirs(self.directory, exist_ok=True)
+        db = sqlite3.connect(self.index_path, timeout=30)
+        if not self._initialized:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_id TEXT PRIMARY KEY, session_id TEXT NOT NULL, created_at REAL NOT NULL, "
+                "bytes INTEGER NOT NULL, dirs TEXT NOT NULL, finished_at REAL)"
+            )
+            if "finished_at" not in {row[1] for row in db.execute("PRAGMA table_info(runs)")}:
+                # Index from before finished_at: its runs belong to earlier processes
+                db.execute("ALTER TABLE runs ADD COLUMN finished_at REAL")
+                db.execute("UPDATE runs SET finished_at = created_at")
+                db.commit()
+            db.execute("CREATE INDEX IF NOT EXISTS runs_session ON runs (session_id, created_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at)")
+            self._initialized = True
+        return db
+
+    def _remove_locked(self, db, run_id: str, dirs: str):
+        for d in json.loads(dirs):
+            shutil.rmtree(d, ignore_errors=True)
+        # Drop the session directory once its last run is gone
+        session_dir = os.path.dirname(json.loads(dirs)[0])
+        try:
+            os.rmdir(session_dir)
+        except OSError:
+            pass
+        db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        self.evicted += 1
+
+    def _evict_locked(self, db, keep: Optional[str] = None):
+        now = time.time()
+        if self.max_age_seconds:
+            for run_id, dirs in db.execute(
+                "SELECT run_id, dirs FROM runs WHERE finished_at IS NOT NULL AND created_at < ?",
+                (now - self.max_age_seconds,),
+            ).fetchall():
+                if run_id != keep:
+                    self._remove_locked(db, run_id, dirs)
+        if self.stale_seconds:
+            for run_id, dirs in db.execute(
+                "SELECT run_id, dirs FROM runs WHERE finished_at IS NULL AND created_at < ?",
+                (now - self.stale_seconds,),
+            ).fetchall():
+                if run_id != keep:
+                    self._remove_locked(db, run_id, dirs)
+        if self.max_bytes <= 0:
+            return
+        total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM runs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for run_id, size, dirs in db.execute(
+            "SELECT run_id, bytes, dirs FROM runs WHERE finished_at IS NOT NULL ORDER BY created_at"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            if run_id == keep:
+                continue
+            self._remove_locked(db, run_id, dirs)
+            total -= size
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ArtifactStore:
+    """Process-wide store configured from the environment."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
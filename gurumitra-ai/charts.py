@@ -0,0 +1,133 @@
+"""
+GuruMitra charts: small PNG charts rendered with NumPy + OpenCV (no matplotlib).
+Every function draws into its own image buffer (no global figure state), so rendering is safe from
+worker threads/processes and takes a few milliseconds.
+- line_chart: a series over frames (movement dynamics).
+- occupancy_heatmap: where the teacher stood in the frame, from landmark positions.
+"""
+import cv2
+import numpy as np
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GRID = (225, 225, 225)
+LINE = (180, 119, 31)  # BGR of the usual blue chart line
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.3g}"
+
+
+def _centered_text(image, text, center_x, y, scale=0.5, thickness=1):
+    (w, _h), _ = cv2.getTextSize(text, FONT, scale, thickness)
+    cv2.putText(image, text, (int(center_x - w / 2), y), FONT, scale, BLACK, thickness, cv2.LINE_AA)
+
+
+def line_chart(values, path, title="", xlabel="", ylabel="", size=(640, 480), ticks=5) -> bool:
+    """
+    Write a line chart of values (index on x) to path. Long series are drawn as a per-pixel min/max
+    envelope, so spikes stay visible. Returns False if there is nothing to draw.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    y = y[np.isfinite(y)]
+    if not len(y):
+        return False
+    width, height = size
+    left, right, top, bottom = 85, 20, 40, 50
+    plot_w, plot_h = width - left - right, height - top - bottom
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    y_min, y_max = float(y.min()), float(y.max())
+    if y_max == y_min:
+        y_min, y_max = y_min - 0.5, y_max + 0.5
+    pad = (y_max - y_min) * 0.05
+    y_min, y_max = y_min - pad, y_max + pad
+    n = len(y)
+
+    def to_px(ix, iy):
+        px = left + (ix / max(1, n - 1)) * plot_w
+        py = top + (1 - (iy - y_min) / (y_max - y_min)) * plot_h
+        return px, py
+
+    # Grid and tick labels
+    for i in range(ticks + 1):
+        value = y_min + (y_max - y_min) * i / ticks
+        _, py = to_px(0, value)
+        cv2.line(image, (left, int(py)), (left + plot_w, int(py)), GRID, 1)
+        cv2.putText(image, _fmt(value), (22, int(py) + 4), FONT, 0.4, BLACK, 1, cv2.LINE_AA)
+        frame = (n - 1) * i / ticks
+        px, _ = to_px(frame, y_min)
+        cv2.line(image, (int(px), top + plot_h), (int(px), top + plot_h + 4), BLACK, 1)
+        _centered_text(image, str(int(round(frame))), px, top + plot_h + 18, 0.4)
+    cv2.rectangle(image, (left, top), (left + plot_w, top + plot_h), BLACK, 1)
+
+    if n > plot_w:
+        # Min/max per pixel column
+        columns = np.minimum((np.arange(n) * plot_w) // n, plot_w - 1)
+        lo = np.full(plot_w, np.inf)
+        hi = np.full(plot_w, -np.inf)
+        np.minimum.at(lo, columns, y)
+        np.maximum.at(hi, columns, y)
+        used = np.isfinite(lo)
+        xs = left + np.arange(plot_w)[used]
+        lo_py = top + (1 - (lo[used] - y_min) / (y_max - y_min)) * plot_h
+        hi_py = top + (1 - (hi[used] - y_min) / (y_max - y_min)) * plot_h
+        for x, a, b in zip(xs, lo_py, hi_py):
+            cv2.line(image, (int(x), int(round(a))), (int(x), int(round(b))), LINE, 1)
+        points = np.stack([xs, (lo_py + hi_py) / 2], axis=1)
+    else:
+        px, py = to_px(np.arange(n), y)
+        points = np.stack([px, py], axis=1)
+    cv2.polylines(image, [np.round(points).astype(np.int32).reshape(-1, 1, 2)], False, LINE, 1, cv2.LINE_AA)
+
+    if title:
+        _centered_text(image, title, width / 2, 25, 0.6)
+    if xlabel:
+        _centered_text(image, xlabel, left + plot_w / 2, height - 10)
+    if ylabel:
+        rotated = np.full((40, plot_h, 3), 255, dtype=np.uint8)
+        _centered_text(rotated, ylabel, plot_h / 2, 25)
+        label = cv2.rotate(rotated, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        image[top:top + plot_h, 0:16] = np.minimum(image[top:top + plot_h, 0:16], label[:, 12:28])
+    return bool(cv2.imwrite(path, image))
+
+
+def occupancy_grid(points, bins=(32, 18)):
+    """2D histogram of normalized (x, y) positions over the frame: (bins_y, bins_x) counts, off-frame clipped."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    pts = pts[np.all(np.isfinite(pts), axis=1)]
+    grid, _, _ = np.histogram2d(
+        np.clip(pts[:, 1], 0, 1 - 1e-9), np.clip(pts[:, 0], 0, 1 - 1e-9),
+        bins=(bins[1], bins[0]), range=((0, 1), (0, 1)),
+    )
+    return grid
+
+
+def occupancy_heatmap(points, path, frame_size=None, title="Teacher position", width=640) -> bool:
+    """
+    Write a heatmap of where normalized (x, y) points (e.g. torso centres per frame) fall in the frame.
+    frame_size: (w, h) of the video, for the aspect ratio (16:9 if unknown). Returns False if no points.
+    """
+    fw, fh = frame_size if frame_size and all(frame_size) else (16, 9)
+    aspect = fh / fw
+    bins_x = 32
+    bins_y = max(1, int(round(bins_x * aspect)))
+    grid = occupancy_grid(points, (bins_x, bins_y))
+    if grid.sum() == 0:
+        return False
+    # Share of time per cell, smoothed so single-frame visits show as soft blobs
+    share = cv2.GaussianBlur(grid / grid.sum(), (0, 0), sigmaX=1.0)
+    norm = np.uint8(np.round(255 * share / share.max()))
+    height = int(round(width * aspect))
+    heat = cv2.applyColorMap(cv2.resize(norm, (width, height), interpolation=cv2.INTER_CUBIC), cv2.COLORMAP_JET)
+    # Mark never-visited area as pale so the occupied region stands out
+    empty = cv2.resize(norm, (width, height), interpolation=cv2.INTER_LINEAR) < 3
+    heat[empty] = (245, 235, 230)
+    # Thirds of the frame as orientation guides (left / centre / right of the board)
+    for i in (1, 2):
+        cv2.line(heat, (width * i // 3, 0), (width * i // 3, height), WHITE, 1)
+        cv2.line(heat, (0, height * i // 3), (width, height * i // 3), WHITE, 1)
+    header = np.full((36, width, 3), 255, dtype=np.uint8)
+    _centered_text(header, title, width / 2, 24, 0.6)
+    return bool(cv2.imwrite(path, np.vstack([header, heat])))
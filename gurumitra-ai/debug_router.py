@@ -1,19 +1,26 @@
+from typing import Optional
+
 from fastapi import APIRouter
-from pathlib import Path
+
+import llm_client
+from artifact_store import get_store
 
 router = APIRouter()
 
 @router.get("/debug/list_posture_outputs")
-def list_posture_outputs():
-    folder = Path(__file__).parent / "posture_outputs"
-    abs_path = str(folder.resolve())
-    if not folder.exists():
-        return {"error": "posture_outputs directory does not exist", "abs_path": abs_path}
-    files = [f.name for f in folder.iterdir() if f.is_file()]
-    return {"files": files, "abs_path": abs_path}
+def list_posture_outputs(session_id: Optional[str] = None, limit: int = 100):
+    """Recent posture runs from the artifact index (newest first), optionally for one session."""
+    store = get_store()
+    return {"runs": store.list_runs(session_id=session_id, limit=limit), "stats": store.stats()}
 
 
 @router.get("/debug/static_posture_outputs_path")
 def static_posture_outputs_path():
     from main import POSTURE_OUTPUTS_DIR
     return {"POSTURE_OUTPUTS_DIR": POSTURE_OUTPUTS_DIR}
+
+
+@router.get("/debug/llm")
+def llm_stats():
+    """Gemini calls made by this process (shared client): count, failures, total seconds, response-cache hits/misses."""
+    return llm_client.stats()
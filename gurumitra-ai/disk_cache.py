@@ -0,0 +1,175 @@
+"""
+GuruMitra disk cache: persistent JSON key-value store with size-bounded LRU eviction and optional max age.
+Used to skip repeat work that is deterministic for the same input (analysis results per video file).
+Safe across threads; writes are atomic (temp file + rename) so concurrent workers never read partial entries.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Optional
+
+
+def make_key(*parts) -> str:
+    """Stable sha256 key from parts (strings, numbers, None). Order matters."""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(str(p).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _json_default(obj):
+    # numpy scalars/arrays in analysis output
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class DiskCache:
+    """
+    One JSON file per entry under directory/<key[:2]>/<key>.json.
+    max_bytes <= 0 disables the cache (get -> None, put -> no-op).
+    Least recently used entries are evicted once total size exceeds max_bytes;
+    entries older than max_age_seconds (if set) are treated as misses and removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_age_seconds: Optional[float] = None):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.max_age_seconds = max_age_seconds if max_age_seconds and max_age_seconds > 0 else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index = None  # key -> {"size", "used", "created"}; loaded on first use
+        self._total = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value or None. A hit refreshes the entry's LRU position."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        with self._lock:
+            self._load_index_locked()
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    envelope = json.load(f)
+            except (OSError, ValueError):
+                self._remove_locked(key)
+                self.misses += 1
+                return None
+            created = float(envelope.get("created_at") or entry["created"])
+            if self.max_age_seconds and time.time() - created > self.max_age_seconds:
+                self._remove_locked(key)
+                self.misses += 1
+                return None
+            now = time.time()
+            entry["used"] = now
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            self.hits += 1
+            return envelope.get("value")
+
+    def put(self, key: str, value: Any):
+        """Store value (must be JSON-serializable; numpy scalars are converted). Evicts LRU entries over budget."""
+        if not self.enabled:
+            return
+        now = time.time()
+        data = json.dumps({"created_at": now, "value": value}, default=_json_default).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._load_index_locked()
+            old = self._index.get(key)
+            if old:
+                self._total -= old["size"]
+            self._index[key] = {"size": len(data), "used": now, "created": now}
+            self._total += len(data)
+            self._evict_locked()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._index) if self._index is not None else None
+            return {
+                "enabled": self.enabled,
+                "directory": self.directory,
+                "entries": entries,
+                "bytes": self._total if self._index is not None else None,
+                "max_bytes": self.max_bytes,
+                "max_age_seconds": self.max_age_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _load_index_locked(self):
+        """Scan the directory once per process; afterwards the in-memory index is authoritative."""
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total = 0
+        if not os.path.isdir(self.directory):
+            return
+        for sub in os.listdir(self.directory):
+            sub_dir = os.path.join(self.directory, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(sub_dir, name))
+                except OSError:
+                    continue
+                key = name[: -len(".json")]
+                self._index[key] = {"size": st.st_size, "used": st.st_mtime, "created": st.st_mtime}
+                self._total += st.st_size
+        self._evict_locked()
+
+    def _remove_locked(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total -= entry["size"]
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_locked(self):
+        if self.max_age_seconds:
+            cutoff = time.time() - self.max_age_seconds
+            for key in [k for k, e in self._index.items() if e["created"] < cutoff]:
+                self._remove_locked(key)
+        if self._total <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda kv: kv[1]["used"]):
+            if self._total <= self.max_bytes:
+                break
+            self._remove_locked(key)
@@ -0,0 +1,346 @@
+"""
+GuruMitra downloader: fetches lecture videos from direct HTTP(S) URLs into a temp file.
+- One pooled requests.Session per process: keep-alive connections are reused across jobs and segments.
+- Servers that accept byte ranges are fetched as DOWNLOAD_SEGMENTS parallel Range requests once the file
+  is at least DOWNLOAD_PARALLEL_MIN_MB; other files stream in a single request.
+- A dropped connection resumes from the last byte written (Range: bytes=<n>-) instead of starting over;
+  without range support the stream restarts from zero. Up to DOWNLOAD_RETRIES failures in a row are retried.
+- DOWNLOAD_MAX_MB and DOWNLOAD_MAX_SECONDS bound every download (Content-Length is checked up front, received
+  bytes while streaming), so a hostile URL cannot fill the disk or hold a worker forever.
+download() returns the path, the sha256 of the bytes and throughput stats, so download time is reported
+separately from analysis time. A sink (e.g. analyzer.AudioStreamDecoder) can receive the bytes in file order
+while they are written, so decoding overlaps the transfer.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Largest file accepted (0 = no limit)
+DOWNLOAD_MAX_MB = float(os.environ.get("DOWNLOAD_MAX_MB", "4096"))
+# Wall-clock limit for one download, retries included (0 = no limit)
+DOWNLOAD_MAX_SECONDS = float(os.environ.get("DOWNLOAD_MAX_SECONDS", "1800"))
+# Parallel Range requests per file (1 = always a single stream)
+DOWNLOAD_SEGMENTS = max(1, int(os.environ.get("DOWNLOAD_SEGMENTS", "4")))
+# Files smaller than this are fetched in one request even if ranges are supported
+DOWNLOAD_PARALLEL_MIN_MB = float(os.environ.get("DOWNLOAD_PARALLEL_MIN_MB", "32"))
+# Consecutive failures (without progress) retried per stream/segment
+DOWNLOAD_RETRIES = max(0, int(os.environ.get("DOWNLOAD_RETRIES", "3")))
+# Connect/read timeout for each request (a stalled read counts as a failure and is resumed)
+DOWNLOAD_TIMEOUT_SECONDS = float(os.environ.get("DOWNLOAD_TIMEOUT_SECONDS", "60"))
+
+# Small enough that little is lost (re-fetched) when a connection drops mid-chunk
+CHUNK_SIZE = 1 << 16
+_MB = 1024 * 1024
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)", re.IGNORECASE)
+
+
+class DownloadError(RuntimeError):
+    """Download failed, or exceeded DOWNLOAD_MAX_MB / DOWNLOAD_MAX_SECONDS."""
+
+
+class _Transient(Exception):
+    """Retryable failure: 5xx/429, or the body ended before the expected length."""
+
+
+class _RangeUnsupported(Exception):
+    """Server ignored a Range request."""
+
+
+_RETRYABLE = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, _Transient)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide session with a connection pool sized for parallel segments."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max(8, DOWNLOAD_SEGMENTS * 4))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.max_redirects = 5
+            # Byte offsets must match the file on the server, so no transparent compression
+            session.headers["Accept-Encoding"] = "identity"
+            _session = session
+        return _session
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """sha256 hex digest of a file's bytes."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class _Progress:
+    """Shared by a download's segment threads: deadline, cancellation and counters."""
+
+    def __init__(self, max_bytes: int, max_seconds: float):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.deadline = time.monotonic() + max_seconds if max_seconds > 0 else None
+        self.cancelled = threading.Event()
+        self.transferred = 0
+        self.resumes = 0
+        self._lock = threading.Lock()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise DownloadError("download cancelled")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise DownloadError(f"download exceeded DOWNLOAD_MAX_SECONDS ({self.max_seconds:g}s)")
+
+    def check_size(self, size: int):
+        if self.max_bytes > 0 and size > self.max_bytes:
+            raise DownloadError(f"video exceeds DOWNLOAD_MAX_MB ({self.max_bytes / _MB:g} MB)")
+
+    def received(self, n: int):
+        with self._lock:
+            self.transferred += n
+
+    def retry(self, attempt: int, error: Exception, what: str):
+        """Count a retry and back off, or raise once attempts are used up."""
+        if attempt > DOWNLOAD_RETRIES:
+            raise DownloadError(f"{what} failed after {DOWNLOAD_RETRIES} retries: {error}") from error
+        with self._lock:
+            self.resumes += 1
+        delay = min(8.0, 0.5 * 2 ** (attempt - 1))
+        if self.deadline is not None:
+            delay = min(delay, max(0.0, self.deadline - time.monotonic()))
+        self.cancelled.wait(delay)
+        self.check()
+
+
+def _get(session, url: str, start: int = 0, end: Optional[int] = None):
+    """GET url from byte start (end exclusive) as a stream. Raises _Transient on 5xx/429, HTTPError on 4xx."""
+    headers = {}
+    if start or end is not None:
+        headers["Range"] = f"bytes={start}-" + ("" if end is None else str(end - 1))
+    resp = session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS)
+    if resp.status_code == 429 or resp.status_code >= 500:
+        resp.close()
+        raise _Transient(f"HTTP {resp.status_code}")
+    resp.raise_for_status()
+    if headers:
+        match = _CONTENT_RANGE.match(resp.headers.get("Content-Range", ""))
+        if resp.status_code != 206 or not match or int(match.group(1)) != start:
+            resp.close()
+            raise _RangeUnsupported()
+    return resp
+
+
+def _write_body(resp, f, pos: int, end: Optional[int], progress: _Progress, hasher=None, sink=None) -> int:
+    """Write resp's body at pos (end exclusive, None = unknown length). Returns the new position."""
+    f.seek(pos)
+    for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+        progress.check()
+        if not chunk:
+            continue
+        if end is not None and pos + len(chunk) > end:
+            raise DownloadError("server sent more bytes than requested")
+        f.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+        if sink is not None:
+            sink.write(chunk)
+        pos += len(chunk)
+        progress.received(len(chunk))
+        progress.check_size(pos)
+    return pos
+
+
+def _fetch_segment(session, url: str, path: str, start: int, end: int, progress: _Progress):
+    """Fetch [start, end) into path, resuming from the last written byte after a failure."""
+    pos, attempt = start, 0
+    with open(path, "r+b") as f:
+        while pos < end:
+            progress.check()
+            attempt_start = pos
+            f.seek(pos)
+            try:
+                with _get(session, url, pos, end) as resp:
+                    pos = _write_body(resp, f, pos, end, progress)
+                if pos < end:
+                    raise _Transient("connection closed early")
+            except _RETRYABLE as e:
+                pos = f.tell()  # bytes written before the failure are kept
+                attempt = 1 if pos > attempt_start else attempt + 1
+                progress.retry(attempt, e, f"segment {start}-{end - 1}")
+
+
+def _fetch_parallel(session, url: str, path: str, length: int, segments: int, progress: _Progress):
+    with open(path, "wb") as f:
+        f.truncate(length)
+    bounds = [length * i // segments for i in range(segments + 1)]
+    with ThreadPoolExecutor(max_workers=segments, thread_name_prefix="download") as pool:
+        futures = [
+            pool.submit(_fetch_segment, session, url, path, bounds[i], bounds[i + 1], progress)
+            for i in range(segments)
+            if bounds[i] < bounds[i + 1]
+        ]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            # Other segments stop at their next chunk; leaving the pool joins them before this propagates
+            progress.cancelled.set()
+            raise
+
+
+def _fetch_stream(session, url: str, path: str, resp, length: Optional[int], ranges: bool, progress: _Progress, sink=None) -> str:
+    """
+    Stream into path (resp: an already open response, or None). Resumes with Range if supported. Returns sha256.
+    A restart from zero discards the sink (it has already seen the first bytes).
+    """
+    hasher = hashlib.sha256()
+    pos, attempt = 0, 0
+    with open(path, "wb") as f:
+        while True:
+            progress.check()
+            attempt_start = pos
+            try:
+                if resp is None:
+                    if pos and ranges:
+                        try:
+                            resp = _get(session, url, pos, length)
+                        except _RangeUnsupported:
+                            ranges = False
+                    if resp is None:
+                        # Restart from zero
+                        resp = _get(session, url)
+                        if pos and sink is not None:
+                            sink.discard()
+                            sink = None
+                        pos, hasher = 0, hashlib.sha256()
+                        f.seek(0)
+                        f.truncate()
+                with resp:
+                    pos = _write_body(resp, f, pos, length, progress, hasher, sink)
+                resp = None
+                if length is not None and pos < length:
+                    raise _Transient("connection closed early")
+                return hasher.hexdigest()
+            except _RETRYABLE as e:
+                resp = None
+                pos = f.tell()  # bytes written (and hashed) before the failure are kept
+                attempt = 1 if pos > attempt_start and ranges else attempt + 1
+                progress.retry(attempt, e, "download")
+
+
+def _content_length(resp) -> Optional[int]:
+    if resp.headers.get("Content-Encoding", "identity").lower() != "identity":
+        return None
+    try:
+        return int(resp.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+
+def read_head(url: str, nbytes: int = CHUNK_SIZE) -> Optional[bytes]:
+    """
+    First nbytes (or fewer) of url in one Range request, e.g. to sniff the container before choosing how
+    to download. None if the request fails or the server ignores ranges (nothing larger is fetched).
+    """
+    try:
+        with _get(get_session(), url, 0, nbytes) as resp:
+            head = b""
+            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                head += chunk
+                if len(head) >= nbytes:
+                    break
+            return head[:nbytes]
+    except (requests.RequestException, _Transient, _RangeUnsupported):
+        return None
+
+
+def download(
+    url: str,
+    max_bytes: Optional[int] = None,
+    max_seconds: float = DOWNLOAD_MAX_SECONDS,
+    segments: int = DOWNLOAD_SEGMENTS,
+    sink=None,
+) -> dict:
+    """
+    Download url to a temp file. Returns {"path", "sha256", "stats"}; the caller removes path.
+    stats: bytes, seconds, throughput_mb_per_s, segments, resumes and transferred_bytes (retries included).
+    sink: optional object with write(chunk) and discard(), given every byte once in file order
+    (the download then uses a single stream); discard() is called if the stream has to restart from zero.
+    Raises DownloadError (limits, retries exhausted) or requests.HTTPError (4xx).
+    """
+    if max_bytes is None:
+        max_bytes = int(DOWNLOAD_MAX_MB * _MB)
+    session = get_session()
+    t0 = time.perf_counter()
+    progress = _Progress(max_bytes, max_seconds)
+
+    attempt = 0
+    while True:
+        progress.check()
+        try:
+            resp = _get(session, url)
+            break
+        except _RETRYABLE as e:
+            attempt += 1
+            progress.retry(attempt, e, "download")
+    length = _content_length(resp)
+    if length is not None:
+        try:
+            progress.check_size(length)
+        except DownloadError:
+            resp.close()
+            raise
+    ranges = length is not None and resp.headers.get("Accept-Ranges", "").lower() == "bytes"
+    # Segments and resumes go to the final URL, so redirects are followed only once
+    final_url = resp.url
+    parallel = sink is None and ranges and segments > 1 and length >= DOWNLOAD_PARALLEL_MIN_MB * _MB
+
+    ext = Path(url.split("?")[0]).suffix or ".mp4"
+    fd, path = tempfile.mkstemp(suffix=ext)
+    os.close(fd)
+    try:
+        content_hash = None
+        if parallel:
+            resp.close()
+            try:
+                _fetch_parallel(session, final_url, path, length, segments, progress)
+                content_hash = file_sha256(path)
+            except _RangeUnsupported:
+                # Ranges advertised but not honoured: the segments were stopped, fetch one plain stream
+                progress.cancelled.clear()
+                parallel = ranges = False
+                resp = None
+        if content_hash is None:
+            content_hash = _fetch_stream(session, final_url, path, resp, length, ranges, progress, sink)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+    seconds = time.perf_counter() - t0
+    size = os.path.getsize(path)
+    return {
+        "path": path,
+        "sha256": content_hash,
+        "stats": {
+            "source": "http",
+            "bytes": size,
+            "seconds": round(seconds, 3),
+            "throughput_mb_per_s": round(size / _MB / seconds, 2) if seconds > 0 else None,
+            "segments": segments if parallel else 1,
+            "resumes": progress.resumes,
+            "transferred_bytes": progress.transferred,
+        },
+    }
@@ -0,0 +1,162 @@
+"""
+GuruMitra analysis jobs: fixed-size worker pool for long-running video analysis.
+POST /jobs enqueues work and returns a job id immediately; GET /jobs/{id} reports status/result.
+A burst of uploads queues behind ANALYSIS_WORKERS instead of running dozens of CPU-bound analyses at once.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
+# Number of analyses (download + Whisper + LLM + posture) allowed to run at the same time
+ANALYSIS_WORKERS = max(1, int(os.environ.get("ANALYSIS_WORKERS", "2")))
+# Max jobs waiting for a worker; further submissions are rejected (HTTP 503) instead of piling up
+JOB_QUEUE_MAX = max(1, int(os.environ.get("JOB_QUEUE_MAX", "100")))
+# Finished jobs (done/failed) are kept this long for polling, then dropped
+JOB_RESULT_TTL_SECONDS = int(os.environ.get("JOB_RESULT_TTL_SECONDS", "3600"))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+# Dropped before it started (service shutdown)
+STATUS_CANCELLED = "cancelled"
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when JOB_QUEUE_MAX jobs are already waiting for a worker."""
+
+
+class JobManager:
+    """
+    In-memory job table backed by a ThreadPoolExecutor with a fixed number of workers.
+    Each job record: job_id, status, session_id, created_at, started_at, finished_at, result, error.
+    """
+
+    def __init__(
+        self,
+        workers: int = ANALYSIS_WORKERS,
+        max_queued: int = JOB_QUEUE_MAX,
+        result_ttl_seconds: int = JOB_RESULT_TTL_SECONDS,
+        describe_error: Callable[[Exception], str] = str,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl_seconds = result_ttl_seconds
+        self._describe_error = describe_error
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._futures = {}
+
+    def submit(self, func: Callable, *args, session_id: Optional[str] = None, **kwargs) -> dict:
+        """Queue func(*args, **kwargs). Returns a snapshot of the new job record. Raises JobQueueFull."""
+        with self._lock:
+            self._prune_locked()
+            queued = sum(1 for j in self._jobs.values() if j["status"] == STATUS_QUEUED)
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"Analysis queue is full ({queued} jobs waiting). Retry later.")
+            job_id = uuid.uuid4().hex
+            job = {
+                "job_id": job_id,
+                "status": STATUS_QUEUED,
+                "session_id": session_id,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            # Recorded only once accepted (submit raises after shutdown); _execute waits for this lock
+            future = self._executor.submit(self._execute, job_id, func, args, kwargs)
+            self._jobs[job_id] = job
+            self._futures[job_id] = future
+            future.add_done_callback(partial(self._on_done, job_id))
+            return dict(job)
+
+    def run(self, func: Callable, *args, session_id: Optional[str] = None, **kwargs):
+        """
+        Queue func and block until it finishes. Returns its result or re-raises its exception.
+        The job counts toward the queue limit while it waits, but nobody can poll for it, so its record
+        (and result) is dropped as soon as it returns.
+        """
+        job_id = self.submit(func, *args, session_id=session_id, **kwargs)["job_id"]
+        with self._lock:
+            future = self._futures[job_id]
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+                self._futures.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Snapshot of a job record (with queue_position while queued), or None if unknown/expired."""
+        with self._lock:
+            self._prune_locked()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            out = dict(job)
+            if job["status"] == STATUS_QUEUED:
+                out["queue_position"] = sum(
+                    1 for j in self._jobs.values()
+                    if j["status"] == STATUS_QUEUED and j["created_at"] <= job["created_at"]
+                )
+            return out
+
+    def stats(self) -> dict:
+        """Counts per status plus pool size (for health/debug)."""
+        with self._lock:
+            counts = {STATUS_QUEUED: 0, STATUS_RUNNING: 0, STATUS_DONE: 0, STATUS_FAILED: 0, STATUS_CANCELLED: 0}
+            for j in self._jobs.values():
+                counts[j["status"]] = counts.get(j["status"], 0) + 1
+        return {"workers": self.workers, "max_queued": self.max_queued, "jobs": counts}
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work; jobs that have not started are dropped and marked cancelled."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _on_done(self, job_id: str, future):
+        """Future callback: a job cancelled before it ran never reaches _execute, so record it here."""
+        if not future.cancelled():
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] == STATUS_QUEUED:
+                job["status"] = STATUS_CANCELLED
+                job["error"] = "Service shut down before the job started. Submit it again."
+                job["finished_at"] = time.time()
+
+    def _execute(self, job_id: str, func: Callable, args: tuple, kwargs: dict):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = STATUS_RUNNING
+            job["started_at"] = time.time()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                job["status"] = STATUS_FAILED
+                job["error"] = self._describe_error(e)
+                job["finished_at"] = time.time()
+            raise
+        with self._lock:
+            job["status"] = STATUS_DONE
+            job["result"] = result
+            job["finished_at"] = time.time()
+        return result
+
+    def _prune_locked(self):
+        """Drop finished jobs older than result_ttl_seconds. Caller holds self._lock."""
+        now = time.time()
+        expired = [
+            job_id for job_id, j in self._jobs.items()
+            if j["finished_at"] is not None and now - j["finished_at"] > self.result_ttl_seconds
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._futures.pop(job_id, None)
@@ -0,0 +1,129 @@
+"""
+GuruMitra LLM client: one long-lived Gemini client per process, shared by every call site
+(analyzer feedback and ai_evaluator semantic evaluation).
+genai.Client sets up its HTTP connection pool on construction; reusing one client keeps connections
+(and TLS sessions) warm across sessions and lets the two concurrent per-session calls share the pool.
+Calls are single-turn at temperature 0; any failure returns None so callers fall back to rule-based output.
+Because temperature is 0, generate_cached() keeps validated responses on disk keyed by model + exact prompt:
+re-analysis of the same transcript costs no tokens and no network round trip.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from disk_cache import DiskCache, make_key
+
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+# Per-request timeout so a hung call cannot hold an analysis worker (0 = library default)
+GEMINI_TIMEOUT_SECONDS = float(os.environ.get("GEMINI_TIMEOUT_SECONDS", "120"))
+
+# Validated (parsed) responses only; raw text that failed validation is never stored
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR") or str(Path(__file__).resolve().parent / ".cache" / "llm")
+LLM_CACHE_MAX_MB = float(os.environ.get("LLM_CACHE_MAX_MB", "64"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "30"))
+_cache = DiskCache(
+    LLM_CACHE_DIR,
+    max_bytes=int(LLM_CACHE_MAX_MB * 1024 * 1024),
+    max_age_seconds=LLM_CACHE_MAX_AGE_DAYS * 86400,
+)
+
+_lock = threading.Lock()
+_client = None
+_client_key = None
+_stats = {"calls": 0, "failures": 0, "seconds": 0.0}
+
+
+def _api_key() -> str:
+    return (os.environ.get("GEMINI_API_KEY") or "").strip()
+
+
+def gemini_configured() -> bool:
+    return bool(_api_key())
+
+
+def get_client():
+    """Shared genai.Client for GEMINI_API_KEY (rebuilt only if the key changes). None if unset or google-genai is missing."""
+    global _client, _client_key
+    api_key = _api_key()
+    if not api_key:
+        return None
+    with _lock:
+        if _client is None or _client_key != api_key:
+            try:
+                from google import genai
+                http_options = {"timeout": int(GEMINI_TIMEOUT_SECONDS * 1000)} if GEMINI_TIMEOUT_SECONDS > 0 else None
+                _client = genai.Client(api_key=api_key, http_options=http_options)
+                _client_key = api_key
+            except Exception:
+                return None
+        return _client
+
+
+def warmup() -> dict:
+    """Import google-genai and build the client (no API call, so no tokens are spent)."""
+    if get_client() is None:
+        raise RuntimeError("Gemini client unavailable (GEMINI_API_KEY unset or google-genai missing)")
+    return {"model": GEMINI_MODEL}
+
+
+def generate(prompt: str, model: Optional[str] = None) -> Optional[str]:
+    """Single-turn generate_content at temperature 0. Returns the stripped response text, or None."""
+    client = get_client()
+    if client is None:
+        return None
+    t0 = time.perf_counter()
+    text = None
+    try:
+        response = client.models.generate_content(
+            model=model or GEMINI_MODEL,
+            contents=prompt,
+            config={"temperature": 0.0},
+        )
+        text = (response.text or "").strip() or None
+    except Exception:
+        text = None
+    with _lock:
+        _stats["calls"] += 1
+        _stats["failures"] += text is None
+        _stats["seconds"] += time.perf_counter() - t0
+    return text
+
+
+def generate_cached(prompt: str, parse: Callable[[str], Optional[Any]], schema: str, model: Optional[str] = None) -> Optional[Any]:
+    """
+    generate() + parse(text) with the response cache. Returns the parsed value, or None.
+    Key: schema (bump when parse() output changes) + model + the exact prompt (sha256). Only values that
+    parse() accepts (not None) are stored, so a malformed or failed response is retried next time.
+    """
+    if not gemini_configured():
+        return None
+    model = model or GEMINI_MODEL
+    key = make_key("llm", schema, model, "temperature=0", prompt)
+    value = _cache.get(key)
+    if value is not None:
+        return value
+    text = generate(prompt, model)
+    value = parse(text) if text else None
+    if value is not None:
+        _cache.put(key, value)
+    return value
+
+
+def strip_code_fence(text: str) -> str:
+    """Remove a surrounding ```json ... ``` block if the model added one."""
+    if not text.startswith("```"):
+        return text
+    lines = text.split("\n")
+    if lines[0].startswith("```"):
+        lines = lines[1:]
+    if lines and lines[-1].strip() == "```":
+        lines = lines[:-1]
+    return "\n".join(lines)
+
+
+def stats() -> dict:
+    with _lock:
+        calls = {"model": GEMINI_MODEL, **_stats, "seconds": round(_stats["seconds"], 3)}
+    return {**calls, "cache": _cache.stats()}
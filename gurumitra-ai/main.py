@@ -1,11 +1,12 @@
 """
 GuruMitra AI microservice: analyzes classroom video/audio and returns deterministic feedback.
 Call from Node backend per new upload. Same video -> same metrics -> same feedback.
-Load .env first and set ffmpeg path before pydub is used.
+Load .env first and put ffmpeg on PATH before any audio is decoded.
 """
 from pathlib import Path
 from typing import Optional
 import os
+import sys
 
 # Load .env from gurumitra-ai directory
 _env_dir = Path(__file__).resolve().parent
@@ -14,7 +15,7 @@ if _env_file.is_file():
     from dotenv import load_dotenv
     load_dotenv(_env_file)
 
-# Add ffmpeg to PATH *before* pydub is ever imported (so pydub finds it and no 500s)
+# Add ffmpeg to PATH *before* any analysis runs (audio is decoded by an ffmpeg subprocess; avoids 500s)
 def _setup_ffmpeg():
     ffmpeg = (os.environ.get("FFMPEG_PATH") or "").strip()
     if not ffmpeg and os.name == "nt":
@@ -42,27 +43,53 @@ def _setup_ffmpeg():
 
 _setup_ffmpeg()
 
-import tempfile
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, Body
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pydub import AudioSegment
+from fastapi.responses import JSONResponse
 
 
-from analyzer import download_video_or_youtube, run_analysis
+# analyzer (numpy, requests, model code) and posture_metrics are imported on first use so the app
+# binds its port quickly; model_registry loads the heavy stacks in the background (scripts/startup_budget.py)
+from artifact_store import ARTIFACTS_DIR, STATIC_URL_PATH, get_store as get_artifact_store
 from debug_router import router as debug_router
+from jobs import JobManager, JobQueueFull
+import model_registry
+
+
+def _describe_error(e: Exception) -> str:
+    """Map analysis exceptions to the message returned to the backend."""
+    err_msg = str(e)
+    if "WinError 2" in err_msg or "cannot find the file specified" in err_msg or (
+        isinstance(e, FileNotFoundError) and "ffmpeg" in err_msg
+    ):
+        return "ffmpeg not found. Install ffmpeg and add it to your system PATH, or set FFMPEG_PATH in gurumitra-ai/.env"
+    return err_msg
+
+
+# Fixed-size worker pool shared by /analyze and /jobs (ANALYSIS_WORKERS, JOB_QUEUE_MAX)
+jobs = JobManager(describe_error=_describe_error)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Load + warm Whisper, MediaPipe and YOLO in the background; /ready turns 200 when done
+    model_registry.start_warmup()
+    # Drop posture outputs that expired while the service was down
+    get_artifact_store().evict()
     yield
-    # cleanup if needed
+    jobs.shutdown(wait=False)
+    analyzer = sys.modules.get("analyzer")
+    if analyzer is not None:
+        analyzer.shutdown_workers()
 
 
 
-POSTURE_OUTPUTS_DIR = str((Path(__file__).parent / "posture_outputs").resolve())
+# Per-session posture outputs (artifact_store): <POSTURE_OUTPUTS_DIR>/<session_id>/<run_id>/...
+POSTURE_OUTPUTS_DIR = ARTIFACTS_DIR
+os.makedirs(POSTURE_OUTPUTS_DIR, exist_ok=True)
 app = FastAPI(title="GuruMitra AI", version="1.0.0", lifespan=lifespan)
 
 
@@ -76,7 +103,7 @@ app.add_middleware(
 
 # Serve static files for posture_outputs
 app.mount(
-    "/static/posture_outputs",
+    STATIC_URL_PATH,
     StaticFiles(directory=POSTURE_OUTPUTS_DIR),
     name="posture_outputs"
 )
@@ -84,7 +111,45 @@ app.mount(
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "gurumitra-ai"}
+    return {"status": "ok", "service": "gurumitra-ai", "jobs": jobs.stats()}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once models are loaded and warmed (see model_registry), else 503. /health is liveness only."""
+    status = model_registry.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+def _analyze_url(url: str, session_id: Optional[str]) -> dict:
+    """Download + run_analysis; always removes the downloaded files. Runs on a job worker."""
+    from analyzer import ingest_url, run_analysis
+    paths = ()
+    try:
+        # Direct URLs are decoded to audio while downloading (INGEST_STREAMING); YouTube is fetched as
+        # separate audio-only and low-resolution video-only streams (YOUTUBE_SPLIT_STREAMS)
+        ingest = ingest_url(url)
+        paths = (ingest["path"], ingest["audio_path"])
+        out = run_analysis(
+            ingest["path"],
+            session_id=session_id,
+            content_hash=ingest["content_hash"],
+            audio=ingest["audio"],
+            metrics=ingest["metrics"],
+            audio_path=ingest["audio_path"],
+        )
+        # Reported per request (also on cache hits), separate from the analysis stage timings
+        out["download"] = ingest["download"]
+        return out
+    finally:
+        for path in paths:
+            if path and os.path.isfile(path):
+                try:
+                    os.unlink(path)
+                except Exception:
+                    pass
 
 
 @app.post("/analyze")
@@ -93,31 +158,67 @@ def analyze(video_url: str = Body(..., embed=True), session_id: Optional[str] =
     Analyze video. JSON body: { "video_url": "https://...", "session_id": "optional-uuid" }.
     Runs Whisper transcription + audio metrics + teaching-content analysis; returns session-level JSON.
     Empty transcript returns warning and no scores.
+    Blocks until done, but runs on the shared worker pool so concurrent requests queue (see /jobs).
     """
-    path = None
     url = (video_url or "").strip()
     if not url:
         raise HTTPException(status_code=400, detail="video_url is required")
     try:
-        path = download_video_or_youtube(url)
-        result = run_analysis(path, session_id=session_id)
-        return result
+        return jobs.run(_analyze_url, url, session_id, session_id=session_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
-        err_msg = str(e)
-        if "WinError 2" in err_msg or "cannot find the file specified" in err_msg:
-            raise HTTPException(
-                status_code=500,
-                detail="ffmpeg not found. Install ffmpeg and add it to your system PATH, or set FFMPEG_PATH in gurumitra-ai/.env",
-            )
-        raise HTTPException(status_code=500, detail=err_msg)
-    finally:
-        if path and os.path.isfile(path):
-            try:
-                os.unlink(path)
-            except Exception:
-                pass
+        raise HTTPException(status_code=500, detail=_describe_error(e))
+
+
+@app.post("/jobs", status_code=202)
+def create_job(video_url: str = Body(..., embed=True), session_id: Optional[str] = Body(None, embed=True)):
+    """
+    Queue an analysis and return immediately. JSON body same as /analyze.
+    Returns { job_id, status: "queued", status_url }; poll GET /jobs/{job_id} for the result.
+    """
+    url = (video_url or "").strip()
+    if not url:
+        raise HTTPException(status_code=400, detail="video_url is required")
+    try:
+        job = jobs.submit(_analyze_url, url, session_id, session_id=session_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"job_id": job["job_id"], "status": job["status"], "status_url": f"/jobs/{job['job_id']}"}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Job status: queued (with queue_position) | running | done (with result) | failed (with error) | cancelled (dropped at shutdown).
+    Finished jobs are kept for JOB_RESULT_TTL_SECONDS.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+@app.post("/posture/rescore")
+def posture_rescore(series_id: str = Body(..., embed=True), thresholds: Optional[dict] = Body(None, embed=True)):
+    """
+    Re-score a session's saved posture landmarks with different thresholds (no video decode or MediaPipe).
+    JSON body: { "series_id": posture_analysis.series_id, "thresholds": { "slouch_spine_angle": 165, ... } }.
+    Omitted thresholds keep their defaults; see posture_metrics.DEFAULT_THRESHOLDS.
+    """
+    from posture_metrics import rescore_posture, series_dir
+    try:
+        directory = series_dir(series_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.isfile(os.path.join(directory, "meta.json")):
+        raise HTTPException(status_code=404, detail="Posture series not found")
+    try:
+        return rescore_posture(directory, thresholds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 app.include_router(debug_router)
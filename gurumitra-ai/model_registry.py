@@ -0,0 +1,164 @@
+"""
+GuruMitra model registry: every model is loaded once per process from local weights, warmed up,
+and shared across requests, so the first upload after a deploy does not pay cold-start costs.
+- Transcription engine (transcription.get_engine).
+- PostureAnalyzer (MediaPipe Pose + FaceMesh): graphs are not thread-safe, so instances are pooled
+  and borrowed one user at a time via posture_analyzer().
+- YOLO phone detector: loaded only from YOLO_WEIGHTS on disk (never downloaded); disabled if missing.
+- Gemini client (llm_client.get_client): built once so the first session does not import google-genai.
+main.py starts warmup() in the background during the FastAPI lifespan; /ready reports when it is done.
+"""
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Local YOLOv8 weights for phone detection (COCO includes "cell phone"). Missing file -> phone detection off.
+YOLO_WEIGHTS = os.environ.get("YOLO_WEIGHTS") or str(Path(__file__).resolve().parent / "models" / "yolov8n.pt")
+# Max PostureAnalyzer instances per process (each holds its own MediaPipe graphs)
+POSTURE_GRAPH_POOL_SIZE = max(1, int(os.environ.get("POSTURE_GRAPH_POOL_SIZE", "2")))
+# Load and warm all models at startup (otherwise they load on first use and /ready is immediate)
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "1").strip().lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+_phone_detector = None  # None = not loaded yet, False = unavailable
+_posture_idle = queue.Queue()
+_posture_created = 0
+_status = {"ready": not WARMUP_ON_STARTUP, "warming": False, "models": {}, "error": None}
+
+
+def get_phone_detector():
+    """Shared YOLO model from YOLO_WEIGHTS, or None if the file or ultralytics is missing."""
+    global _phone_detector
+    with _lock:
+        if _phone_detector is None:
+            _phone_detector = False
+            if os.path.isfile(YOLO_WEIGHTS):
+                try:
+                    from ultralytics import YOLO
+                    _phone_detector = YOLO(YOLO_WEIGHTS)
+                except Exception:
+                    _phone_detector = False
+        return _phone_detector or None
+
+
+@contextmanager
+def posture_analyzer():
+    """Borrow a PostureAnalyzer from this process's pool (created lazily, up to POSTURE_GRAPH_POOL_SIZE)."""
+    global _posture_created
+    analyzer = None
+    try:
+        analyzer = _posture_idle.get_nowait()
+    except queue.Empty:
+        with _lock:
+            create = _posture_created < POSTURE_GRAPH_POOL_SIZE
+            if create:
+                _posture_created += 1
+        if create:
+            try:
+                from posture_analyzer import PostureAnalyzer
+                analyzer = PostureAnalyzer()
+            except Exception:
+                with _lock:
+                    _posture_created -= 1
+                raise
+        else:
+            analyzer = _posture_idle.get()
+    try:
+        yield analyzer
+    finally:
+        _posture_idle.put(analyzer)
+
+
+def _timed(name: str, func) -> dict:
+    t0 = time.perf_counter()
+    try:
+        detail = func()
+        entry = {"loaded": True, "seconds": round(time.perf_counter() - t0, 3)}
+        if isinstance(detail, dict):
+            entry.update(detail)
+    except Exception as e:
+        entry = {"loaded": False, "error": str(e), "seconds": round(time.perf_counter() - t0, 3)}
+    with _lock:
+        _status["models"][name] = entry
+    return entry
+
+
+def warmup_transcription() -> dict:
+    """Load the transcription engine and run it once on a second of silence."""
+    import numpy as np
+    from transcription import get_engine
+    engine = get_engine()
+    engine.load()
+    engine.transcribe(np.zeros(16000, dtype=np.float32))
+    return {"engine": engine.name, "model": engine.model_name}
+
+
+def warmup_posture() -> dict:
+    """Build this process's MediaPipe graphs and YOLO, and run each once."""
+    with posture_analyzer() as analyzer:
+        analyzer.warmup()
+    detector = get_phone_detector()
+    if detector is not None:
+        import numpy as np
+        from phone_detection import PHONE_DETECT_IMGSZ
+        detector(np.zeros((PHONE_DETECT_IMGSZ, PHONE_DETECT_IMGSZ, 3), dtype=np.uint8), imgsz=PHONE_DETECT_IMGSZ, verbose=False)
+    return {"pid": os.getpid(), "phone_detector": detector is not None}
+
+
+def init_posture_worker():
+    """Posture process-pool initializer. Failures are left to surface per session instead of breaking the pool."""
+    try:
+        warmup_posture()
+    except Exception:
+        pass
+
+
+def warmup():
+    """Load and warm every model used by the pipeline (this process and worker pools). Sets ready if transcription loaded."""
+    with _lock:
+        _status["warming"] = True
+        _status["error"] = None
+    ready = False
+    try:
+        import analyzer
+        ready = _timed("transcription", warmup_transcription)["loaded"]
+        if analyzer.WHISPER_CHUNKED:
+            _timed("transcription_workers", analyzer.warm_whisper_workers)
+        import llm_client
+        if llm_client.gemini_configured():
+            _timed("llm_client", llm_client.warmup)
+        if analyzer.POSTURE_ENABLED:
+            if analyzer.POSTURE_PROCESSES > 0:
+                _timed("posture_workers", analyzer.warm_posture_workers)
+            else:
+                _timed("posture", warmup_posture)
+    except Exception as e:
+        with _lock:
+            _status["error"] = str(e)
+    finally:
+        with _lock:
+            _status["warming"] = False
+            # Posture/phone models degrade gracefully; without transcription no session can be analyzed
+            _status["ready"] = ready
+
+
+def start_warmup():
+    """Run warmup() on a background thread (the server binds its port without waiting)."""
+    if not WARMUP_ON_STARTUP:
+        return None
+    t = threading.Thread(target=warmup, name="model-warmup", daemon=True)
+    t.start()
+    return t
+
+
+def status() -> dict:
+    with _lock:
+        return {
+            "ready": _status["ready"],
+            "warming": _status["warming"],
+            "error": _status["error"],
+            "models": {k: dict(v) for k, v in _status["models"].items()},
+        }
@@ -0,0 +1,133 @@
+"""
+GuruMitra phone detection: YOLO "cell phone" checks run off the pose loop.
+PostureAnalyzer submits sampled frames to a PhoneDetector; a background thread downscales them to
+PHONE_DETECT_IMGSZ and runs YOLO in batches of up to PHONE_DETECT_BATCH. With PHONE_DETECT_ROI=1 only
+square crops around the wrists are checked (a phone in use is in the teacher's hand).
+finish() returns one (frame_index, best phone confidence) row per submitted frame, from which
+phone_usage_percent is computed. Every submitted frame is analyzed, so results do not depend on timing.
+"""
+import os
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+# COCO class index for cell phone
+COCO_CLASS_CELL_PHONE = 67
+
+# YOLO input size (longest side, pixels); frames are downscaled to this before queueing
+PHONE_DETECT_IMGSZ = int(os.environ.get("PHONE_DETECT_IMGSZ", "320"))
+# Max sampled frames per YOLO call (with wrist crops, up to two images each)
+PHONE_DETECT_BATCH = max(1, int(os.environ.get("PHONE_DETECT_BATCH", "8")))
+# Max frames waiting for YOLO; the pose loop only waits if detection falls this far behind
+PHONE_DETECT_QUEUE = max(1, int(os.environ.get("PHONE_DETECT_QUEUE", "32")))
+# Check only crops around the wrists instead of the whole frame
+PHONE_DETECT_ROI = os.environ.get("PHONE_DETECT_ROI", "0").strip().lower() in ("1", "true", "yes")
+# Side of each wrist crop as a fraction of the frame height
+PHONE_ROI_SIZE = float(os.environ.get("PHONE_ROI_SIZE", "0.35"))
+# Wrists less visible than this are not cropped (the whole frame is checked if neither is usable)
+PHONE_ROI_MIN_VISIBILITY = 0.3
+
+# One YOLO model is shared per process and its predictor is not thread-safe
+_inference_lock = threading.Lock()
+_DONE = object()
+
+
+def _downscale(image, max_side):
+    h, w = image.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return image.copy()
+    return cv2.resize(image, (max(1, int(round(w * scale))), max(1, int(round(h * scale)))), interpolation=cv2.INTER_AREA)
+
+
+def wrist_crops(frame_bgr, wrists, size=PHONE_ROI_SIZE):
+    """
+    Square crops centred on wrists given as normalized (x, y, visibility) rows.
+    Returns [] if no wrist is visible enough.
+    """
+    h, w = frame_bgr.shape[:2]
+    half = max(1, int(round(size * h / 2)))
+    crops = []
+    for x, y, visibility in wrists:
+        if visibility < PHONE_ROI_MIN_VISIBILITY:
+            continue
+        cx, cy = int(round(x * w)), int(round(y * h))
+        x0, x1 = max(0, cx - half), min(w, cx + half)
+        y0, y1 = max(0, cy - half), min(h, cy + half)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            continue
+        crops.append(frame_bgr[y0:y1, x0:x1])
+    return crops
+
+
+class PhoneDetector:
+    """
+    Background batched detector for one video. submit() frames in order, then call finish() once.
+    A failing YOLO call records its frames as analyzed without a phone (confidence 0).
+    """
+
+    def __init__(
+        self,
+        model,
+        imgsz: int = PHONE_DETECT_IMGSZ,
+        batch_size: int = PHONE_DETECT_BATCH,
+        max_pending: int = PHONE_DETECT_QUEUE,
+        roi: bool = PHONE_DETECT_ROI,
+    ):
+        self.model = model
+        self.imgsz = imgsz
+        self.batch_size = batch_size
+        self.roi = roi
+        self.samples = []  # [frame_index, confidence] in submission order
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="phone-detect", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame_index, frame_bgr, wrists=None):
+        """Queue one sampled frame. wrists: optional normalized (x, y, visibility) rows used when roi is on."""
+        images = wrist_crops(frame_bgr, wrists) if self.roi and wrists is not None else []
+        if not images:
+            images = [frame_bgr]
+        # Blocks only when max_pending frames are already waiting (backpressure, no dropped samples)
+        self._queue.put((frame_index, [_downscale(img, self.imgsz) for img in images]))
+
+    def finish(self):
+        """Wait for queued frames. Returns a (frames, 2) float64 array of frame_index, phone confidence (0 = none)."""
+        self._queue.put(_DONE)
+        self._thread.join()
+        return np.array(self.samples, dtype=np.float64).reshape(-1, 2)
+
+    def _run(self):
+        done = False
+        while not done:
+            samples = [self._queue.get()]
+            while samples[-1] is not _DONE and len(samples) < self.batch_size:
+                try:
+                    samples.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if samples[-1] is _DONE:
+                samples.pop()
+                done = True
+            if samples:
+                self._detect(samples)
+
+    def _detect(self, samples):
+        images = [img for _, sample in samples for img in sample]
+        owners = [i for i, (_, sample) in enumerate(samples) for _ in sample]
+        confidence = [0.0] * len(samples)
+        try:
+            with _inference_lock:
+                results = self.model(images, imgsz=self.imgsz, verbose=False)
+            for owner, r in zip(owners, results):
+                if r.boxes is None:
+                    continue
+                phones = r.boxes.cls.cpu().numpy().astype(int) == COCO_CLASS_CELL_PHONE
+                if np.any(phones):
+                    best = float(r.boxes.conf.cpu().numpy()[phones].max())
+                    confidence[owner] = max(confidence[owner], best)
+        except Exception:
+            confidence = [0.0] * len(samples)
+        self.samples.extend([frame_index, conf] for (frame_index, _), conf in zip(samples, confidence))
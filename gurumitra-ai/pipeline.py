@@ -0,0 +1,100 @@
+"""
+GuruMitra stage graph: runs analysis stages as a small DAG.
+Each stage starts as soon as the stages it depends on have finished, so independent branches
+(audio -> transcript -> LLM vs. video -> posture) overlap instead of running back to back.
+Stages run on a per-run thread pool unless given their own executor (e.g. a ProcessPoolExecutor).
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, Iterable, Optional
+
+
+def _timed(func: Callable, **kwargs):
+    """Run func and return (result, seconds). Top-level so process-pool stages can pickle it."""
+    t0 = time.perf_counter()
+    result = func(**kwargs)
+    return result, time.perf_counter() - t0
+
+
+class StageGraph:
+    """
+    add() stages, then run(). A stage's func is called with its dependencies' results as keyword
+    arguments named after those dependencies, e.g. add("metrics", compute_metrics, deps=("audio",))
+    calls compute_metrics(audio=<result of "audio">).
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self.timings = {}
+        self.stopped_at = None
+
+    def add(
+        self,
+        name: str,
+        func: Callable,
+        deps: Iterable[str] = (),
+        executor=None,
+        stop_if: Optional[Callable] = None,
+        on_cancel: Optional[Callable] = None,
+    ):
+        """
+        Register a stage. executor: run on this executor instead of the graph's threads
+        (func and dependency results must then be picklable). stop_if(result) -> True ends the run
+        early: stages not yet started are skipped and run() returns what has finished.
+        on_cancel(): called if the run ends (early stop or failure) while this stage is still running,
+        so work a future cannot interrupt (e.g. a job inside a worker process) can be told to stop.
+        """
+        deps = tuple(deps)
+        for d in deps:
+            if d not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{d}'")
+        if name in self._stages:
+            raise ValueError(f"Duplicate stage '{name}'")
+        self._stages[name] = {"func": func, "deps": deps, "executor": executor, "stop_if": stop_if, "on_cancel": on_cancel}
+        return self
+
+    def run(self) -> dict:
+        """
+        Execute all stages respecting dependencies. Returns {stage_name: result}.
+        Per-stage wall time (seconds) is left in self.timings. The first stage exception is re-raised.
+        """
+        results = {}
+        pending = dict(self._stages)
+        running = {}
+        self.timings = {}
+        self.stopped_at = None
+        t_start = time.perf_counter()
+        threads = ThreadPoolExecutor(max_workers=max(1, len(self._stages)), thread_name_prefix="stage")
+        try:
+            while pending or running:
+                for name in [n for n, s in pending.items() if all(d in results for d in s["deps"])]:
+                    stage = pending.pop(name)
+                    kwargs = {d: results[d] for d in stage["deps"]}
+                    executor = stage["executor"] or threads
+                    running[executor.submit(partial(_timed, stage["func"]), **kwargs)] = name
+                if not running:
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result, seconds = future.result()
+                    results[name] = result
+                    self.timings[name] = round(seconds, 3)
+                    stop_if = self._stages[name]["stop_if"]
+                    if stop_if is not None and stop_if(result):
+                        self.stopped_at = name
+                if self.stopped_at:
+                    break
+        finally:
+            # Abandon anything still queued/running (early stop or failure); its result is discarded
+            for future, name in running.items():
+                if future.done():
+                    continue
+                future.cancel()
+                on_cancel = self._stages[name]["on_cancel"]
+                if on_cancel is not None:
+                    on_cancel()
+            threads.shutdown(wait=False, cancel_futures=True)
+        self.timings["total"] = round(time.perf_counter() - t_start, 3)
+        return results
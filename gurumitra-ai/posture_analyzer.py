@@ -1,186 +1,231 @@
 import cv2
-import mediapipe as mp
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
-# Optional: YOLO for phone detection (graceful fallback if not installed)
-_phone_detector = None
+from artifact_store import PUBLIC_BASE_URL, STATIC_URL_PATH
+from charts import line_chart, occupancy_heatmap
+from phone_detection import PhoneDetector
+from posture_metrics import (
+    LEFT_WRIST,
+    RIGHT_WRIST,
+    TORSO_LANDMARKS,
+    TRACKED_LANDMARKS,
+    LandmarkStore,
+    frame_series,
+    save_series,
+    summarize_posture,
+)
+
+# Optional: YOLO for phone detection (graceful fallback if not installed or weights missing)
 def _get_phone_detector():
-    global _phone_detector
-    if _phone_detector is None:
-        try:
-            from ultralytics import YOLO
-            _phone_detector = YOLO("yolov8n.pt")  # nano model, COCO includes "cell phone" (class 67)
-        except Exception:
-            _phone_detector = False  # disabled
-    return _phone_detector if _phone_detector else None
+    from model_registry import get_phone_detector
+    return get_phone_detector()  # nano model, COCO includes "cell phone" (class 67)
+
+# Frames per second actually analyzed (pose inference); other frames are skipped with cap.grab()
+# without decoding. Metrics are averages/percentages, so 2-5 fps is enough. 0 = analyze every frame.
+POSTURE_ANALYSIS_FPS = float(os.environ.get("POSTURE_ANALYSIS_FPS", "5"))
+# Fallback when the container does not report its frame rate
+DEFAULT_VIDEO_FPS = 30.0
+# Annotated posture-issue frames kept per session
+MAX_ANNOTATED_FRAMES = 5
+
+
+# Pose engine: "tracking" runs MediaPipe in video mode (person detection only when tracking is lost,
+# plus periodic/low-confidence re-detection) with temporal smoothing; "static" detects on every frame.
+POSTURE_POSE_MODE = (os.environ.get("POSTURE_POSE_MODE") or "tracking").strip().lower()
+# Tracking is reset (full re-detection) at every window of this many seconds of video
+POSE_REDETECT_SECONDS = float(os.environ.get("POSE_REDETECT_SECONDS", "10"))
+# ...and whenever mean visibility of the torso/head landmarks drops below this
+POSE_MIN_VISIBILITY = float(os.environ.get("POSE_MIN_VISIBILITY", "0.5"))
+# EMA weight of the newest frame when smoothing landmarks (1 = no smoothing)
+POSE_SMOOTHING_ALPHA = float(os.environ.get("POSE_SMOOTHING_ALPHA", "0.5"))
+
+
+class PostureCancelled(RuntimeError):
+    """Raised by PostureAnalyzer.scan when its cancel file appears."""
+
+
+def frame_stride(native_fps, target_fps=POSTURE_ANALYSIS_FPS):
+    """Analyze every Nth frame so that about target_fps frames per second are processed (1 = every frame)."""
+    if not target_fps or target_fps <= 0:
+        return 1
+    fps = native_fps if native_fps and native_fps > 0 else DEFAULT_VIDEO_FPS
+    return max(1, int(round(fps / target_fps)))
+
+
+class LandmarkSmoother:
+    """Exponential moving average over (33, 4) landmark arrays; x/y/z are smoothed, visibility is kept raw."""
 
+    def __init__(self, alpha=POSE_SMOOTHING_ALPHA):
+        self.alpha = alpha
+        self._state = None
 
-# COCO class index for cell phone
-COCO_CLASS_CELL_PHONE = 67
+    def reset(self):
+        self._state = None
+
+    def __call__(self, landmarks):
+        if self._state is None or self.alpha >= 1:
+            self._state = landmarks.copy()
+        else:
+            self._state[:, :3] = self.alpha * landmarks[:, :3] + (1 - self.alpha) * self._state[:, :3]
+            self._state[:, 3] = landmarks[:, 3]
+        return self._state.copy()
 
 
 class PostureAnalyzer:
-    def __init__(self):
+    def __init__(self, mode=None):
+        self.mode = mode or POSTURE_POSE_MODE
+        self.tracking = self.mode == "tracking"
+        # MediaPipe is imported with the first analyzer (model registry / posture worker), not with this module
+        import mediapipe as mp
         self.mp_pose = mp.solutions.pose
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.pose = self.mp_pose.Pose(static_image_mode=True)
-        self.face_mesh = self.mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1, min_detection_confidence=0.5)
+        self.mp_drawing = mp.solutions.drawing_utils
+        self.pose = self._new_pose()
+        self.face_mesh = self._new_face_mesh()
+        self.smoother = LandmarkSmoother()
+
+    def _new_pose(self):
+        if self.tracking:
+            # Own smoothing (LandmarkSmoother) so resets are explicit and deterministic
+            return self.mp_pose.Pose(
+                static_image_mode=False,
+                smooth_landmarks=False,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5,
+            )
+        return self.mp_pose.Pose(static_image_mode=True)
+
+    def _new_face_mesh(self):
+        return self.mp_face_mesh.FaceMesh(
+            static_image_mode=not self.tracking, max_num_faces=1, min_detection_confidence=0.5
+        )
+
+    def reset_tracking(self):
+        """Drop tracking state so the next frame runs full detection (new video, new window, lost confidence)."""
+        self.smoother.reset()
+        if not self.tracking:
+            return
+        for attr, factory in (("pose", self._new_pose), ("face_mesh", self._new_face_mesh)):
+            graph = getattr(self, attr)
+            if hasattr(graph, "reset"):
+                graph.reset()
+            else:
+                graph.close()
+                setattr(self, attr, factory())
 
-    def _is_eye_contact_frame(self, image_rgb):
-        """Estimate if teacher is looking at camera (eye contact) using face mesh. Returns True if frontal face."""
+    @staticmethod
+    def landmarks_array(pose_landmarks):
+        """MediaPipe landmark list -> (33, 4) float32 array of x, y, z, visibility."""
+        return np.array([[l.x, l.y, l.z, l.visibility] for l in pose_landmarks.landmark], dtype=np.float32)
+
+    def warmup(self):
+        """Run Pose and FaceMesh once on a blank frame so graph initialization is not paid by the first video."""
+        blank = np.zeros((256, 256, 3), dtype=np.uint8)
+        self.pose.process(blank)
+        self.face_mesh.process(blank)
+
+    def _face_nose(self, image_rgb):
+        """Face-mesh nose tip (x, y) normalized to the frame, or (nan, nan) if no face (eye contact is scored later)."""
         results = self.face_mesh.process(image_rgb)
         if not results.multi_face_landmarks:
-            return False
-        lm = results.multi_face_landmarks[0]
-        # Nose tip = 1, face center proxy: nose x should be near 0.5, nose y in upper half
-        nose = lm.landmark[1]
-        # Frontal = nose near center of frame (x ~ 0.5), facing camera (not turned away)
-        if abs(nose.x - 0.5) > 0.25 or nose.y > 0.55:
-            return False
-        return True
-
-    def _has_phone_in_frame(self, frame_bgr):
-        """Run YOLO to detect cell phone in frame. Returns True if phone detected."""
-        model = _get_phone_detector()
-        if model is None:
-            return False
-        try:
-            results = model(frame_bgr, verbose=False)
-            for r in results:
-                if r.boxes is None:
-                    continue
-                for cls in r.boxes.cls.cpu().numpy():
-                    if int(cls) == COCO_CLASS_CELL_PHONE:
-                        return True
-        except Exception:
-            pass
-        return False
-
-    def analyze_video(self, video_path, output_dir="posture_outputs"):
+            return np.nan, np.nan
+        # Nose tip = 1, face center proxy
+        nose = results.multi_face_landmarks[0].landmark[1]
+        return nose.x, nose.y
+
+    def analyze_video(self, video_path, output_dir="posture_outputs", series_dir=None, url_base=None, cancel_path=None):
+        return finalize_posture(
+            self.scan(video_path, cancel_path=cancel_path), output_dir=output_dir, series_dir=series_dir, url_base=url_base
+        )
+
+    def scan(self, video_path, start_frame=0, end_frame=None, cancel_path=None):
+        """
+        Run pose/face/phone inference over native frames [start_frame, end_frame) (None = to the end) and
+        return partial counts plus the recorded landmarks (see merge_partials / finalize_posture). Sampling
+        and tracking windows follow global frame numbers, so scanning a video in window-aligned ranges and
+        merging gives the same result as scanning it whole (_seek makes each range start on its exact frame).
+        cancel_path: if this file appears, stop with PostureCancelled (the session no longer needs posture).
+        """
         cap = cv2.VideoCapture(video_path)
-        frame_count = 0
-        slouch_frames = 0
-        raised_shoulder_frames = 0
-        head_tilt_angles = []
-        neck_alignments = []
-        hand_positions = []
-        body_orientations = []
-        movement_dynamics = []
-        gesture_count = 0
-        spine_angles = []
-        annotated_frames = []  # list of (path, issue_label) tuples
-        prev_landmarks = None
-        # New metrics: eye contact, phone usage, reading vs explaining
-        eye_contact_frames = 0
-        eye_contact_analyzed_count = 0
-        phone_frames = 0
-        phone_analyzed_count = 0
-        reading_posture_frames = 0  # head down, e.g. reading from textbook
-        pose_detected_frames = 0    # frames where pose was detected (for reading % denominator)
-
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        native_fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        stride = frame_stride(native_fps)
+        if start_frame:
+            cap = _seek(cap, video_path, start_frame)
+        frame_index = start_frame  # native frame number (1-based once read), used for file names
+        frame_count = 0  # analyzed (sampled) frames in this range
+        # Landmarks of frames with a pose; all posture series are computed from these after decoding
+        store = LandmarkStore()
+        annotated_frames = []  # list of (frame_index, issue_label, jpeg bytes) tuples
+        # New metrics: eye contact (face-mesh nose per sample), phone usage
+        face_samples = []
+        phone_model = _get_phone_detector()
+        # YOLO runs on a background thread in batches; counts are collected after the loop
+        phone_detector = PhoneDetector(phone_model) if phone_model is not None else None
 
         # Stricter thresholds for saving posture-issue frames (only obvious issues)
         SLOUCH_ANGLE_THRESHOLD = 145   # spine angle below this = clear slouch
         HEAD_TILT_THRESHOLD = 25       # degrees - only save if head tilt exceeds this
-        max_annotated = 5
-        eye_contact_sample = 5   # run face mesh every 5th frame
-        phone_sample = 10       # run YOLO every 10th frame
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frame_count += 1
-            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.pose.process(image_rgb)
-            if results.pose_landmarks:
-                pose_detected_frames += 1
-                landmarks = results.pose_landmarks.landmark
-                # Shoulders, hips, knees
-                left_shoulder = landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
-                right_shoulder = landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER]
-                left_hip = landmarks[self.mp_pose.PoseLandmark.LEFT_HIP]
-                right_hip = landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP]
-                left_knee = landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE]
-                right_knee = landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE]
-                nose = landmarks[self.mp_pose.PoseLandmark.NOSE]
-                left_hand = landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST]
-                right_hand = landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST]
-
-                # Average points for center
-                shoulder = np.mean([[left_shoulder.x, left_shoulder.y], [right_shoulder.x, right_shoulder.y]], axis=0)
-                hip = np.mean([[left_hip.x, left_hip.y], [right_hip.x, right_hip.y]], axis=0)
-                knee = np.mean([[left_knee.x, left_knee.y], [right_knee.x, right_knee.y]], axis=0)
-
-                # Calculate spine angle
-                v1 = np.array(shoulder) - np.array(hip)
-                v2 = np.array(knee) - np.array(hip)
-                angle = self.angle_between(v1, v2)
-                spine_angles.append(angle)
-                if angle < 170 and angle >= 150:
-                    slouch_frames += 1
-                elif angle < 150:
-                    slouch_frames += 1
-
-                # Shoulder elevation (y is top-down in image)
-                shoulder_elevation = (left_shoulder.y + right_shoulder.y) / 2
-                hip_elevation = (left_hip.y + right_hip.y) / 2
-                if shoulder_elevation < hip_elevation - 0.05:
-                    raised_shoulder_frames += 1
-
-                # Head tilt angle
-                shoulder_mid = np.mean([[left_shoulder.x, left_shoulder.y], [right_shoulder.x, right_shoulder.y]], axis=0)
-                nose_xy = np.array([nose.x, nose.y])
-                head_tilt = np.arctan2(nose_xy[1] - shoulder_mid[1], nose_xy[0] - shoulder_mid[0]) * 180 / np.pi
-                head_tilt_angles.append(head_tilt)
-
-                # Neck alignment
-                neck_alignment = np.linalg.norm(nose_xy - shoulder_mid)
-                neck_alignments.append(neck_alignment)
-
-                # Hand position (simple: above/below shoulder)
-                hand_positions.append({
-                    "left": "above" if left_hand.y < left_shoulder.y else "below",
-                    "right": "above" if right_hand.y < right_shoulder.y else "below"
-                })
-
-                # Body orientation (simple: left/right facing)
-                body_orientations.append("left" if left_shoulder.x < right_shoulder.x else "right")
-
-                # Movement dynamics (distance between frames)
-                if prev_landmarks:
-                    movement = np.linalg.norm(np.array([nose.x, nose.y]) - np.array([prev_landmarks[0], prev_landmarks[1]]))
-                    movement_dynamics.append(movement)
-                prev_landmarks = [nose.x, nose.y]
-
-                # Gesture frequency (hands above shoulder)
-                if hand_positions[-1]["left"] == "above" or hand_positions[-1]["right"] == "above":
-                    gesture_count += 1
-
-                # Reading vs explaining: head down (e.g. reading from textbook) = nose below shoulder line
-                head_down_threshold = 0.08
-                if nose.y > shoulder_mid[1] + head_down_threshold:
-                    reading_posture_frames += 1
+        # Sampling cadences are defined in native frames and converted to analyzed frames,
+        # so face mesh / YOLO / annotation run at the same wall-clock rate for any stride
+        eye_contact_sample = max(1, int(round(5 / stride)))   # face mesh every 5th native frame
+        phone_sample = max(1, int(round(10 / stride)))        # YOLO every 10th native frame
+        annotate_sample = max(1, int(round(15 / stride)))     # annotation candidate every 15th native frame
+        # Tracking windows are aligned to native frame numbers, so results do not depend on where decoding started
+        redetect_frames = redetect_window_frames(native_fps)
+        window = None
+        try:
+            while cap.isOpened():
+                if end_frame is not None and frame_index >= end_frame:
+                    break
+                # grab() skips color conversion; only sampled frames are retrieved and converted
+                if not cap.grab():
+                    break
+                frame_index += 1
+                if (frame_index - 1) % stride:
+                    continue
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                if cancel_path is not None and os.path.exists(cancel_path):
+                    raise PostureCancelled("posture analysis cancelled")
+                frame_count += 1
+                sample_index = (frame_index - 1) // stride + 1  # analyzed-frame number from the start of the video
+                frame_window = (frame_index - 1) // redetect_frames
+                if frame_window != window:
+                    self.reset_tracking()
+                    window = frame_window
+                image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                results = self.pose.process(image_rgb)
+                if not results.pose_landmarks:
+                    continue
+                lm = self.landmarks_array(results.pose_landmarks)
+                if self.tracking:
+                    if lm[TRACKED_LANDMARKS, 3].mean() < POSE_MIN_VISIBILITY:
+                        # Low confidence: re-detect from the next frame instead of tracking a bad fit
+                        self.reset_tracking()
+                    lm = self.smoother(lm)
+                store.append(frame_index, lm)
 
                 # Eye contact: sample every N frames (face mesh is heavier)
-                if frame_count % eye_contact_sample == 0:
-                    eye_contact_analyzed_count += 1
-                    if self._is_eye_contact_frame(image_rgb):
-                        eye_contact_frames += 1
+                if sample_index % eye_contact_sample == 0:
+                    face_samples.append((frame_index, *self._face_nose(image_rgb)))
 
                 # Phone usage: sample every M frames (YOLO is heavier)
-                if frame_count % phone_sample == 0:
-                    phone_analyzed_count += 1
-                    if self._has_phone_in_frame(frame):
-                        phone_frames += 1
+                if phone_detector is not None and sample_index % phone_sample == 0:
+                    phone_detector.submit(frame_index, frame, wrists=lm[[LEFT_WRIST, RIGHT_WRIST]][:, [0, 1, 3]])
 
                 # Annotate and save up to 5 frames only when posture issue is CLEAR (stricter thresholds)
+                if len(annotated_frames) >= MAX_ANNOTATED_FRAMES or sample_index % annotate_sample:
+                    continue
+                # This frame's row only: arrays() would re-concatenate every frame so far after each append
+                series = frame_series(store.last()[None], stride)
+                angle = series["spine_angle"][0]
+                head_tilt = series["head_tilt"][0]
                 has_slouch = angle < SLOUCH_ANGLE_THRESHOLD
                 has_head_tilt = abs(head_tilt) > HEAD_TILT_THRESHOLD
-                if (has_slouch or has_head_tilt) and len(annotated_frames) < max_annotated and (frame_count % 15 == 0):
+                if has_slouch or has_head_tilt:
                     # Build specific issue label for this frame
                     issues = []
                     if has_slouch:
@@ -188,139 +233,36 @@ class PostureAnalyzer:
                     if has_head_tilt:
                         issues.append(f"Head tilt ({head_tilt:.0f}°)")
                     issue_label = " | ".join(issues)
-                    annotated_path = os.path.join(output_dir, f"frame_{frame_count}.jpg")
                     annotated_frame = frame.copy()
                     self.draw_skeleton(annotated_frame, results.pose_landmarks)
                     # Draw specific issue(s) on image - two lines if needed
                     cv2.putText(annotated_frame, issue_label, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
                     cv2.putText(annotated_frame, "Keep spine straight, head level", (10, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (80, 80, 80), 1)
-                    cv2.imwrite(annotated_path, annotated_frame)
-                    annotated_frames.append((annotated_path, issue_label))
-
-        cap.release()
-
-        slouch_percent = (slouch_frames / frame_count) * 100 if frame_count else 0
-        raised_shoulder_percent = (raised_shoulder_frames / frame_count) * 100 if frame_count else 0
-        avg_spine_angle = np.mean(spine_angles) if spine_angles else 0
-        avg_head_tilt = np.mean(head_tilt_angles) if head_tilt_angles else 0
-        avg_neck_alignment = np.mean(neck_alignments) if neck_alignments else 0
-        avg_movement = np.mean(movement_dynamics) if movement_dynamics else 0
-
-        # New metrics
-        eye_contact_percent = (eye_contact_frames / eye_contact_analyzed_count * 100) if eye_contact_analyzed_count else None
-        phone_usage_percent = None
-        if phone_analyzed_count and _get_phone_detector() is not None:
-            phone_usage_percent = (phone_frames / phone_analyzed_count * 100)
-        denom = pose_detected_frames if pose_detected_frames else frame_count
-        reading_posture_percent = (reading_posture_frames / denom * 100) if denom else 0
-        explaining_posture_percent = 100.0 - reading_posture_percent if denom else 0
-
-        # Generate heatmap for movement
-        heatmap_path = os.path.join(output_dir, "movement_heatmap.png")
-        if movement_dynamics:
-            plt.figure()
-            plt.plot(movement_dynamics)
-            plt.title("Movement Dynamics")
-            plt.xlabel("Frame")
-            plt.ylabel("Movement")
-            plt.savefig(heatmap_path)
-            plt.close()
-        else:
-            heatmap_path = None
-
-        # Feedback
-        feedback = []
-        if raised_shoulder_percent > 10:
-            feedback.append("Shoulders remained raised during explanation—may indicate stress.")
-        if slouch_percent > 20:
-            feedback.append(f"Slouching observed for {slouch_percent:.1f}% of lecture time.")
-        if avg_spine_angle >= 170:
-            feedback.append("Good posture maintained.")
-        elif avg_spine_angle >= 150:
-            feedback.append("Teacher tends to lean forward while explaining concepts.")
-        else:
-            feedback.append("Poor posture detected. Consider sitting/standing straighter.")
-        if abs(avg_head_tilt) > 10:
-            feedback.append("Head tilt detected. Try to keep your head level for better engagement.")
-        else:
-            feedback.append("Good head alignment maintained.")
-        if avg_neck_alignment > 0.1:
-            feedback.append("Neck protrusion detected. Keep neck aligned with spine.")
-        if gesture_count < 5:
-            feedback.append("Increase hand gestures for better engagement.")
-
-        # Eye contact feedback
-        if eye_contact_percent is not None:
-            if eye_contact_percent >= 60:
-                feedback.append(f"Good eye contact maintained ({eye_contact_percent:.0f}% of the time).")
-            elif eye_contact_percent >= 40:
-                feedback.append(f"Moderate eye contact ({eye_contact_percent:.0f}%). Try to look at the class more often.")
-            else:
-                feedback.append(f"Low eye contact ({eye_contact_percent:.0f}%). Maintain more eye contact with students.")
-
-        # Phone usage feedback
-        if phone_usage_percent is not None and phone_usage_percent > 5:
-            feedback.append("Phone usage detected during class. Avoid using phone while teaching.")
-        elif phone_usage_percent is not None:
-            feedback.append("No phone usage detected—good focus during the session.")
-
-        # Reading vs explaining feedback
-        if reading_posture_percent > 40:
-            feedback.append(f"Teacher was reading from materials for {reading_posture_percent:.0f}% of the session. Focus on explaining and engaging with students rather than reading from textbook.")
-        elif reading_posture_percent > 20:
-            feedback.append(f"Some time spent looking down at materials ({reading_posture_percent:.0f}%). Balance with more direct explanation.")
-        else:
-            feedback.append(f"Good balance: explaining posture for {explaining_posture_percent:.0f}% of the session.")
-
-        # Recommendations
-        recommendations = []
-        if slouch_percent > 20:
-            recommendations.append("Try back stretches and posture correction exercises.")
-        if abs(avg_head_tilt) > 10:
-            recommendations.append("Practice keeping your head level during explanations.")
-        if gesture_count < 5:
-            recommendations.append("Use more hand gestures to emphasize points.")
-        if eye_contact_percent is not None and eye_contact_percent < 50:
-            recommendations.append("Practice maintaining eye contact with the class; look at the camera or students when explaining.")
-        if phone_usage_percent is not None and phone_usage_percent > 5:
-            recommendations.append("Keep phone away during teaching hours to stay focused and set a good example.")
-        if reading_posture_percent > 30:
-            recommendations.append("Reduce reading from textbook; explain concepts in your own words and use the board or gestures.")
-
-        # Convert annotated image paths to URLs for frontend (assuming /static/posture_outputs is served)
-        base_url = "http://localhost:8000/static/posture_outputs"  # Adjust if needed
-        annotated_images_urls = [f"{base_url}/{os.path.basename(path)}" for path, _ in annotated_frames]
-        annotated_image_labels = [label for _, label in annotated_frames]
-        heatmap_url = f"{base_url}/{os.path.basename(heatmap_path)}" if heatmap_path else None
-
-        # If no posture issues detected, provide a default feedback message
-        if not feedback:
-            feedback = ["No posture issues detected in the video."]
-        if not annotated_images_urls:
-            # Log for debugging
-            print("[PostureAnalyzer] No annotated frames found: no posture issues detected or video too short.")
+                    ok, jpeg = cv2.imencode(".jpg", annotated_frame)
+                    if ok:
+                        annotated_frames.append((frame_index, issue_label, jpeg.tobytes()))
 
+        finally:
+            cap.release()
+            # Always stop the detector thread (it drains queued frames first)
+            phone_samples = phone_detector.finish() if phone_detector is not None else None
+
+        landmarks, frame_indices = store.arrays()
         return {
-            "shoulder_tension_percent": raised_shoulder_percent,
-            "slouch_percent": slouch_percent,
-            "avg_spine_angle": avg_spine_angle,
-            "avg_head_tilt_angle": avg_head_tilt,
-            "avg_neck_alignment": avg_neck_alignment,
-            "avg_movement": avg_movement,
-            "gesture_count": gesture_count,
-            "eye_contact_percent": eye_contact_percent,
-            "phone_usage_percent": phone_usage_percent,
-            "reading_posture_percent": reading_posture_percent,
-            "explaining_posture_percent": explaining_posture_percent,
-            "feedback": feedback,
-            "recommendations": recommendations,
-            "annotated_images": annotated_images_urls,
-            "annotated_image_labels": annotated_image_labels,
-            "heatmap": heatmap_url
+            "native_fps": native_fps,
+            "frame_size": frame_size,
+            "stride": stride,
+            "pose_mode": self.mode,
+            "frame_count": frame_count,
+            "face_samples": np.array(face_samples, dtype=np.float64).reshape(-1, 3),
+            "phone_samples": phone_samples,
+            "landmarks": landmarks,
+            "frame_indices": frame_indices,
+            "annotated_frames": annotated_frames,
         }
 
     def draw_skeleton(self, image, pose_landmarks):
-        mp_drawing = mp.solutions.drawing_utils
+        mp_drawing = self.mp_drawing
         mp_drawing.draw_landmarks(
             image,
             pose_landmarks,
@@ -329,9 +271,150 @@ class PostureAnalyzer:
             mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2, circle_radius=2),
         )
 
-    @staticmethod
-    def angle_between(v1, v2):
-        v1_u = v1 / np.linalg.norm(v1)
-        v2_u = v2 / np.linalg.norm(v2)
-        angle = np.arccos(np.clip(np.dot(v1_u, v2_u), -1.0, 1.0))
-        return np.degrees(angle)
\ No newline at end of file
+
+def redetect_window_frames(native_fps):
+    """Native frames per tracking window (tracking is reset at each window start)."""
+    return max(1, int(round(POSE_REDETECT_SECONDS * (native_fps or DEFAULT_VIDEO_FPS))))
+
+
+def _seek(cap, video_path, start_frame):
+    """
+    Position cap so the next grab() returns native frame start_frame (0-based).
+    CAP_PROP_POS_FRAMES reports the requested frame even when the backend lands elsewhere (variable frame
+    rate, inexact keyframe seeks), so the seek is checked on decoded timestamps instead: it seeks two frames
+    early, and both frames must sit at frame_number / fps.
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps and fps > 0:
+        first = max(0, start_frame - 2)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        for n in range(first, start_frame):
+            if not cap.grab() or abs(cap.get(cv2.CAP_PROP_POS_MSEC) - n * 1000.0 / fps) >= 500.0 / fps:
+                break
+        else:
+            return cap
+    # Seek not confirmed: reopen and decode forward frame by frame (slower, but lands exactly)
+    cap.release()
+    cap = cv2.VideoCapture(video_path)
+    for _ in range(start_frame):
+        if not cap.grab():
+            break
+    return cap
+
+
+def shard_ranges(video_path, shards):
+    """
+    Split a video into up to `shards` native-frame ranges [start, end) aligned to tracking windows
+    (the last range is open-ended). Returns [(0, None)] if the frame count is unknown.
+    """
+    cap = cv2.VideoCapture(video_path)
+    native_fps = cap.get(cv2.CAP_PROP_FPS)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    cap.release()
+    window = redetect_window_frames(native_fps)
+    windows = -(-total // window) if total > 0 else 0
+    shards = min(max(1, shards), windows)
+    if shards <= 1:
+        return [(0, None)]
+    bounds = [round(i * windows / shards) * window for i in range(shards)]
+    return [(start, bounds[i + 1] if i + 1 < shards else None) for i, start in enumerate(bounds)]
+
+
+def merge_partials(partials):
+    """Combine scans of consecutive ranges (in order) into one, as if the video was scanned in one pass."""
+    merged = dict(partials[0])
+    merged["annotated_frames"] = list(merged["annotated_frames"])
+    for part in partials[1:]:
+        merged["frame_count"] += part["frame_count"]
+        merged["annotated_frames"].extend(part["annotated_frames"])
+    # Movement across range boundaries falls out of the series computed over the joined landmarks
+    for key in ("landmarks", "frame_indices", "face_samples"):
+        merged[key] = np.concatenate([p[key] for p in partials])
+    phone = [p["phone_samples"] for p in partials if p["phone_samples"] is not None]
+    merged["phone_samples"] = np.concatenate(phone) if phone else None
+    merged["annotated_frames"] = merged["annotated_frames"][:MAX_ANNOTATED_FRAMES]
+    return merged
+
+
+def finalize_posture(partial, output_dir="posture_outputs", series_dir=None, url_base=None):
+    """
+    Metrics, feedback, annotated images and heatmap from a scan (or merged scans).
+    series_dir: also persist the landmark series there so thresholds can be re-scored later (rescore_posture).
+    url_base: public URL of output_dir (see artifact_store); defaults to the static mount root.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    native_fps = partial["native_fps"]
+    stride = partial["stride"]
+    series = frame_series(partial["landmarks"], stride)
+    annotated_frames = []  # list of (path, issue_label) tuples
+    for frame_index, issue_label, jpeg in partial["annotated_frames"]:
+        annotated_path = os.path.join(output_dir, f"frame_{frame_index}.jpg")
+        with open(annotated_path, "wb") as f:
+            f.write(jpeg)
+        annotated_frames.append((annotated_path, issue_label))
+    movement_dynamics = series["movement"]
+
+    # Generate heatmap for movement
+    heatmap_path = os.path.join(output_dir, "movement_heatmap.png")
+    if not line_chart(movement_dynamics, heatmap_path, title="Movement Dynamics", xlabel="Frame", ylabel="Movement"):
+        heatmap_path = None
+    # Where the teacher stood: torso centre (shoulders + hips) per frame with a pose
+    occupancy_path = os.path.join(output_dir, "occupancy_heatmap.png")
+    torso = partial["landmarks"][:, TORSO_LANDMARKS, :2].mean(axis=1)
+    if not occupancy_heatmap(torso, occupancy_path, frame_size=partial.get("frame_size")):
+        occupancy_path = None
+
+    # Convert annotated image paths to URLs for frontend (output_dir is served under url_base)
+    base_url = url_base or f"{PUBLIC_BASE_URL}{STATIC_URL_PATH}"
+    annotated_images_urls = [f"{base_url}/{os.path.basename(path)}" for path, _ in annotated_frames]
+    annotated_image_labels = [label for _, label in annotated_frames]
+    heatmap_url = f"{base_url}/{os.path.basename(heatmap_path)}" if heatmap_path else None
+    occupancy_url = f"{base_url}/{os.path.basename(occupancy_path)}" if occupancy_path else None
+
+    if not annotated_images_urls:
+        # Log for debugging
+        print("[PostureAnalyzer] No annotated frames found: no posture issues detected or video too short.")
+
+    result = summarize_posture(partial, series=series)
+    result.update({
+        "annotated_images": annotated_images_urls,
+        "annotated_image_labels": annotated_image_labels,
+        "heatmap": heatmap_url,
+        "occupancy_heatmap": occupancy_url,
+        "analysis_fps": (native_fps or DEFAULT_VIDEO_FPS) / stride,
+        "frame_stride": stride,
+        "pose_mode": partial["pose_mode"],
+    })
+    if series_dir:
+        save_series(series_dir, partial, result)
+        result["series_id"] = os.path.basename(os.path.normpath(series_dir))
+    return result
+
+
+def analyze_video_file(video_path, output_dir="posture_outputs", series_dir=None, url_base=None, cancel_path=None):
+    """Top-level entry point so posture can run in a worker process (see analyzer.run_analysis).
+    Uses a pooled PostureAnalyzer from the model registry instead of building new graphs per session."""
+    from model_registry import posture_analyzer
+    with posture_analyzer() as analyzer:
+        return analyzer.analyze_video(
+            video_path, output_dir=output_dir, series_dir=series_dir, url_base=url_base, cancel_path=cancel_path
+        )
+
+
+def scan_video_range(video_path, start_frame=0, end_frame=None, cancel_path=None):
+    """Top-level scan of one range with a pooled PostureAnalyzer (runs in a posture worker process)."""
+    from model_registry import posture_analyzer
+    with posture_analyzer() as analyzer:
+        return analyzer.scan(video_path, start_frame=start_frame, end_frame=end_frame, cancel_path=cancel_path)
+
+
+def analyze_video_sharded(
+    video_path, executor, shards, output_dir="posture_outputs", series_dir=None, url_base=None, cancel_path=None
+):
+    """Scan window-aligned time ranges of the video in parallel on executor, then merge and finalize."""
+    ranges = shard_ranges(video_path, shards)
+    futures = [executor.submit(scan_video_range, video_path, start, end, cancel_path) for start, end in ranges]
+    return finalize_posture(
+        merge_partials([f.result() for f in futures]), output_dir=output_dir, series_dir=series_dir, url_base=url_base
+    )
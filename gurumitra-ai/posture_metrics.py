@@ -0,0 +1,389 @@
+"""
+GuruMitra posture metrics: landmark storage, vectorized per-frame posture series and scoring.
+PostureAnalyzer.scan only records landmarks (one (33, 4) x/y/z/visibility row block per frame with a pose)
+into a LandmarkStore, plus face-mesh nose positions and phone confidences for sampled frames; spine angle,
+head tilt, neck alignment, movement, gestures and reading posture are computed afterwards for all frames
+at once by frame_series(), and summarize_posture() turns them into metrics and feedback.
+The recorded series are saved per session (save_series), so rescore_posture() can apply different
+thresholds in milliseconds without decoding the video or running MediaPipe again.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# MediaPipe Pose (BlazePose, 33 landmarks) indices used by the metrics
+NUM_LANDMARKS = 33
+NOSE = 0
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+TRACKED_LANDMARKS = [NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP]
+TORSO_LANDMARKS = [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP]
+
+# Frame classification thresholds (coordinates are normalized to the frame; y is top-down)
+DEFAULT_THRESHOLDS = {
+    "slouch_spine_angle": 170.0,        # spine angle below this (degrees) counts as slouching
+    "raised_shoulder_margin": 0.05,     # shoulders this far above the hip line count as raised
+    "head_down": 0.08,                  # nose this far below the shoulder line counts as reading posture
+    "eye_contact_max_offset_x": 0.25,   # face-mesh nose within this of the frame centre (x) ...
+    "eye_contact_max_nose_y": 0.55,     # ... and above this line counts as eye contact
+    "phone_min_confidence": 0.25,       # YOLO cell-phone confidence that counts as phone use
+    # Feedback and recommendation cut-offs on the session averages / percentages
+    "shoulder_tension_percent": 10.0,   # raised shoulders in more than this % of frames
+    "slouch_percent": 20.0,             # slouching in more than this % of frames
+    "good_spine_angle": 170.0,          # average spine angle at or above this is good posture, ...
+    "lean_spine_angle": 150.0,          # ... at or above this leaning forward, below it poor posture
+    "head_tilt_angle": 10.0,            # |average head tilt| above this (degrees) counts as head tilt
+    "neck_alignment": 0.1,              # average nose-to-shoulder distance above this counts as neck protrusion
+    "min_gesture_count": 5.0,           # fewer gesture frames than this asks for more gestures
+    "good_eye_contact_percent": 60.0,   # eye contact at or above this is good, ...
+    "moderate_eye_contact_percent": 40.0,  # ... at or above this moderate, below it low
+    "eye_contact_recommend_percent": 50.0,  # eye contact below this adds a recommendation
+    "phone_usage_percent": 5.0,         # phone seen in more than this % of samples
+    "reading_percent": 40.0,            # reading posture above this % of pose frames, ...
+    "some_reading_percent": 20.0,       # ... above this some reading, otherwise a good balance
+    "reading_recommend_percent": 30.0,  # reading posture above this adds a recommendation
+}
+
+# Where per-session landmark series are saved for re-scoring (see save_series)
+POSTURE_SERIES_DIR = os.environ.get("POSTURE_SERIES_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache", "posture_series"
+)
+SERIES_FORMAT_VERSION = 1
+
+
+class LandmarkStore:
+    """
+    Growable float32 array of (frames, 33, 4) landmarks plus the native frame number of each row.
+    Rows are written into preallocated chunks, so appending never copies earlier frames.
+    """
+
+    def __init__(self, chunk_frames: int = 1024):
+        self.chunk_frames = chunk_frames
+        self._chunks = []
+        self._index_chunks = []
+        self._used = 0  # rows used in the last chunk
+        self._cached = None
+
+    def __len__(self):
+        if not self._chunks:
+            return 0
+        return (len(self._chunks) - 1) * self.chunk_frames + self._used
+
+    def append(self, frame_index: int, landmarks):
+        if not self._chunks or self._used == self.chunk_frames:
+            self._chunks.append(np.empty((self.chunk_frames, NUM_LANDMARKS, 4), dtype=np.float32))
+            self._index_chunks.append(np.empty(self.chunk_frames, dtype=np.int64))
+            self._used = 0
+        self._chunks[-1][self._used] = landmarks
+        self._index_chunks[-1][self._used] = frame_index
+        self._used += 1
+        self._cached = None
+
+    def last(self):
+        """The most recently appended (33, 4) row, as stored (a view; no concatenation)."""
+        if not self._chunks:
+            raise IndexError("LandmarkStore is empty")
+        return self._chunks[-1][self._used - 1]
+
+    def arrays(self):
+        """(landmarks (n, 33, 4) float32, frame_indices (n,) int64) as contiguous arrays."""
+        if self._cached is None:
+            if not self._chunks:
+                self._cached = (
+                    np.empty((0, NUM_LANDMARKS, 4), dtype=np.float32),
+                    np.empty(0, dtype=np.int64),
+                )
+            else:
+                parts = self._chunks[:-1] + [self._chunks[-1][: self._used]]
+                index_parts = self._index_chunks[:-1] + [self._index_chunks[-1][: self._used]]
+                self._cached = (np.concatenate(parts), np.concatenate(index_parts))
+        return self._cached
+
+
+def _angles_between(v1, v2):
+    """Row-wise angle in degrees between (n, 2) vectors."""
+    v1_u = v1 / np.linalg.norm(v1, axis=1, keepdims=True)
+    v2_u = v2 / np.linalg.norm(v2, axis=1, keepdims=True)
+    return np.degrees(np.arccos(np.clip(np.sum(v1_u * v2_u, axis=1), -1.0, 1.0)))
+
+
+def resolve_thresholds(thresholds=None) -> dict:
+    """DEFAULT_THRESHOLDS overridden by thresholds. Raises ValueError for unknown names or non-numeric values."""
+    t = dict(DEFAULT_THRESHOLDS)
+    for name, value in (thresholds or {}).items():
+        if name not in DEFAULT_THRESHOLDS:
+            raise ValueError(f"Unknown posture threshold '{name}'. Use any of: {', '.join(DEFAULT_THRESHOLDS)}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Posture threshold '{name}' must be a number")
+        t[name] = float(value)
+    return t
+
+
+def frame_series(landmarks, stride: int = 1, thresholds=None) -> dict:
+    """
+    Per-frame posture series for (n, 33, 4) landmarks of consecutive frames with a pose.
+    movement has n - 1 entries (nose displacement per native frame between consecutive rows).
+    """
+    t = resolve_thresholds(thresholds)
+    lm = np.asarray(landmarks, dtype=np.float64)
+    xy = lm[:, :, :2]
+    shoulder = (xy[:, LEFT_SHOULDER] + xy[:, RIGHT_SHOULDER]) / 2
+    hip = (xy[:, LEFT_HIP] + xy[:, RIGHT_HIP]) / 2
+    knee = (xy[:, LEFT_KNEE] + xy[:, RIGHT_KNEE]) / 2
+    nose = xy[:, NOSE]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        spine_angle = _angles_between(shoulder - hip, knee - hip)
+    head_tilt = np.arctan2(nose[:, 1] - shoulder[:, 1], nose[:, 0] - shoulder[:, 0]) * 180 / np.pi
+    neck_alignment = np.linalg.norm(nose - shoulder, axis=1)
+    movement = np.linalg.norm(np.diff(nose, axis=0), axis=1) / stride
+    # Hands above shoulders (y is top-down in image)
+    gesture = (xy[:, LEFT_WRIST, 1] < xy[:, LEFT_SHOULDER, 1]) | (xy[:, RIGHT_WRIST, 1] < xy[:, RIGHT_SHOULDER, 1])
+    return {
+        "spine_angle": spine_angle,
+        "head_tilt": head_tilt,
+        "neck_alignment": neck_alignment,
+        "movement": movement,
+        "slouch": spine_angle < t["slouch_spine_angle"],
+        "raised_shoulder": shoulder[:, 1] < hip[:, 1] - t["raised_shoulder_margin"],
+        "gesture": gesture,
+        "reading": nose[:, 1] > shoulder[:, 1] + t["head_down"],
+    }
+
+
+def eye_contact_mask(face_samples, thresholds=None):
+    """Eye contact per face-mesh sample: (n, 3) rows of frame_index, nose x, nose y (NaN = no face)."""
+    t = resolve_thresholds(thresholds)
+    x, y = face_samples[:, 1], face_samples[:, 2]
+    # Frontal = nose near center of frame (x ~ 0.5), facing camera (not turned away)
+    with np.errstate(invalid="ignore"):
+        return (np.abs(x - 0.5) <= t["eye_contact_max_offset_x"]) & (y <= t["eye_contact_max_nose_y"])
+
+
+def summarize_posture(data, thresholds=None, series=None) -> dict:
+    """
+    Posture metrics, feedback and recommendations from scan data: frame_count, stride, landmarks,
+    face_samples and phone_samples (None if phone detection was unavailable). Pure NumPy; no video needed.
+    """
+    t = resolve_thresholds(thresholds)
+    stride = data["stride"]
+    frame_count = data["frame_count"]
+    face_samples = np.asarray(data["face_samples"]).reshape(-1, 3)
+    phone_samples = data.get("phone_samples")
+    if phone_samples is not None:
+        phone_samples = np.asarray(phone_samples).reshape(-1, 2)
+    if series is None:
+        series = frame_series(data["landmarks"], stride, t)
+    pose_detected_frames = len(data["landmarks"])
+
+    # Gesture count is a number of frames: scale sampled frames back to native frames
+    gesture_count = int(series["gesture"].sum()) * stride
+
+    slouch_percent = (int(series["slouch"].sum()) / frame_count) * 100 if frame_count else 0
+    raised_shoulder_percent = (int(series["raised_shoulder"].sum()) / frame_count) * 100 if frame_count else 0
+    avg_spine_angle = np.mean(series["spine_angle"]) if pose_detected_frames else 0
+    avg_head_tilt = np.mean(series["head_tilt"]) if pose_detected_frames else 0
+    avg_neck_alignment = np.mean(series["neck_alignment"]) if pose_detected_frames else 0
+    movement_dynamics = series["movement"]
+    avg_movement = np.mean(movement_dynamics) if len(movement_dynamics) else 0
+
+    # New metrics
+    eye_contact_analyzed_count = len(face_samples)
+    eye_contact_frames = int(eye_contact_mask(face_samples, t).sum())
+    eye_contact_percent = (eye_contact_frames / eye_contact_analyzed_count * 100) if eye_contact_analyzed_count else None
+    phone_usage_percent = None
+    if phone_samples is not None and len(phone_samples):
+        phone_frames = int((phone_samples[:, 1] >= t["phone_min_confidence"]).sum())
+        phone_usage_percent = (phone_frames / len(phone_samples) * 100)
+    denom = pose_detected_frames if pose_detected_frames else frame_count
+    reading_posture_percent = (int(series["reading"].sum()) / denom * 100) if denom else 0
+    explaining_posture_percent = 100.0 - reading_posture_percent if denom else 0
+
+    # Feedback
+    feedback = []
+    if raised_shoulder_percent > t["shoulder_tension_percent"]:
+        feedback.append("Shoulders remained raised during explanation—may indicate stress.")
+    if slouch_percent > t["slouch_percent"]:
+        feedback.append(f"Slouching observed for {slouch_percent:.1f}% of lecture time.")
+    if avg_spine_angle >= t["good_spine_angle"]:
+        feedback.append("Good posture maintained.")
+    elif avg_spine_angle >= t["lean_spine_angle"]:
+        feedback.append("Teacher tends to lean forward while explaining concepts.")
+    else:
+        feedback.append("Poor posture detected. Consider sitting/standing straighter.")
+    if abs(avg_head_tilt) > t["head_tilt_angle"]:
+        feedback.append("Head tilt detected. Try to keep your head level for better engagement.")
+    else:
+        feedback.append("Good head alignment maintained.")
+    if avg_neck_alignment > t["neck_alignment"]:
+        feedback.append("Neck protrusion detected. Keep neck aligned with spine.")
+    if gesture_count < t["min_gesture_count"]:
+        feedback.append("Increase hand gestures for better engagement.")
+
+    # Eye contact feedback
+    if eye_contact_percent is not None:
+        if eye_contact_percent >= t["good_eye_contact_percent"]:
+            feedback.append(f"Good eye contact maintained ({eye_contact_percent:.0f}% of the time).")
+        elif eye_contact_percent >= t["moderate_eye_contact_percent"]:
+            feedback.append(f"Moderate eye contact ({eye_contact_percent:.0f}%). Try to look at the class more often.")
+        else:
+            feedback.append(f"Low eye contact ({eye_contact_percent:.0f}%). Maintain more eye contact with students.")
+
+    # Phone usage feedback
+    if phone_usage_percent is not None and phone_usage_percent > t["phone_usage_percent"]:
+        feedback.append("Phone usage detected during class. Avoid using phone while teaching.")
+    elif phone_usage_percent is not None:
+        feedback.append("No phone usage detected—good focus during the session.")
+
+    # Reading vs explaining feedback
+    if reading_posture_percent > t["reading_percent"]:
+        feedback.append(f"Teacher was reading from materials for {reading_posture_percent:.0f}% of the session. Focus on explaining and engaging with students rather than reading from textbook.")
+    elif reading_posture_percent > t["some_reading_percent"]:
+        feedback.append(f"Some time spent looking down at materials ({reading_posture_percent:.0f}%). Balance with more direct explanation.")
+    else:
+        feedback.append(f"Good balance: explaining posture for {explaining_posture_percent:.0f}% of the session.")
+
+    # Recommendations
+    recommendations = []
+    if slouch_percent > t["slouch_percent"]:
+        recommendations.append("Try back stretches and posture correction exercises.")
+    if abs(avg_head_tilt) > t["head_tilt_angle"]:
+        recommendations.append("Practice keeping your head level during explanations.")
+    if gesture_count < t["min_gesture_count"]:
+        recommendations.append("Use more hand gestures to emphasize points.")
+    if eye_contact_percent is not None and eye_contact_percent < t["eye_contact_recommend_percent"]:
+        recommendations.append("Practice maintaining eye contact with the class; look at the camera or students when explaining.")
+    if phone_usage_percent is not None and phone_usage_percent > t["phone_usage_percent"]:
+        recommendations.append("Keep phone away during teaching hours to stay focused and set a good example.")
+    if reading_posture_percent > t["reading_recommend_percent"]:
+        recommendations.append("Reduce reading from textbook; explain concepts in your own words and use the board or gestures.")
+
+    # If no posture issues detected, provide a default feedback message
+    if not feedback:
+        feedback = ["No posture issues detected in the video."]
+
+    return {
+        "shoulder_tension_percent": raised_shoulder_percent,
+        "slouch_percent": slouch_percent,
+        "avg_spine_angle": avg_spine_angle,
+        "avg_head_tilt_angle": avg_head_tilt,
+        "avg_neck_alignment": avg_neck_alignment,
+        "avg_movement": avg_movement,
+        "gesture_count": gesture_count,
+        "eye_contact_percent": eye_contact_percent,
+        "phone_usage_percent": phone_usage_percent,
+        "reading_posture_percent": reading_posture_percent,
+        "explaining_posture_percent": explaining_posture_percent,
+        "feedback": feedback,
+        "recommendations": recommendations,
+    }
+
+
+# Result keys that come from the original run (images are not re-rendered when re-scoring)
+_RUN_KEYS = (
+    "annotated_images", "annotated_image_labels", "heatmap", "occupancy_heatmap", "analysis_fps", "frame_stride", "pose_mode",
+)
+
+
+def save_series(directory, data, result=None):
+    """
+    Persist scan data as .npy arrays (memory-mappable) plus meta.json in directory (replaced atomically).
+    result: the finished posture result, whose image URLs and run info are kept for re-scoring.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".series-")
+    try:
+        np.save(os.path.join(tmp, "landmarks.npy"), np.asarray(data["landmarks"], dtype=np.float32))
+        np.save(os.path.join(tmp, "frame_indices.npy"), np.asarray(data["frame_indices"], dtype=np.int64))
+        np.save(os.path.join(tmp, "face_samples.npy"), np.asarray(data["face_samples"], dtype=np.float64).reshape(-1, 3))
+        if data.get("phone_samples") is not None:
+            np.save(os.path.join(tmp, "phone_samples.npy"), np.asarray(data["phone_samples"], dtype=np.float64).reshape(-1, 2))
+        meta = {
+            "version": SERIES_FORMAT_VERSION,
+            "native_fps": data["native_fps"],
+            "stride": data["stride"],
+            "pose_mode": data["pose_mode"],
+            "frame_count": data["frame_count"],
+            "run": {k: (result or {}).get(k) for k in _RUN_KEYS},
+        }
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp, directory)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def copy_series(source, directory, run=None):
+    """Copy a saved series to directory (replaced atomically); run, if given, replaces its image URLs and run info."""
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".series-")
+    try:
+        shutil.copytree(source, tmp, dirs_exist_ok=True)
+        if run is not None:
+            meta_path = os.path.join(tmp, "meta.json")
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            meta["run"] = {k: run.get(k) for k in _RUN_KEYS}
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp, directory)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def load_series(directory, mmap: bool = True) -> dict:
+    """Scan data saved by save_series; arrays are memory-mapped (read-only) unless mmap=False."""
+    with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != SERIES_FORMAT_VERSION:
+        raise ValueError(f"Unsupported posture series version {meta.get('version')}")
+    mode = "r" if mmap else None
+    phone_path = os.path.join(directory, "phone_samples.npy")
+    return {
+        "native_fps": meta["native_fps"],
+        "stride": meta["stride"],
+        "pose_mode": meta["pose_mode"],
+        "frame_count": meta["frame_count"],
+        "run": meta.get("run") or {},
+        "landmarks": np.load(os.path.join(directory, "landmarks.npy"), mmap_mode=mode),
+        "frame_indices": np.load(os.path.join(directory, "frame_indices.npy"), mmap_mode=mode),
+        "face_samples": np.load(os.path.join(directory, "face_samples.npy"), mmap_mode=mode),
+        "phone_samples": np.load(phone_path, mmap_mode=mode) if os.path.exists(phone_path) else None,
+    }
+
+
+def series_dir(series_id: str) -> str:
+    """Directory of a saved series under POSTURE_SERIES_DIR. Raises ValueError for ids that are not plain names."""
+    if not series_id or series_id != os.path.basename(series_id) or series_id.startswith("."):
+        raise ValueError("Invalid posture series id")
+    return os.path.join(POSTURE_SERIES_DIR, series_id)
+
+
+def rescore_posture(series, thresholds=None) -> dict:
+    """
+    Posture result for saved scan data (dict from load_series, or its directory) under new thresholds.
+    Metrics and feedback are recomputed; annotated images and charts are those of the original run.
+    """
+    if isinstance(series, str):
+        series = load_series(series)
+    t = resolve_thresholds(thresholds)
+    result = summarize_posture(series, thresholds=t)
+    result.update(series.get("run") or {})
+    result["thresholds"] = t
+    return result
@@ -0,0 +1,168 @@
+"""
+GuruMitra prompt builder: fits a session transcript into an LLM token budget without cutting off the end.
+Used by both Gemini prompts instead of fixed character slices, which dropped the end of long lectures.
+- A transcript that fits PROMPT_TRANSCRIPT_TOKENS is sent verbatim.
+- Otherwise the budget is split over opening / middle / closing (20% / 60% / 20% of the session, as in
+  analyzer.analyze_content_by_parts), so every part of the lesson is represented.
+- Within a part, segments flagged by analyzer.analyze_segments (question, example, structure) are kept
+  verbatim first; other segments are shortened to PROMPT_FILLER_WORDS words and sampled evenly over time,
+  then restored to full text while budget remains. Skipped stretches become "[... mm:ss-mm:ss omitted]".
+Tokens are estimated at ~4 characters each (no tokenizer dependency). Deterministic: the same segments
+and budget give the same excerpt, so LLM response-cache keys stay stable.
+"""
+import math
+import os
+from typing import Optional
+
+# Approximate tokens of transcript per prompt
+PROMPT_TRANSCRIPT_TOKENS = int(os.environ.get("PROMPT_TRANSCRIPT_TOKENS", "3000"))
+# Words kept from a shortened (unflagged) segment
+PROMPT_FILLER_WORDS = int(os.environ.get("PROMPT_FILLER_WORDS", "12"))
+
+CHARS_PER_TOKEN = 4
+# (name, start, end) as fractions of the session duration
+PARTS = (("opening", 0.0, 0.2), ("middle", 0.2, 0.8), ("closing", 0.8, 1.0))
+# Upper bound for one omission marker line, reserved per selected segment
+_MARKER_TOKENS = 8
+CONDENSED_NOTE = (
+    "(Condensed to fit: questions, examples and lesson-structure lines are verbatim; "
+    "other speech is shortened with ... or omitted. Times are mm:ss.)"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _clock(seconds: float) -> str:
+    s = int(max(0.0, seconds))
+    return f"{s // 60:02d}:{s % 60:02d}"
+
+
+def _is_key(segment: dict) -> bool:
+    return bool(segment.get("has_question") or segment.get("has_example") or segment.get("has_structure"))
+
+
+def _shorten(text: str, words: int) -> str:
+    parts = text.split()
+    return text if len(parts) <= words else " ".join(parts[:words]) + " ..."
+
+
+def _spread_order(n: int) -> list:
+    """0..n-1 ordered so every prefix is spread evenly over the range (middle first, then quarters, ...)."""
+    order, intervals = [], [(0, n)]
+    while intervals:
+        next_intervals = []
+        for lo, hi in intervals:
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            order.append(mid)
+            next_intervals += [(lo, mid), (mid + 1, hi)]
+        intervals = next_intervals
+    return order
+
+
+def _allocate(budget: int, needs: dict, shares: dict) -> dict:
+    """Split budget by shares; parts needing less than their share give the rest to the others."""
+    alloc = {name: 0 for name in needs}
+    remaining = budget
+    open_parts = [name for name in needs if needs[name] > 0]
+    while open_parts:
+        total_share = sum(shares[name] for name in open_parts)
+        satisfied = [name for name in open_parts if needs[name] <= remaining * shares[name] / total_share]
+        if not satisfied:
+            for name in open_parts:
+                alloc[name] = int(remaining * shares[name] / total_share)
+            break
+        for name in satisfied:
+            alloc[name] = needs[name]
+            remaining -= needs[name]
+            open_parts.remove(name)
+    return alloc
+
+
+def _select(lines: list, budget: int) -> dict:
+    """
+    lines: [(index, full_line, short_line, key)] of one part. Returns {index: chosen line} within budget:
+    key lines verbatim, then shortened filler spread over time, then filler restored to full text.
+    """
+    chosen, used = {}, 0
+    key = [line for line in lines if line[3]]
+    filler = [line for line in lines if not line[3]]
+    for group, pick in ((key, 1), (filler, 2)):
+        for i in _spread_order(len(group)):
+            index, text = group[i][0], group[i][pick]
+            cost = estimate_tokens(text) + _MARKER_TOKENS
+            if used + cost <= budget:
+                chosen[index] = text
+                used += cost
+    for i in _spread_order(len(filler)):
+        index, full, short, _ = filler[i]
+        if chosen.get(index) == short and full != short:
+            extra = estimate_tokens(full) - estimate_tokens(short)
+            if used + extra <= budget:
+                chosen[index] = full
+                used += extra
+    return chosen
+
+
+def _trim_text(text: str, max_tokens: int) -> str:
+    """No segments: opening, middle and closing slices of the plain text, cut at word boundaries."""
+    third = max(1, (max_tokens * CHARS_PER_TOKEN - 40) // 3)
+    mid = max(third, len(text) // 2 - third // 2)
+    slices = [text[:third], text[mid : mid + third], text[-third:]]
+    slices = [s.split(" ", 1)[-1].rsplit(" ", 1)[0] if i else s.rsplit(" ", 1)[0] for i, s in enumerate(slices)]
+    return "\n[...]\n".join(s.strip() for s in slices)
+
+
+def build_transcript_excerpt(
+    transcript: str,
+    segments: Optional[list] = None,
+    max_tokens: int = PROMPT_TRANSCRIPT_TOKENS,
+    filler_words: int = PROMPT_FILLER_WORDS,
+) -> str:
+    """
+    Transcript text for an LLM prompt, at most ~max_tokens tokens.
+    segments: Whisper segments with start/end/text, ideally analyze_segments output (has_question,
+    has_example, has_structure); segments without those flags are all treated as filler.
+    """
+    text = (transcript or "").strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    segments = [s for s in segments or [] if (s.get("text") or "").strip()]
+    if not segments:
+        return _trim_text(text, max_tokens)
+
+    duration = max(float(s.get("end") or s.get("start") or 0) for s in segments) or 1.0
+    parts = {name: [] for name, _, _ in PARTS}
+    for index, seg in enumerate(segments):
+        start = float(seg.get("start") or 0)
+        body = (seg.get("text") or "").strip()
+        stamp = f"[{_clock(start)}] "
+        line = (index, stamp + body, stamp + _shorten(body, filler_words), _is_key(seg))
+        position = start / duration
+        name = "opening" if position < 0.2 else "closing" if position >= 0.8 else "middle"
+        parts[name].append(line)
+
+    budget = max_tokens - estimate_tokens(CONDENSED_NOTE) - 1
+    needs = {name: sum(estimate_tokens(line[1]) + _MARKER_TOKENS for line in lines) for name, lines in parts.items()}
+    shares = {name: end - start for name, start, end in PARTS}
+    alloc = _allocate(budget, needs, shares)
+    chosen = {}
+    for name, lines in parts.items():
+        chosen.update(_select(lines, alloc[name]))
+
+    out = [CONDENSED_NOTE]
+    gap_start = None
+    for index, seg in enumerate(segments):
+        if index in chosen:
+            if gap_start is not None:
+                out.append(f"[... {_clock(gap_start)}-{_clock(float(segments[index - 1].get('end') or 0))} omitted]")
+                gap_start = None
+            out.append(chosen[index])
+        elif gap_start is None:
+            gap_start = float(seg.get("start") or 0)
+    if gap_start is not None:
+        out.append(f"[... {_clock(gap_start)}-{_clock(float(segments[-1].get('end') or 0))} omitted]")
+    return "\n".join(out)
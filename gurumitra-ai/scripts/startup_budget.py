@@ -0,0 +1,118 @@
+"""
+Startup budget check for the GuruMitra AI service (run in CI and before changing imports).
+Imports main in fresh interpreters and fails (exit 1) if the median import time exceeds the budget
+or if a heavy stack (torch, whisper, MediaPipe, OpenCV, YOLO, google-genai, NumPy, ...) is imported
+at startup; those belong to the model registry or first use. With --serve it also starts uvicorn
+and times until /health answers, i.e. how long an autoscaled/restarted instance takes to bind.
+
+Usage (from gurumitra-ai/): python scripts/startup_budget.py [--runs 5] [--budget 1.0] [--serve] [--verbose]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_BUDGET_SECONDS = float(os.environ.get("STARTUP_BUDGET_SECONDS", "1.0"))
+SERVE_BUDGET_SECONDS = float(os.environ.get("SERVE_BUDGET_SECONDS", "2.0"))
+
+# Must not be imported by `import main`
+HEAVY_MODULES = (
+    "torch", "whisper", "faster_whisper", "ctranslate2", "mediapipe", "cv2", "ultralytics",
+    "google.genai", "matplotlib", "numpy", "requests", "yt_dlp",
+    "analyzer", "posture_analyzer", "transcription", "ai_evaluator",
+)
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import main
+elapsed = time.perf_counter() - t0
+heavy = [m for m in json.loads(sys.argv[1]) if m in sys.modules]
+print(json.dumps({"seconds": elapsed, "heavy": heavy}))
+"""
+
+
+def measure_import(verbose: bool = False) -> dict:
+    cmd = [sys.executable]
+    if verbose:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", _PROBE, json.dumps(HEAVY_MODULES)]
+    proc = subprocess.run(cmd, cwd=SERVICE_DIR, capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if verbose:
+        rows = []
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                rows.append((int(parts[1]), parts[2].rstrip()))
+        result["slowest"] = [f"{us / 1000:8.1f} ms {name}" for us, name in sorted(rows, reverse=True)[:15]]
+    return result
+
+
+def measure_serve(timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn until GET /health returns 200."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f"/health did not answer within {timeout:.0f}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh-interpreter imports to take the median of")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="max median seconds for `import main`")
+    parser.add_argument("--serve", action="store_true", help="also time uvicorn until /health answers")
+    parser.add_argument("--serve-budget", type=float, default=SERVE_BUDGET_SECONDS)
+    parser.add_argument("--verbose", action="store_true", help="print the slowest imports")
+    args = parser.parse_args()
+
+    runs = [measure_import() for _ in range(max(1, args.runs))]
+    median = statistics.median(r["seconds"] for r in runs)
+    heavy = sorted({m for r in runs for m in r["heavy"]})
+    failures = []
+    print(f"import main: median {median:.3f}s over {len(runs)} runs (budget {args.budget:.3f}s)")
+    if median > args.budget:
+        failures.append(f"import time {median:.3f}s exceeds budget {args.budget:.3f}s")
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    if args.verbose:
+        print("\n".join(measure_import(verbose=True)["slowest"]))
+    if args.serve:
+        seconds = measure_serve()
+        print(f"uvicorn /health: {seconds:.3f}s (budget {args.serve_budget:.3f}s)")
+        if seconds > args.serve_budget:
+            failures.append(f"time to /health {seconds:.3f}s exceeds budget {args.serve_budget:.3f}s")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""ArtifactStore eviction tests (run from gurumitra-ai/: python -m unittest discover tests)."""
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artifact_store import ArtifactStore  # noqa: E402
+
+
+def _write(run: dict, nbytes: int):
+    with open(os.path.join(run["output_dir"], "frame.jpg"), "wb") as f:
+        f.write(b"x" * nbytes)
+
+
+class ArtifactStoreTest(unittest.TestCase):
+    def store(self, **kwargs) -> ArtifactStore:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return ArtifactStore(
+            directory=os.path.join(tmp.name, "out"),
+            index_path=os.path.join(tmp.name, "index.sqlite3"),
+            base_url="http://test",
+            **kwargs,
+        )
+
+    def runs(self, store: ArtifactStore) -> set:
+        return {r["run_id"] for r in store.list_runs()}
+
+    def test_overlapping_sessions_keep_running_runs(self):
+        store = self.store(max_bytes=1000)
+        # s1 starts first and is still writing while s0 and s2 finish
+        running = store.create_run("s1")
+        _write(running, 800)
+        older = store.create_run("s0")
+        _write(older, 800)
+        store.finish_run(older["run_id"])
+        done = store.create_run("s2")
+        _write(done, 800)
+        store.finish_run(done["run_id"])
+        # Over budget: the oldest finished run goes, the one still being written stays
+        self.assertEqual(self.runs(store), {running["run_id"], done["run_id"]})
+        self.assertTrue(os.path.isfile(os.path.join(running["output_dir"], "frame.jpg")))
+        store.finish_run(running["run_id"])
+        self.assertEqual(self.runs(store), {running["run_id"]})
+        self.assertFalse(os.path.exists(done["output_dir"]))
+
+    def test_max_age_skips_running_runs_until_stale(self):
+        store = self.store(max_age_seconds=0.05, stale_seconds=0.3)
+        running = store.create_run("s1")
+        time.sleep(0.1)
+        done = store.create_run("s2")
+        store.finish_run(done["run_id"])
+        self.assertIn(running["run_id"], self.runs(store))
+        time.sleep(0.3)
+        store.evict()
+        self.assertEqual(self.runs(store), set())
+        self.assertFalse(os.path.exists(running["output_dir"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Content-stage features against the original per-phrase formulas (run from gurumitra-ai/: python -m unittest discover tests)."""
+import os
+import random
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer  # noqa: E402
+
+_EXAMPLES = ["for example", "for instance", "imagine", "such as", "e.g.", "like when"]
+_STRUCTURE = ["first", "next", "then", "finally", "firstly", "secondly", "lastly", "in conclusion"]
+
+
+def _reference_insights(transcript: str, duration_seconds: float) -> dict:
+    """analyze_teaching_content as it was before the compiled matchers."""
+    text = (transcript or "").strip().lower()
+    if not text:
+        return {"question_count": 0, "example_count": 0, "structure_score": 0.0, "interaction_score": 0.0}
+    question_count = text.count("?") + len(re.findall(
+        r"\b(what|how|why|when|where|which|who)\b|^\s*(is|are|do|does|did|can|could|would|should)\b",
+        text,
+        re.IGNORECASE | re.MULTILINE,
+    ))
+    example_count = sum(text.count(p) for p in _EXAMPLES)
+    structure_count = sum(text.count(p) for p in _STRUCTURE)
+    word_count = max(1, len(text.split()))
+    duration_min = max(0.1, duration_seconds / 60.0)
+    return {
+        "question_count": question_count,
+        "example_count": example_count,
+        "structure_score": round(min(5.0, 1.0 + (structure_count / max(1, word_count / 50)) * 2), 1),
+        "interaction_score": round(min(5.0, 1.0 + question_count / duration_min * 0.5), 1),
+    }
+
+
+def _reference_flags(text: str) -> tuple:
+    t = text.lower()
+    has_question = "?" in text or bool(re.match(
+        r"^\s*(what|how|why|when|where|which|who|is|are|do|does|did|can|could|would|should)\b", t
+    ))
+    return has_question, any(p in t for p in _EXAMPLES), any(p in t for p in _STRUCTURE)
+
+
+def _random_text(rng: random.Random) -> str:
+    # Phrase fragments glued with and without separators, so phrases overlap and touch
+    pieces = _EXAMPLES + _STRUCTURE + [
+        "What", "how", "Is", "should", "?", "such asuch as", "nexthen", "firstlyfirst", "e.g.e.g.",
+        "\n", "\n  ", " ", " ", "word", "ſhould", "K", "THEN", "witho", "e.", "g.", "s",
+    ]
+    sep = rng.choice(["", " ", " ", "\n"])
+    return sep.join(rng.choice(pieces) for _ in range(rng.randint(0, 40)))
+
+
+class ContentFeaturesTest(unittest.TestCase):
+    def test_phrase_lists_match_constants(self):
+        self.assertEqual(list(analyzer.EXAMPLE_PHRASES), _EXAMPLES)
+        self.assertEqual(list(analyzer.STRUCTURE_PHRASES), _STRUCTURE)
+
+    def test_overlapping_phrases_count_like_str_count(self):
+        for text in ("such asuch as", "nexthen", "firstly first", "e.g.e.g.", "thenthen", ""):
+            with self.subTest(text=text):
+                self.assertEqual(analyzer._EXAMPLE_PHRASES.count(text), sum(text.count(p) for p in _EXAMPLES))
+                self.assertEqual(analyzer._STRUCTURE_PHRASES.count(text), sum(text.count(p) for p in _STRUCTURE))
+
+    def test_matches_reference_on_random_texts(self):
+        rng = random.Random(25)
+        for _ in range(2000):
+            transcript = _random_text(rng)
+            segments = [{"start": i * 7.0, "end": i * 7.0 + 6, "text": _random_text(rng)} for i in range(rng.randint(0, 6))]
+            duration = rng.choice([0.0, 30.0, 600.0])
+            with self.subTest(transcript=transcript):
+                out = analyzer.analyze_transcript_content(transcript, segments, duration)
+                self.assertEqual(out["content_insights"], _reference_insights(transcript, duration))
+                flags = [(s["has_question"], s["has_example"], s["has_structure"]) for s in out["segment_insights"]]
+                self.assertEqual(flags, [_reference_flags(s["text"].strip()) for s in segments])
+
+
+if __name__ == "__main__":
+    unittest.main()
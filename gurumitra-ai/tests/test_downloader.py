@@ -0,0 +1,72 @@
+"""Downloader tests against a local HTTP server (run from gurumitra-ai/: python -m unittest discover tests)."""
+import hashlib
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import downloader  # noqa: E402
+
+BODY = os.urandom(3 * 1024 * 1024 + 123)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Set per server: advertise "Accept-Ranges: bytes" but always answer 200 with the whole body
+    ignore_range = False
+
+    def do_GET(self):
+        start, end = 0, len(BODY)
+        rng = self.headers.get("Range")
+        if rng and not self.ignore_range:
+            first, _, last = rng.split("=", 1)[1].partition("-")
+            start, end = int(first), int(last) + 1 if last else len(BODY)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(BODY)}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start))
+        self.end_headers()
+        self.wfile.write(BODY[start:end])
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadTest(unittest.TestCase):
+    def serve(self, ignore_range: bool) -> str:
+        handler = type("Handler", (_Handler,), {"ignore_range": ignore_range})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_port}/video.mp4"
+
+    def fetch(self, url: str) -> dict:
+        with mock.patch.object(downloader, "DOWNLOAD_PARALLEL_MIN_MB", 1):
+            result = downloader.download(url, segments=4)
+        self.addCleanup(os.unlink, result["path"])
+        with open(result["path"], "rb") as f:
+            self.assertEqual(f.read(), BODY)
+        self.assertEqual(result["sha256"], hashlib.sha256(BODY).hexdigest())
+        return result
+
+    def test_parallel_segments(self):
+        self.assertEqual(self.fetch(self.serve(ignore_range=False))["stats"]["segments"], 4)
+
+    def test_advertised_but_ignored_ranges_fall_back_to_one_stream(self):
+        self.assertEqual(self.fetch(self.serve(ignore_range=True))["stats"]["segments"], 1)
+
+    def test_read_head(self):
+        self.assertEqual(downloader.read_head(self.serve(ignore_range=False), 1000), BODY[:1000])
+
+    def test_read_head_without_ranges(self):
+        self.assertIsNone(downloader.read_head(self.serve(ignore_range=True), 1000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""JobManager tests (run from gurumitra-ai/: python -m unittest discover tests)."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import STATUS_DONE, JobManager  # noqa: E402
+
+
+class JobManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.jobs = JobManager(workers=1)
+        self.addCleanup(self.jobs.shutdown, True)
+
+    def test_run_does_not_keep_its_result(self):
+        self.assertEqual(self.jobs.run(lambda x: x * 2, 21), 42)
+        self.assertEqual(sum(self.jobs.stats()["jobs"].values()), 0)
+
+    def test_run_does_not_keep_a_failed_job(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.jobs.run(lambda: 1 / 0)
+        self.assertEqual(sum(self.jobs.stats()["jobs"].values()), 0)
+
+    def test_submitted_job_is_kept_for_polling(self):
+        job_id = self.jobs.submit(lambda: "ok")["job_id"]
+        self.jobs._futures[job_id].result()
+        job = self.jobs.get(job_id)
+        self.assertEqual((job["status"], job["result"]), (STATUS_DONE, "ok"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""posture_metrics tests on synthetic landmarks; no MediaPipe or video needed (run from gurumitra-ai/: python -m unittest discover tests)."""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import posture_metrics as pm  # noqa: E402
+
+
+def _random_landmarks(n: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).random((n, pm.NUM_LANDMARKS, 4), dtype=np.float32)
+
+
+def _angle_between(v1, v2):
+    v1_u = v1 / np.linalg.norm(v1)
+    v2_u = v2 / np.linalg.norm(v2)
+    return np.degrees(np.arccos(np.clip(np.dot(v1_u, v2_u), -1.0, 1.0)))
+
+
+def _per_frame_reference(landmarks: np.ndarray) -> dict:
+    """The per-frame loop PostureAnalyzer.analyze_video ran before frame_series (every frame has a pose)."""
+    spine_angles, head_tilts, necks, movements = [], [], [], []
+    slouch = raised = gestures = reading = 0
+    prev = None
+    for row in landmarks.tolist():
+        ls, rs = row[pm.LEFT_SHOULDER], row[pm.RIGHT_SHOULDER]
+        lh, rh = row[pm.LEFT_HIP], row[pm.RIGHT_HIP]
+        lk, rk = row[pm.LEFT_KNEE], row[pm.RIGHT_KNEE]
+        nose, lw, rw = row[pm.NOSE], row[pm.LEFT_WRIST], row[pm.RIGHT_WRIST]
+        shoulder = np.mean([[ls[0], ls[1]], [rs[0], rs[1]]], axis=0)
+        hip = np.mean([[lh[0], lh[1]], [rh[0], rh[1]]], axis=0)
+        knee = np.mean([[lk[0], lk[1]], [rk[0], rk[1]]], axis=0)
+        angle = _angle_between(shoulder - hip, knee - hip)
+        spine_angles.append(angle)
+        if angle < 170:
+            slouch += 1
+        if (ls[1] + rs[1]) / 2 < (lh[1] + rh[1]) / 2 - 0.05:
+            raised += 1
+        nose_xy = np.array([nose[0], nose[1]])
+        head_tilts.append(np.arctan2(nose_xy[1] - shoulder[1], nose_xy[0] - shoulder[0]) * 180 / np.pi)
+        necks.append(np.linalg.norm(nose_xy - shoulder))
+        if prev is not None:
+            movements.append(np.linalg.norm(nose_xy - np.array(prev)))
+        prev = [nose[0], nose[1]]
+        if lw[1] < ls[1] or rw[1] < rs[1]:
+            gestures += 1
+        if nose[1] > shoulder[1] + 0.08:
+            reading += 1
+    return {
+        "spine_angle": spine_angles,
+        "head_tilt": head_tilts,
+        "neck_alignment": necks,
+        "movement": movements,
+        "slouch": slouch,
+        "raised_shoulder": raised,
+        "gesture": gestures,
+        "reading": reading,
+    }
+
+
+class FrameSeriesTest(unittest.TestCase):
+    def test_matches_per_frame_formulas(self):
+        for seed in range(5):
+            landmarks = _random_landmarks(500, seed)
+            series = pm.frame_series(landmarks)
+            ref = _per_frame_reference(landmarks)
+            for name in ("spine_angle", "head_tilt", "neck_alignment", "movement"):
+                np.testing.assert_allclose(series[name], ref[name], rtol=1e-9, atol=1e-9, err_msg=name)
+            for name in ("slouch", "raised_shoulder", "gesture", "reading"):
+                self.assertEqual(int(series[name].sum()), ref[name], name)
+
+    def test_summary_matches_per_frame_averages(self):
+        landmarks = _random_landmarks(300, 7)
+        ref = _per_frame_reference(landmarks)
+        out = pm.summarize_posture({
+            "frame_count": len(landmarks),
+            "stride": 1,
+            "landmarks": landmarks,
+            "face_samples": np.empty((0, 3)),
+            "phone_samples": None,
+        })
+        self.assertAlmostEqual(out["avg_spine_angle"], np.mean(ref["spine_angle"]), places=9)
+        self.assertAlmostEqual(out["avg_head_tilt_angle"], np.mean(ref["head_tilt"]), places=9)
+        self.assertAlmostEqual(out["avg_neck_alignment"], np.mean(ref["neck_alignment"]), places=9)
+        self.assertAlmostEqual(out["avg_movement"], np.mean(ref["movement"]), places=9)
+        self.assertEqual(out["gesture_count"], ref["gesture"])
+        self.assertAlmostEqual(out["slouch_percent"], ref["slouch"] / len(landmarks) * 100)
+        self.assertAlmostEqual(out["shoulder_tension_percent"], ref["raised_shoulder"] / len(landmarks) * 100)
+        self.assertAlmostEqual(out["reading_posture_percent"], ref["reading"] / len(landmarks) * 100)
+
+    def test_feedback_cut_offs_can_be_rescored(self):
+        landmarks = _random_landmarks(300, 11)
+        series = {
+            "frame_count": len(landmarks),
+            "stride": 1,
+            "landmarks": landmarks,
+            "face_samples": np.empty((0, 3)),
+            "phone_samples": None,
+        }
+        tilt = abs(pm.summarize_posture(series)["avg_head_tilt_angle"])
+        message = "Head tilt detected. Try to keep your head level for better engagement."
+        strict = pm.rescore_posture(series, {"head_tilt_angle": tilt - 1})
+        lenient = pm.rescore_posture(series, {"head_tilt_angle": tilt + 1})
+        self.assertIn(message, strict["feedback"])
+        self.assertNotIn(message, lenient["feedback"])
+        with self.assertRaises(ValueError):
+            pm.resolve_thresholds({"head_tilt": 5})
+
+    def test_landmark_store_round_trip(self):
+        landmarks = _random_landmarks(70, 3)
+        store = pm.LandmarkStore(chunk_frames=16)
+        for i, row in enumerate(landmarks):
+            store.append(i * 2, row)
+            np.testing.assert_array_equal(store.last(), row)
+        stored, frames = store.arrays()
+        np.testing.assert_array_equal(stored, landmarks)
+        np.testing.assert_array_equal(frames, np.arange(70) * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
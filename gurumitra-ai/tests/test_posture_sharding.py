@@ -0,0 +1,154 @@
+"""Sharded posture scans: merging partial scans and exact seeking (run from gurumitra-ai/: python -m unittest discover tests)."""
+import os
+import sys
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import posture_analyzer as pa  # noqa: E402
+import posture_metrics as pm  # noqa: E402
+
+
+def _full_scan(frames: int, seed: int, phone: bool = True) -> tuple:
+    """A synthetic single-process scan, plus every annotation candidate in frame order."""
+    rng = np.random.default_rng(seed)
+    frame_indices = np.sort(rng.choice(np.arange(1, frames + 1), size=frames * 2 // 3, replace=False))
+    face_frames = np.arange(5, frames + 1, 5)
+    phone_frames = np.arange(10, frames + 1, 10)
+    candidates = [(int(i), f"issue {i}", bytes([i % 256])) for i in range(15, frames + 1, 15) if rng.random() < 0.4]
+    scan = {
+        "native_fps": 30.0,
+        "frame_size": (640, 360),
+        "stride": 1,
+        "pose_mode": "tracking",
+        "frame_count": frames,
+        "face_samples": np.column_stack([face_frames, rng.random((len(face_frames), 2))]),
+        "phone_samples": np.column_stack([phone_frames, rng.random(len(phone_frames))]) if phone else None,
+        "landmarks": rng.random((len(frame_indices), pm.NUM_LANDMARKS, 4), dtype=np.float32),
+        "frame_indices": frame_indices,
+        "annotated_frames": candidates[: pa.MAX_ANNOTATED_FRAMES],
+    }
+    return scan, candidates
+
+
+def _split(scan: dict, candidates: list, bounds: list) -> list:
+    """What scan() returns for each native-frame range [start, end) of the same video."""
+    parts = []
+    for start, end in zip(bounds, bounds[1:]):
+        rows = (scan["frame_indices"] > start) & (scan["frame_indices"] <= end)
+        def in_range(samples):
+            return samples[(samples[:, 0] > start) & (samples[:, 0] <= end)]
+        parts.append({
+            **scan,
+            "frame_count": end - start,
+            "face_samples": in_range(scan["face_samples"]),
+            "phone_samples": None if scan["phone_samples"] is None else in_range(scan["phone_samples"]),
+            "landmarks": scan["landmarks"][rows],
+            "frame_indices": scan["frame_indices"][rows],
+            # Each range keeps its own first MAX_ANNOTATED_FRAMES candidates
+            "annotated_frames": [c for c in candidates if start < c[0] <= end][: pa.MAX_ANNOTATED_FRAMES],
+        })
+    return parts
+
+
+class MergePartialsTest(unittest.TestCase):
+    def assert_same_scan(self, merged: dict, scan: dict):
+        self.assertEqual(merged["frame_count"], scan["frame_count"])
+        self.assertEqual(merged["annotated_frames"], scan["annotated_frames"])
+        for key in ("landmarks", "frame_indices", "face_samples"):
+            np.testing.assert_array_equal(merged[key], scan[key], err_msg=key)
+        if scan["phone_samples"] is None:
+            self.assertIsNone(merged["phone_samples"])
+        else:
+            np.testing.assert_array_equal(merged["phone_samples"], scan["phone_samples"])
+        # Movement across range boundaries included
+        np.testing.assert_array_equal(pm.frame_series(merged["landmarks"])["movement"], pm.frame_series(scan["landmarks"])["movement"])
+        self.assertEqual(repr(pm.summarize_posture(merged)), repr(pm.summarize_posture(scan)))
+
+    def test_merge_equals_single_scan(self):
+        for seed, bounds in enumerate(([0, 300, 600, 900], [0, 60, 450, 900], [0, 900])):
+            scan, candidates = _full_scan(900, seed)
+            with self.subTest(bounds=bounds):
+                self.assert_same_scan(pa.merge_partials(_split(scan, candidates, bounds)), scan)
+
+    def test_first_annotations_come_from_later_shards_in_order(self):
+        scan, candidates = _full_scan(900, 4)
+        candidates = [c for c in candidates if c[0] > 250] + [(30, "early", b"e")]
+        candidates.sort()
+        scan["annotated_frames"] = candidates[: pa.MAX_ANNOTATED_FRAMES]
+        merged = pa.merge_partials(_split(scan, candidates, [0, 300, 600, 900]))
+        self.assertEqual([c[0] for c in merged["annotated_frames"]], [c[0] for c in candidates[: pa.MAX_ANNOTATED_FRAMES]])
+
+    def test_merge_without_phone_detector(self):
+        scan, candidates = _full_scan(600, 5, phone=False)
+        self.assert_same_scan(pa.merge_partials(_split(scan, candidates, [0, 300, 600])), scan)
+
+
+class _MisreportingCapture:
+    """Real capture whose seeks do nothing while CAP_PROP_POS_FRAMES reports the requested frame."""
+
+    def __init__(self, path: str):
+        self._cap = cv2.VideoCapture(path)
+        self._requested = None
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self._requested = value
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_FRAMES and self._requested is not None:
+            return self._requested
+        return self._cap.get(prop)
+
+    def __getattr__(self, name):
+        return getattr(self._cap, name)
+
+
+class SeekTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls._tmp.name, "frames.avi")
+        writer = cv2.VideoWriter(cls.path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+        rng = np.random.default_rng(0)
+        for _ in range(120):
+            writer.write(rng.integers(0, 256, (48, 64, 3), dtype=np.uint8))
+        writer.release()
+        cap = cv2.VideoCapture(cls.path)
+        cls.frames = []
+        while cap.grab():
+            cls.frames.append(cap.retrieve()[1])
+        cap.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def next_frame(self, cap):
+        self.assertTrue(cap.grab())
+        frame = cap.retrieve()[1]
+        cap.release()
+        return frame
+
+    def test_seek_lands_on_start_frame(self):
+        self.assertEqual(len(self.frames), 120)
+        for start in (1, 2, 49, 100, 119):
+            with self.subTest(start=start):
+                cap = pa._seek(cv2.VideoCapture(self.path), self.path, start)
+                np.testing.assert_array_equal(self.next_frame(cap), self.frames[start])
+
+    def test_unconfirmed_seek_decodes_forward(self):
+        for start in (3, 75):
+            with self.subTest(start=start):
+                cap = pa._seek(_MisreportingCapture(self.path), self.path, start)
+                self.assertIsInstance(cap, cv2.VideoCapture)
+                np.testing.assert_array_equal(self.next_frame(cap), self.frames[start])
+
+
+if __name__ == "__main__":
+    unittest.main()
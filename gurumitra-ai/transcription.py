@@ -0,0 +1,158 @@
+"""
+GuruMitra transcription engines: one interface behind analyzer.transcribe_audio.
+TRANSCRIBE_ENGINE selects the backend (model size chosen by WHISPER_MODEL):
+- "openai-whisper" (default): openai-whisper in fp32.
+- "whisper-int8": openai-whisper with its Linear layers dynamically quantized to int8 (torch only, no extra package).
+- "faster-whisper": CTranslate2 Whisper with int8 weights (pip install faster-whisper); usually the fastest.
+Every engine returns a Whisper-shaped result: {"text": str, "segments": [{"start", "end", "text"}, ...]},
+so the int8 backends trade a small accuracy delta for speed without changing the response.
+"""
+import json
+import os
+import threading
+from typing import Optional
+
+WHISPER_MODEL_NAME = os.environ.get("WHISPER_MODEL", "base")
+TRANSCRIBE_ENGINE = (os.environ.get("TRANSCRIBE_ENGINE") or "openai-whisper").strip().lower()
+# Options passed to openai-whisper's model.transcribe; part of the transcript cache key
+WHISPER_DECODE_OPTIONS = {"fp16": False, "language": None}
+# Directory holding downloaded model weights (deploy with weights baked in to avoid network fetches)
+WHISPER_MODEL_DIR = os.environ.get("WHISPER_MODEL_DIR") or None
+# CTranslate2 threads per engine (0 = library default, i.e. all cores)
+TRANSCRIBE_CPU_THREADS = int(os.environ.get("TRANSCRIBE_CPU_THREADS", "0"))
+
+
+class TranscriptionEngine:
+    """Base interface. transcribe(audio) takes a file path or 16 kHz mono float32 array."""
+
+    name = "base"
+    options = {}
+
+    def __init__(self, model_name: str = WHISPER_MODEL_NAME):
+        self.model_name = model_name
+
+    def load(self):
+        """Load weights (idempotent). Called lazily by transcribe()."""
+        raise NotImplementedError
+
+    def transcribe(self, audio) -> dict:
+        raise NotImplementedError
+
+    @classmethod
+    def cache_id(cls, model_name: str = WHISPER_MODEL_NAME) -> str:
+        """Identifies engine + model + decode options for cache keys (does not load the model)."""
+        return f"{cls.name}:{model_name}:{json.dumps(cls.options, sort_keys=True)}"
+
+
+class OpenAIWhisperEngine(TranscriptionEngine):
+    name = "openai-whisper"
+    options = WHISPER_DECODE_OPTIONS
+
+    def __init__(self, model_name: str = WHISPER_MODEL_NAME):
+        super().__init__(model_name)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                self._model = self._load_model()
+        return self._model
+
+    def _load_model(self):
+        import whisper
+        return whisper.load_model(self.model_name, download_root=WHISPER_MODEL_DIR)
+
+    def transcribe(self, audio) -> dict:
+        result = self.load().transcribe(audio, **self.options)
+        return {
+            "text": result.get("text") or "",
+            "segments": [
+                {"start": seg.get("start", 0), "end": seg.get("end", 0), "text": seg.get("text") or ""}
+                for seg in result.get("segments") or []
+            ],
+        }
+
+
+class QuantizedWhisperEngine(OpenAIWhisperEngine):
+    """openai-whisper with torch dynamic int8 quantization of all Linear layers (attention + MLP)."""
+
+    name = "whisper-int8"
+
+    def _load_model(self):
+        import torch
+        import whisper
+        import whisper.model
+        # Dynamic quantization is CPU-only
+        model = whisper.load_model(self.model_name, device="cpu", download_root=WHISPER_MODEL_DIR)
+        # whisper subclasses nn.Linear only to cast weights to the input dtype; in fp32 it is a plain
+        # Linear, and quantize_dynamic only swaps exact nn.Linear instances
+        for module in model.modules():
+            if type(module) is whisper.model.Linear:
+                module.__class__ = torch.nn.Linear
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    """CTranslate2 backend. Greedy decoding (beam_size=1) like openai-whisper's default."""
+
+    name = "faster-whisper"
+    options = {"compute_type": "int8", "beam_size": 1, "language": None}
+
+    def __init__(self, model_name: str = WHISPER_MODEL_NAME):
+        super().__init__(model_name)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                self._model = WhisperModel(
+                    self.model_name,
+                    device="cpu",
+                    compute_type=self.options["compute_type"],
+                    cpu_threads=TRANSCRIBE_CPU_THREADS,
+                    download_root=WHISPER_MODEL_DIR,
+                )
+        return self._model
+
+    def transcribe(self, audio) -> dict:
+        segments_iter, _info = self.load().transcribe(
+            audio,
+            beam_size=self.options["beam_size"],
+            language=self.options["language"],
+        )
+        segments = [{"start": seg.start, "end": seg.end, "text": seg.text} for seg in segments_iter]
+        return {"text": "".join(seg["text"] for seg in segments), "segments": segments}
+
+
+ENGINES = {
+    OpenAIWhisperEngine.name: OpenAIWhisperEngine,
+    QuantizedWhisperEngine.name: QuantizedWhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+_engine: Optional[TranscriptionEngine] = None
+_engine_lock = threading.Lock()
+
+
+def _engine_class():
+    try:
+        return ENGINES[TRANSCRIBE_ENGINE]
+    except KeyError:
+        raise ValueError(f"Unknown TRANSCRIBE_ENGINE '{TRANSCRIBE_ENGINE}'. Use one of: {', '.join(ENGINES)}")
+
+
+def get_engine() -> TranscriptionEngine:
+    """Process-wide engine selected by TRANSCRIBE_ENGINE (weights load on first transcribe/load)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = _engine_class()(WHISPER_MODEL_NAME)
+        return _engine
+
+
+def engine_cache_id() -> str:
+    """Cache-key component for the configured engine, model and decode options."""
+    return _engine_class().cache_id(WHISPER_MODEL_NAME)